@@ -1,289 +1,391 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import logging
-from urllib.parse import urljoin, urlparse
 import re
 import sys
 import argparse
 import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
+from parsers import (PARSER_BACKENDS, clean_text, get_url_name, parse_property_item,
+                     get_page_parser, init_parse_worker)
+from checkpoint import CheckpointStore
+from dedup import DedupIndex
+from enrichment import DetailEnricher, DetailStore
+from http_cache import HttpCache
+from listing_store import ListingStore
+from metrics import CrawlMetrics
+from normalize import NUMERIC_COLUMNS
+from pagination import detect_url_pattern
+from rate_limiter import (DEFAULT_REQUESTS_PER_SECOND, AdaptiveRateLimiter, HostRateLimiter, RETRY_STATUSES,
+                          THROTTLE_STATUSES, backoff_delay, parse_retry_after)
+from records import SCHEMA, ListingBatch
+from seen_store import SeenStore
+from sinks import open_sink
+from sites import DEFAULT_SITE, SITES, SiteProfiles, find_site
+from stats import RunningStats
+from transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, FetchMethods, create_transport
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+EXPORT_FORMATS = ('excel', 'parquet', 'arrow')
+
 class AlonhadatMultiCrawler:
-    def __init__(self, urls_list=None):
+    def __init__(self, urls_list=None, workers=1, rate_limit=None, parse_workers=0, queue_size=None,
+                 parser_backend='html.parser', sink=None, checkpoint=None, http_cache=None, offline=False,
+                 seen_store=None, known_threshold=0.8, dedup=True, metrics=None, adaptive=False,
+                 max_rate=None, transport=None, rate_limiter=None, listing_store=None, site_profiles=None,
+                 fetchers=None):
         self.base_url = "https://alonhadat.com.vn"
         self.urls_list = urls_list if urls_list else []
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Referer': 'https://alonhadat.com.vn/'
-        })
-        self.all_data = []
-        self.url_data = {}  # Dữ liệu theo từng URL
-
-    def get_page_content(self, url, retries=3):
+        self.page_parser = get_page_parser(parser_backend)
+        self.parser_backend = parser_backend
+        self.workers = max(1, workers)
+        # parse_workers > 0: parse bằng process pool, tách khỏi luồng tải trang
+        self.parse_workers = max(0, parse_workers)
+        self.queue_size = queue_size or self.workers * 2
+        self.raw_pages = None
+        self.stop_event = threading.Event()
+        if rate_limit is None and (self.workers > 1 or adaptive):
+            rate_limit = DEFAULT_REQUESTS_PER_SECOND
+        # Có rate limiter thì bỏ qua các lần sleep cố định
+        if rate_limiter:
+            # Dùng chung giữa các lần chạy (chế độ daemon)
+            self.rate_limiter = rate_limiter
+        elif adaptive:
+            # Tự tăng tốc khi server trả lời tốt, giảm khi gặp 429/503 hoặc chậm đi
+            self.rate_limiter = AdaptiveRateLimiter(rate_limit, max_rate=max_rate, max_concurrency=self.workers)
+        else:
+            self.rate_limiter = HostRateLimiter(rate_limit) if rate_limit else None
+        if transport is not None:
+            # Transport (và các kết nối keep-alive) có sẵn từ lần chạy trước hoặc cấu hình từ CLI
+            self.transport = transport
+        else:
+            self.transport = create_transport(max(self.workers, 10))
+        # Cách tải theo tên (requests/mobile/cloudscraper) trên cùng transport
+        self.fetchers = fetchers or FetchMethods(self.transport)
+        # Cách tải + selector thẻ tin đã dùng được của từng site (alonhadat, batdongsan...)
+        self.site_profiles = site_profiles or SiteProfiles()
+        # Dữ liệu lưu theo cột (ListingBatch) thay cho list dict để tiết kiệm bộ nhớ
+        self.all_data = ListingBatch()
+        self.url_data = {}  # Dữ liệu theo từng URL khi crawl song song, gộp vào all_data lúc kết thúc
+        # Có sink thì ghi từng trang ra đĩa ngay, không giữ dữ liệu trong bộ nhớ
+        self.sink = sink
+        self.stats = RunningStats()
+        # Checkpoint SQLite: bỏ qua các trang/URL đã crawl xong ở lần chạy trước
+        self.checkpoint = checkpoint
+        self.failed_urls = set()
+        # Cache HTTP trên đĩa; offline = chỉ đọc từ cache, không gửi request
+        self.http_cache = http_cache
+        self.offline = offline
+        if offline and not http_cache:
+            raise ValueError("Chế độ offline cần có http_cache")
+        # Incremental: chỉ ghi tin mới/đã đổi, dừng phân trang khi trang gồm phần lớn tin đã thấy
+        self.seen_store = seen_store
+        self.known_threshold = known_threshold
+        self.caught_up = set()
+        # Bỏ tin trùng giữa các URL nguồn ngay khi ghi nhận từng trang
+        self.dedup = DedupIndex() if dedup else None
+        # Kho tin SQLite có index: upsert mọi tin của từng trang, tra cứu qua listing_store.py
+        self.listing_store = listing_store
+        # URL nguồn bị cắt bớt trang (--pages) trong lần chạy này: không biết tin nào đã bị gỡ
+        self.truncated = set()
+        self.run_started = None
+        # Bộ đếm và histogram thời gian theo giai đoạn/URL nguồn
+        self.metrics = metrics or CrawlMetrics()
+        # Thống kê dùng lại kết nối, đọc lúc xuất báo cáo metrics
+        self.metrics.register('transport', self.transport.stats)
+
+    def site_for(self, url):
+        """Adapter của site chứa URL; host lạ (vd. server thử nghiệm) dùng adapter alonhadat"""
+        return find_site(url) or DEFAULT_SITE
+
+    def site_profile(self, site):
+        """(cách tải, selector) đã biết của site, chưa dò thì dùng lựa chọn đầu tiên"""
+        return self.site_profiles.get(site) or site.default_profile()
+
+    def get_page_content(self, url, retries=3, source_url=None, fetch_method=None):
         """Lấy nội dung trang web với retry mechanism"""
+        source_url = source_url or url
+        site = self.site_for(source_url)
+        fetch_method = fetch_method or self.site_profile(site)[0]
+        metrics = self.metrics
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and (self.offline or self.http_cache.is_fresh(cached)):
+            self.http_cache.hit()
+            metrics.inc('cache_hits', source_url=source_url)
+            metrics.inc('pages_fetched', source_url=source_url)
+            return self.http_cache.to_response(cached)
+        if self.offline:
+            logger.warning(f"Không có trong cache (offline): {url}")
+            self.failed_urls.add(url)
+            metrics.inc('pages_failed', source_url=source_url)
+            return None
+
+        headers = {**site.headers, **(self.http_cache.conditional_headers(cached) if cached else {})} or None
         for attempt in range(retries):
+            if self.rate_limiter:
+                waited = self.rate_limiter.acquire(url)
+                if waited:
+                    metrics.observe('sleep', waited, source_url)
+            status = latency = retry_after = None
             try:
-                response = self.session.get(url, timeout=15)
+                metrics.inc('requests', source_url=source_url)
+                start = time.perf_counter()
+                response = self.fetchers.get(fetch_method, url, headers=headers)
+                metrics.observe('download', time.perf_counter() - start, source_url)
+                status, latency = response.status_code, response.elapsed.total_seconds()
+                metrics.observe('ttfb', latency, source_url)
+                metrics.inc('bytes_downloaded', len(response.content), source_url)
+                if status in RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if status in THROTTLE_STATUSES:
+                        metrics.inc('throttled', source_url=source_url)
+                if response.status_code == 304 and cached:
+                    # Trang không đổi từ lần trước: dùng lại body trong cache
+                    self.http_cache.revalidated(url)
+                    metrics.inc('not_modified', source_url=source_url)
+                    metrics.inc('pages_fetched', source_url=source_url)
+                    return self.http_cache.to_response(cached)
                 response.raise_for_status()
                 response.encoding = 'utf-8'
+                if self.http_cache:
+                    self.http_cache.store(url, response.content, response.headers.get('ETag'),
+                                          response.headers.get('Last-Modified'))
+                metrics.inc('pages_fetched', source_url=source_url)
                 return response
             except requests.RequestException as e:
                 logger.error(f"Lỗi khi truy cập {url} (lần thử {attempt + 1}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
-                else:
-                    return None
+                metrics.inc('request_errors', source_url=source_url)
+            finally:
+                if self.rate_limiter:
+                    self.rate_limiter.release(url, status, latency, retry_after)
+
+            # 404/403...: thử lại cũng vô ích
+            if attempt == retries - 1 or (status is not None and status not in RETRY_STATUSES):
+                self.failed_urls.add(url)
+                metrics.inc('pages_failed', source_url=source_url)
+                return None
+            metrics.inc('retries', source_url=source_url)
+            # Backoff có jitter, nhưng không sớm hơn Retry-After server yêu cầu
+            delay = max(backoff_delay(attempt), retry_after or 0)
+            with metrics.timer('sleep', source_url):
+                time.sleep(delay)
+
+    def polite_sleep(self, seconds):
+        """Delay cố định, chỉ dùng khi không có rate limiter và không chạy offline"""
+        if not self.rate_limiter and not self.offline:
+            with self.metrics.timer('sleep'):
+                time.sleep(seconds)
 
     def clean_text(self, text):
         """Làm sạch text"""
-        if not text:
-            return ""
-        return re.sub(r'\s+', ' ', text.strip())
+        return clean_text(text)
 
     def get_url_name(self, url):
         """Lấy tên ngắn gọn từ URL"""
-        parsed_url = urlparse(url)
-        path = parsed_url.path.strip('/')
-        if path:
-            # Lấy phần cuối của path và loại bỏ .htm
-            name = path.split('/')[-1].replace('.htm', '')
-            # Làm ngắn gọn hơn
-            if len(name) > 50:
-                name = name[:50] + "..."
-            return name
-        return "unknown"
+        return get_url_name(url)
 
     def parse_property_item(self, item, source_url):
         """Parse thông tin từ một item bất động sản"""
-        try:
-            property_data = {}
-            
-            # Thêm thông tin source
-            property_data['source_url'] = source_url
-            property_data['source_name'] = self.get_url_name(source_url)
-            property_data['crawl_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # 1. Tiêu đề và URL
-            title_elem = item.find('div', class_='ct_title')
-            if title_elem:
-                link_elem = title_elem.find('a')
-                if link_elem:
-                    property_data['title'] = self.clean_text(link_elem.get_text())
-                    property_data['detail_url'] = urljoin(self.base_url, link_elem.get('href', ''))
-                    property_data['vip_class'] = link_elem.get('class', [])
-                else:
-                    property_data['title'] = self.clean_text(title_elem.get_text())
-                    property_data['detail_url'] = ''
-                    property_data['vip_class'] = []
-            else:
-                property_data['title'] = ''
-                property_data['detail_url'] = ''
-                property_data['vip_class'] = []
-
-            # 2. Ngày đăng
-            date_elem = item.find('div', class_='ct_date')
-            property_data['post_date'] = self.clean_text(date_elem.get_text()) if date_elem else ''
-
-            # 3. VIP level
-            vip_elem = item.find('div', class_='vipstar')
-            if vip_elem:
-                vip_classes = vip_elem.get('class', [])
-                vip_level = ''
-                for cls in vip_classes:
-                    if cls.startswith('vip-'):
-                        vip_level = cls
-                        break
-                property_data['vip_level'] = vip_level
-            else:
-                property_data['vip_level'] = ''
-
-            # 4. Hình ảnh
-            img_elem = item.find('div', class_='thumbnail')
-            if img_elem:
-                img_tag = img_elem.find('img')
-                if img_tag:
-                    property_data['image_url'] = urljoin(self.base_url, img_tag.get('src', ''))
-                    property_data['image_alt'] = img_tag.get('alt', '')
-                else:
-                    property_data['image_url'] = ''
-                    property_data['image_alt'] = ''
-            else:
-                property_data['image_url'] = ''
-                property_data['image_alt'] = ''
-
-            # 5. Mô tả ngắn
-            brief_elem = item.find('div', class_='ct_brief')
-            if brief_elem:
-                for link in brief_elem.find_all('a'):
-                    link.decompose()
-                property_data['description'] = self.clean_text(brief_elem.get_text())
-            else:
-                property_data['description'] = ''
-
-            # 6. Diện tích
-            area_elem = item.find('div', class_='ct_dt')
-            if area_elem:
-                area_text = area_elem.get_text()
-                area_match = re.search(r'(\d+(?:[.,]\d+)?)', area_text.replace(',', '.'))
-                property_data['area'] = area_match.group(1) if area_match else ''
-                property_data['area_text'] = self.clean_text(area_text)
-            else:
-                property_data['area'] = ''
-                property_data['area_text'] = ''
-
-            # 7. Kích thước
-            size_elem = item.find('div', class_='ct_kt')
-            if size_elem:
-                size_text = size_elem.get_text()
-                size_match = re.search(r'KT:\s*(.+)', size_text)
-                property_data['dimensions'] = size_match.group(1).strip() if size_match else self.clean_text(size_text)
-            else:
-                property_data['dimensions'] = ''
-
-            # 8. Hướng nhà
-            direction_elem = item.find('div', class_='ct_direct')
-            if direction_elem:
-                direction_text = direction_elem.get_text()
-                direction_match = re.search(r'Hướng:\s*(.+)', direction_text)
-                property_data['direction'] = direction_match.group(1).strip() if direction_match else self.clean_text(direction_text)
-            else:
-                property_data['direction'] = ''
-
-            # 9. Đường trước nhà
-            road_elem = item.find('span', class_='road-width')
-            property_data['road_width'] = self.clean_text(road_elem.get_text()) if road_elem else ''
-
-            # 10. Số tầng
-            floors_elem = item.find('span', class_='floors')
-            property_data['floors'] = self.clean_text(floors_elem.get_text()) if floors_elem else ''
-
-            # 11. Giá
-            price_elem = item.find('div', class_='ct_price') or item.find('div', class_='ct*price')
-            if price_elem:
-                price_text = price_elem.get_text()
-                price_match = re.search(r'Giá:\s*(.+)', price_text)
-                property_data['price'] = price_match.group(1).strip() if price_match else self.clean_text(price_text)
-            else:
-                property_data['price'] = ''
-
-            # 12. Địa chỉ
-            address_elem = item.find('div', class_='ct_dis')
-            if address_elem:
-                property_data['address'] = self.clean_text(address_elem.get_text())
-            else:
-                property_data['address'] = ''
-
-            return property_data
+        return parse_property_item(item, source_url, self.base_url)
+
+    def record_page(self, source_url, page, page_data, restored=False):
+        """Ghi nhận dữ liệu một trang, trả về phần cần giữ trong bộ nhớ"""
+        start = time.perf_counter()
+        emitted = page_data
+        if self.seen_store and not restored:
+            emitted, known = self.seen_store.classify(page_data)
+            if page_data and known >= self.known_threshold * len(page_data):
+                self.caught_up.add(source_url)
+        if self.dedup:
+            unique = self.dedup.filter_page(emitted)
+            self.stats.add_duplicates(source_url, len(emitted) - len(unique))
+            emitted = unique
+
+        self.stats.add_page(source_url, emitted)
+        if not restored:
+            if self.checkpoint and page_data:
+                self.checkpoint.mark_page(source_url, page, emitted)
+            if self.sink:
+                self.sink.write_page(emitted)
+            if self.seen_store:
+                self.seen_store.mark_seen(page_data)
+            if self.listing_store:
+                # Cả tin đã thấy để cập nhật last_seen
+                self.listing_store.upsert(page_data)
+            self.metrics.observe('record', time.perf_counter() - start, source_url)
+            self.metrics.inc('items_emitted', len(emitted), source_url)
+            self.metrics.maybe_flush()
+        if self.sink:
+            return []
+        return emitted
 
-        except Exception as e:
-            logger.error(f"Lỗi khi parse item: {e}")
-            return None
+    def restore_source(self, source_url):
+        """Lấy lại dữ liệu một URL đã crawl xong từ checkpoint"""
+        url_data = []
+        for page, page_data in self.checkpoint.load_pages(source_url).items():
+            url_data.extend(self.record_page(source_url, page, page_data, restored=True))
+        logger.info(f"Bỏ qua {source_url}: đã crawl xong theo checkpoint ({self.stats.count(source_url)} items)")
+        return url_data
 
     def crawl_page(self, url, source_url):
         """Crawl một trang"""
         logger.info(f"Đang crawl: {url}")
         
-        response = self.get_page_content(url)
+        response = self.get_page_content(url, source_url=source_url)
         if not response:
             return []
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        items = soup.find_all('div', class_='content-item')
-        
-        if not items:
+        return self.parse_response(response, url, source_url)
+
+    def parse_response(self, response, url, source_url):
+        """Parse các item từ response của một trang"""
+        with self.metrics.timer('parse', source_url):
+            site = self.site_for(source_url)
+            page_data = site.parse_page(response.content, source_url, self.site_profile(site)[1], self.parser_backend)
+        self.metrics.inc('items_parsed', len(page_data), source_url)
+        if not page_data:
             logger.warning(f"Không tìm thấy items nào trong trang {url}")
             return []
 
-        page_data = []
-        for i, item in enumerate(items, 1):
-            property_data = self.parse_property_item(item, source_url)
-            if property_data and property_data.get('title'):
-                page_data.append(property_data)
-
         logger.info(f"Crawl được {len(page_data)} items từ {url}")
         return page_data
 
     def detect_url_pattern(self, url):
         """Phát hiện pattern URL"""
-        parsed_url = urlparse(url)
-        path = parsed_url.path
-        
-        if path.endswith('.htm') and not '/trang--' in path:
-            base_pattern = path.replace('.htm', '')
-            return f"{parsed_url.scheme}://{parsed_url.netloc}{base_pattern}/trang--{{page}}.htm"
-        
-        if '/trang--' in path:
-            base_pattern = re.sub(r'/trang--\d+\.htm', '', path)
-            return f"{parsed_url.scheme}://{parsed_url.netloc}{base_pattern}/trang--{{page}}.htm"
-        
-        return url.replace('.htm', '/trang--{page}.htm')
-
-    def get_total_pages(self, base_url):
-        """Lấy tổng số trang"""
-        response = self.get_page_content(base_url)
-        if not response:
-            return 1
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        pagination = soup.find('div', class_='pagination') or soup.find('ul', class_='pagination')
-        if not pagination:
-            return 1
-
-        page_links = pagination.find_all('a')
-        max_page = 1
-        
-        for link in page_links:
+        return detect_url_pattern(url)
+
+    def get_page_url(self, crawl_url, page):
+        """URL của trang thứ page (theo cách phân trang của site)"""
+        return self.site_for(crawl_url).get_page_url(crawl_url, page)
+
+    def fetch_first_page(self, crawl_url):
+        """Tải và parse trang 1. Site chưa có profile, hoặc profile đã lưu không còn tải/tìm được tin,
+        thì dò lần lượt các cách tải và selector; trả về (response, items)"""
+        site = self.site_for(crawl_url)
+        profile = self.site_profiles.get(site)
+        if profile or not site.needs_probe:
+            response = self.get_page_content(crawl_url, source_url=crawl_url)
+            page_data = self.parse_response(response, crawl_url, crawl_url) if response else []
+            if page_data or not site.needs_probe:
+                return response, page_data
+            logger.warning(f"Cách tải/selector đã lưu của {site.name} {profile} không còn dùng được, dò lại")
+            self.site_profiles.forget(site, profile)
+
+        with self.site_profiles.probe_lock(site):
+            if self.site_profiles.get(site) not in (None, profile):
+                # Luồng khác vừa dò xong
+                return self.fetch_first_page(crawl_url)
+            return self.probe_site(site, crawl_url)
+
+    def probe_site(self, site, crawl_url):
+        """Thử từng cách tải, với mỗi trang tải được thử từng selector; lưu cách đầu tiên tìm được tin"""
+        fallback = None, []
+        for fetch_method in site.fetch_methods:
+            self.metrics.inc('site_probes', source_url=crawl_url)
             try:
-                page_text = link.get_text(strip=True)
-                if page_text.isdigit():
-                    page_num = int(page_text)
-                    max_page = max(max_page, page_num)
-            except (ValueError, TypeError):
+                response = self.get_page_content(crawl_url, retries=1, source_url=crawl_url, fetch_method=fetch_method)
+            except ImportError as e:
+                logger.warning(f"Bỏ qua cách tải {fetch_method}: {e}")
                 continue
-
-        return min(max_page, 20)  # Giới hạn 20 trang mỗi URL
+            if not response:
+                continue
+            with self.metrics.timer('parse', crawl_url):
+                selector, page_data = site.detect(response.content, crawl_url, self.parser_backend)
+            if page_data:
+                logger.info(f"{site.name}: tải bằng {fetch_method}, thẻ tin '{selector}' ({len(page_data)} items)")
+                self.site_profiles.save(site, fetch_method, selector)
+                self.metrics.inc('items_parsed', len(page_data), crawl_url)
+                fallback = response, page_data
+                break
+            fallback = response, []
+        else:
+            logger.warning(f"Không tìm được tin trong {crawl_url} với mọi cách tải/selector của {site.name}")
+        # Các cách tải thử không được không tính là trang lỗi nếu có một cách tải được
+        if fallback[0] is not None:
+            self.failed_urls.discard(crawl_url)
+        else:
+            self.failed_urls.add(crawl_url)
+        return fallback
+
+    def plan_source(self, crawl_url, max_pages=None):
+        """Số trang cần crawl và items của trang 1; trang 1 chỉ tải một lần, dùng cho cả phân trang lẫn dữ liệu.
+        Trả về (số trang, items trang 1 hoặc None nếu trang 1 sẽ được crawl sau)"""
+        total_pages = self.checkpoint.get_total_pages(crawl_url) if self.checkpoint else None
+        first_page = None
+        if total_pages is None:
+            logger.info(f"Đang crawl: {crawl_url}")
+            response, page_data = self.fetch_first_page(crawl_url)
+            if response:
+                total_pages = self.site_for(crawl_url).total_pages(response.content, crawl_url)
+                if self.checkpoint:
+                    self.checkpoint.set_total_pages(crawl_url, total_pages)
+                first_page = page_data
+            else:
+                # Không đọc được phân trang: crawl đến trang rỗng đầu tiên
+                first_page = []
+                total_pages = max_pages or 1
+        if max_pages is not None:
+            if total_pages > max_pages:
+                self.truncated.add(crawl_url)
+            total_pages = min(total_pages, max_pages)
+        return total_pages, first_page
 
     def crawl_single_url(self, crawl_url, max_pages=None):
         """Crawl một URL"""
         logger.info(f"Bắt đầu crawl URL: {crawl_url}")
         
-        # Lấy tổng số trang
-        if max_pages is None:
-            total_pages = self.get_total_pages(crawl_url)
-        else:
-            total_pages = max_pages
+        if self.checkpoint and self.checkpoint.is_source_done(crawl_url):
+            return self.restore_source(crawl_url)
+        self.caught_up.discard(crawl_url)
+        # Các trang đã crawl xong ở lần chạy trước
+        restored = self.checkpoint.load_pages(crawl_url) if self.checkpoint else {}
+
+        # Lấy tổng số trang (kèm dữ liệu trang 1 nếu vừa tải)
+        total_pages, first_page = self.plan_source(crawl_url, max_pages)
 
-        url_pattern = self.detect_url_pattern(crawl_url)
         url_data = []
+        item_count = 0
+        failed = False
         
         for page in range(1, total_pages + 1):
-            if page == 1:
-                url = crawl_url
-            else:
-                url = url_pattern.format(page=page)
+            if page in restored:
+                url_data.extend(self.record_page(crawl_url, page, restored[page], restored=True))
+                item_count += len(restored[page])
+                continue
+
+            url = self.get_page_url(crawl_url, page)
             
-            page_data = self.crawl_page(url, crawl_url)
-            url_data.extend(page_data)
+            if page == 1 and first_page is not None:
+                page_data = first_page
+            else:
+                page_data = self.crawl_page(url, crawl_url)
+            url_data.extend(self.record_page(crawl_url, page, page_data))
+            item_count += len(page_data)
+            if not page_data and url in self.failed_urls:
+                failed = True
             
             if not page_data and page > 1:
                 logger.info(f"Không có dữ liệu ở trang {page}, có thể đã hết")
                 break
+
+            if crawl_url in self.caught_up:
+                logger.info(f"Trang {page} gồm phần lớn tin đã có, dừng crawl {crawl_url} (incremental)")
+                break
             
-            time.sleep(2)  # Delay giữa các trang
+            self.polite_sleep(2)  # Delay giữa các trang
 
-        logger.info(f"Hoàn thành crawl {crawl_url}: {len(url_data)} items")
+        # Trang lỗi mạng thì để lần chạy sau crawl lại
+        if self.checkpoint and not failed:
+            self.checkpoint.mark_source_done(crawl_url)
+        self.mark_removed_listings(crawl_url, partial=failed or bool(restored))
+
+        logger.info(f"Hoàn thành crawl {crawl_url}: {item_count} items")
         return url_data
 
     def crawl_all_urls(self, urls_list=None, max_pages_per_url=None):
@@ -294,10 +396,16 @@ class AlonhadatMultiCrawler:
         if not self.urls_list:
             logger.error("Không có URL nào để crawl!")
             return []
+        # Tin có last_seen trước thời điểm này là tin lần chạy này chưa thấy
+        self.run_started = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.truncated.clear()
+
+        if self.workers > 1 or self.parse_workers:
+            return self.crawl_all_urls_concurrent(max_pages_per_url)
 
         logger.info(f"Bắt đầu crawl {len(self.urls_list)} URLs")
         
-        all_data = []
+        self.all_data = ListingBatch()
         
         for i, url in enumerate(self.urls_list, 1):
             logger.info(f"Crawl URL {i}/{len(self.urls_list)}: {url}")
@@ -305,97 +413,265 @@ class AlonhadatMultiCrawler:
             try:
                 url_data = self.crawl_single_url(url, max_pages_per_url)
                 
-                # Lưu data theo URL
-                self.url_data[url] = url_data
-                all_data.extend(url_data)
+                # Ghi ngay vào all_data để Ctrl-C vẫn giữ được các URL đã xong
+                self.all_data.extend(url_data)
                 
-                logger.info(f"URL {i} hoàn thành: {len(url_data)} items")
+                logger.info(f"URL {i} hoàn thành: {self.stats.count(url)} items")
                 
                 # Delay giữa các URL
                 if i < len(self.urls_list):
-                    time.sleep(5)
+                    self.polite_sleep(5)
                 
             except Exception as e:
                 logger.error(f"Lỗi khi crawl {url}: {e}")
                 continue
 
-        self.all_data = all_data
-        return all_data
+        return self.all_data
+
+    def finish_source(self, source_url, progress):
+        progress['done'] = True
+        if self.checkpoint and not progress['failed']:
+            self.checkpoint.mark_source_done(source_url)
+        self.mark_removed_listings(source_url, partial=progress['failed'] or bool(progress['restored']))
+
+    def mark_removed_listings(self, source_url, partial=False):
+        """Crawl xong đủ mọi trang của một URL nguồn: tin trong kho của nguồn này mà lần này không thấy
+        được đánh dấu đã gỡ (bỏ qua khi có trang lỗi, trang lấy từ checkpoint, bị cắt --pages hoặc dừng sớm)"""
+        if not self.listing_store or partial or source_url in self.truncated or source_url in self.caught_up:
+            return
+        removed = self.listing_store.mark_removed(source_url, self.run_started)
+        if removed:
+            logger.info(f"{source_url}: {removed} tin không còn trên site so với lần crawl trước")
+            self.metrics.inc('listings_removed', removed, source_url)
+
+    def release_pages(self, source_url, progress):
+        """Ghi nhận các trang đã tải theo đúng thứ tự, dừng ở trang rỗng đầu tiên (giống crawl tuần tự)"""
+        while not progress['done'] and progress['next'] in progress['pages']:
+            page = progress['next']
+            page_data = progress['pages'].pop(page)
+            if not page_data and self.get_page_url(source_url, page) in self.failed_urls:
+                progress['failed'] = True
+            if not page_data and page > 1:
+                self.finish_source(source_url, progress)
+                break
+            restored = page in progress['restored']
+            self.url_data[source_url].extend(self.record_page(source_url, page, page_data, restored))
+            progress['next'] += 1
+            if source_url in self.caught_up:
+                logger.info(f"Trang {page} gồm phần lớn tin đã có, dừng crawl {source_url} (incremental)")
+                self.finish_source(source_url, progress)
+            elif progress['next'] > progress['total']:
+                self.finish_source(source_url, progress)
+
+    def fetch_page(self, url, source_url, page):
+        """Tải một trang và đẩy nội dung thô vào hàng đợi parse (chặn khi hàng đợi đầy)"""
+        logger.info(f"Đang crawl: {url}")
+        response = self.get_page_content(url, source_url=source_url)
+        if not response:
+            return []
+        content = response.content
+        while not self.stop_event.is_set():
+            try:
+                self.raw_pages.put((source_url, page, url, content), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def submit_pages(self, executor, pending, crawl_url, total_pages, progress, first_page=None):
+        """Lấy lại các trang đã xong từ checkpoint rồi đưa tất cả các trang còn lại vào thread pool"""
+        progress['total'] = total_pages
+        if self.checkpoint:
+            for page, page_data in self.checkpoint.load_pages(crawl_url).items():
+                if page <= total_pages:
+                    progress['pages'][page] = page_data
+                    progress['restored'].add(page)
+        if first_page is not None and 1 not in progress['restored']:
+            # Trang 1 đã tải lúc đọc phân trang
+            progress['pages'][1] = first_page
+            progress['submitted'] = 1
+        self.release_pages(crawl_url, progress)
+        self.schedule_pages(executor, pending, crawl_url, progress)
+
+    def schedule_pages(self, executor, pending, crawl_url, progress):
+        """Đưa các trang tiếp theo vào thread pool; chế độ incremental đi từng trang để dừng sớm được"""
+        if progress['done']:
+            return
+        last = progress['next'] if self.seen_store else progress['total']
+        while progress['submitted'] < last:
+            page = progress['submitted'] = progress['submitted'] + 1
+            if page in progress['restored']:
+                continue
+            url = self.get_page_url(crawl_url, page)
+            if self.parse_workers:
+                future = executor.submit(self.fetch_page, url, crawl_url, page)
+            else:
+                future = executor.submit(self.crawl_page, url, crawl_url)
+            pending[future] = (crawl_url, page)
+
+    def dispatch_raw_pages(self, parse_pool, parsing):
+        """Chuyển trang thô từ hàng đợi sang process pool, giới hạn số trang đang parse"""
+        while len(parsing) < self.parse_workers * 2:
+            try:
+                source_url, page, url, content = self.raw_pages.get_nowait()
+            except queue.Empty:
+                return
+            site = self.site_for(source_url)
+            future = parse_pool.submit(site.parse_page, content, source_url, self.site_profile(site)[1],
+                                       self.parser_backend)
+            parsing[future] = (source_url, page, url, time.perf_counter())
+
+    def crawl_all_urls_concurrent(self, max_pages_per_url=None):
+        """Crawl tất cả URLs song song, tốc độ được giới hạn bằng token bucket"""
+        logger.info(f"Bắt đầu crawl song song {len(self.urls_list)} URLs với {self.workers} workers"
+                    f" và {self.parse_workers} process parse")
+
+        # Trang về không theo thứ tự: giữ tạm rồi ghi nhận lần lượt theo số trang
+        progress = {url: {'next': 1, 'submitted': 0, 'pages': {}, 'restored': set(), 'total': None,
+                          'done': False, 'failed': False}
+                    for url in self.urls_list}
+        for url in self.urls_list:
+            self.url_data[url] = ListingBatch()
+            self.caught_up.discard(url)
+
+        self.stop_event.clear()
+        self.raw_pages = queue.Queue(maxsize=self.queue_size)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        parse_pool = None
+        if self.parse_workers:
+            parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, initializer=init_parse_worker)
+
+        # Future -> (URL gốc, số trang); số trang None là bước tải trang 1 và đọc phân trang
+        pending = {}
+        # Future parse -> (URL gốc, số trang, URL trang, lúc gửi đi parse)
+        parsing = {}
+        try:
+            for url in self.urls_list:
+                if self.checkpoint and self.checkpoint.is_source_done(url):
+                    self.url_data[url].extend(self.restore_source(url))
+                    progress[url]['done'] = True
+                else:
+                    pending[executor.submit(self.plan_source, url, max_pages_per_url)] = (url, None)
+
+            while pending or parsing or not self.raw_pages.empty():
+                if parse_pool:
+                    self.dispatch_raw_pages(parse_pool, parsing)
+                done, _ = wait(list(pending) + list(parsing), timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        url, page, page_url, started = parsing.pop(future)
+                        try:
+                            page_data = future.result()
+                        except Exception as e:
+                            logger.error(f"Lỗi khi parse {page_url}: {e}")
+                            page_data = []
+                        self.metrics.observe('parse', time.perf_counter() - started, url)
+                        self.metrics.inc('items_parsed', len(page_data), url)
+                        logger.info(f"Crawl được {len(page_data)} items từ {page_url}")
+                    else:
+                        url, page = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            logger.error(f"Lỗi khi crawl {url} (trang {page}): {e}")
+                            if page is None:
+                                continue
+                            result = []
+
+                        if page is None:
+                            total_pages, first_page = result
+                            self.submit_pages(executor, pending, url, total_pages, progress[url], first_page)
+                            continue
+                        if result is None:
+                            # Trang đã được đẩy vào hàng đợi parse
+                            continue
+                        page_data = result
+
+                    progress[url]['pages'][page] = page_data
+                    self.release_pages(url, progress[url])
+                    self.schedule_pages(executor, pending, url, progress[url])
+        finally:
+            # Ctrl-C hoặc lỗi: dừng fetcher, huỷ các job chưa chạy, giữ lại dữ liệu đã parse
+            self.stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if parse_pool:
+                parse_pool.shutdown(wait=True, cancel_futures=True)
+
+            for url in self.urls_list:
+                logger.info(f"Hoàn thành crawl {url}: {self.stats.count(url)} items")
+            self.all_data = ListingBatch.concat(self.url_data[url] for url in self.urls_list)
+            self.url_data.clear()
+
+        return self.all_data
+
+    def build_export_frame(self, data=None):
+        """DataFrame theo đúng thứ tự cột export (COLUMN_ORDER rồi đến các cột trang chi tiết)"""
+        import pandas as pd
+
+        data = self.all_data if data is None else data
+        df = data.to_frame() if isinstance(data, ListingBatch) else pd.DataFrame(data)
+        return df[[col for col in SCHEMA if col in df.columns]]
+
+    def save_to_parquet(self, path='alonhadat_multi_crawl', file_format='parquet'):
+        """Lưu dữ liệu dạng cột (Parquet hoặc Arrow IPC), mỗi source_name một thư mục con"""
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as pa_dataset
+        except ImportError:
+            raise ImportError("Cần cài pyarrow để export Parquet/Arrow: pip install pyarrow")
+        import pandas as pd
 
-    def save_to_excel(self, filename='alonhadat_multi_crawl.xlsx'):
-        """Lưu dữ liệu ra file Excel với nhiều sheet"""
         if not self.all_data:
             logger.warning("Không có dữ liệu để lưu")
             return
 
-        # Cột order
-        column_order = [
-            'source_name', 'title', 'price', 'area', 'area_text', 'dimensions', 
-            'direction', 'floors', 'road_width', 'address', 'description', 
-            'post_date', 'vip_level', 'detail_url', 'image_url', 'source_url', 'crawl_time'
-        ]
-
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            # Sheet 1: Tất cả dữ liệu
-            df_all = pd.DataFrame(self.all_data)
-            available_columns = [col for col in column_order if col in df_all.columns]
-            df_all_ordered = df_all[available_columns]
-            df_all_ordered.to_excel(writer, sheet_name='All_Data', index=False)
-            
-            # Sheet 2: Thống kê tổng quan
-            stats_data = []
-            for url, data in self.url_data.items():
-                url_name = self.get_url_name(url)
-                stats_data.append({
-                    'URL': url_name,
-                    'Full_URL': url,
-                    'Total_Items': len(data),
-                    'Has_Price': len([item for item in data if item.get('price')]),
-                    'Has_Area': len([item for item in data if item.get('area')]),
-                    'VIP_Items': len([item for item in data if item.get('vip_level')])
-                })
-            
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='Statistics', index=False)
-            
-            # Sheet riêng cho từng URL (tối đa 10 sheet)
-            for i, (url, data) in enumerate(self.url_data.items()):
-                if i >= 10:  # Giới hạn số sheet
-                    break
-                    
-                if data:
-                    url_name = self.get_url_name(url)
-                    # Tạo tên sheet hợp lệ
-                    sheet_name = re.sub(r'[\\/*?:"<>|]', '', url_name)[:31]
-                    
-                    df_url = pd.DataFrame(data)
-                    available_columns = [col for col in column_order if col in df_url.columns]
-                    df_url_ordered = df_url[available_columns]
-                    df_url_ordered.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            # Tự động điều chỉnh độ rộng cột cho tất cả sheet
-            for sheet_name in writer.sheets:
-                worksheet = writer.sheets[sheet_name]
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
+        df = self.build_export_frame()
+        if 'area' in df.columns:
+            df['area'] = pd.to_numeric(df['area'], errors='coerce')
+        if 'crawl_time' in df.columns:
+            df['crawl_time'] = pd.to_datetime(df['crawl_time'], errors='coerce')
+        for column, dtype in NUMERIC_COLUMNS.items():
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        extension = 'parquet' if file_format == 'parquet' else 'arrow'
+        pa_dataset.write_dataset(
+            table, path,
+            format='parquet' if file_format == 'parquet' else 'ipc',
+            partitioning=pa_dataset.partitioning(pa.schema([('source_name', pa.string())]), flavor='hive'),
+            basename_template=f'part-{{i}}.{extension}',
+            existing_data_behavior='delete_matching',
+        )
+
+        logger.info(f"Đã lưu {len(df)} items vào {path}/ ({file_format}, chia theo source_name)")
+        return path
+
+    def save_to_excel(self, filename='alonhadat_multi_crawl.xlsx', sheets='copy'):
+        """Lưu dữ liệu ra file Excel với nhiều sheet (sheets: copy/view/none, xem excel_export.SHEET_MODES)"""
+        if not self.all_data:
+            logger.warning("Không có dữ liệu để lưu")
+            return
 
+        from excel_export import write_workbook
+        from summary import fill_rate_rows, statistics_rows
+
+        df = self.build_export_frame()
+        summary = self.summarize(df)
+        write_workbook(filename, df, {'Statistics': statistics_rows(summary), 'Fill_Rates': fill_rate_rows(summary)},
+                       sheets)
         logger.info(f"Đã lưu {len(self.all_data)} items vào {filename}")
         return filename
 
-    def print_summary(self):
+    def summarize(self, df=None):
+        """Thống kê đầy đủ trên dữ liệu trong bộ nhớ: tỉ lệ có dữ liệu, phân bố VIP, phân vị giá/diện tích"""
+        from summary import summarize
+
+        return summarize(self.build_export_frame() if df is None else df, self.stats.duplicates())
+
+    def print_summary(self, summary=None):
         """In thống kê tóm tắt"""
-        if not self.all_data:
+        totals = self.stats.totals()
+        if not totals['total']:
             logger.info("Không có dữ liệu")
             return
 
@@ -403,22 +679,40 @@ class AlonhadatMultiCrawler:
         print(f"THỐNG KÊ CRAWL MULTI URLs")
         print(f"{'='*80}")
         print(f"Tổng số URLs: {len(self.urls_list)}")
-        print(f"Tổng số items: {len(self.all_data)}")
-        
+        print(f"Tổng số items: {totals['total']}")
+
+        if self.all_data:
+            from summary import format_table
+
+            print()
+            print(format_table(summary or self.summarize()))
+            return
+
+        # Chế độ --stream: dữ liệu không nằm trong bộ nhớ, dùng bộ đếm cộng dồn lúc crawl
         print(f"\nThống kê theo từng URL:")
-        for url, data in self.url_data.items():
-            url_name = self.get_url_name(url)
-            print(f"  {url_name}: {len(data)} items")
+        for row in self.stats.rows():
+            duplicates = f" (bỏ {row['Duplicates']} tin trùng)" if row['Duplicates'] else ''
+            print(f"  {row['URL']}: {row['Total_Items']} items{duplicates}")
         
         # Thống kê VIP
-        vip_count = len([item for item in self.all_data if item.get('vip_level')])
-        print(f"\nTổng tin VIP: {vip_count}/{len(self.all_data)}")
+        print(f"\nTổng tin VIP: {totals['vip']}/{totals['total']}")
         
         # Thống kê có giá/diện tích
-        has_price = len([item for item in self.all_data if item.get('price')])
-        has_area = len([item for item in self.all_data if item.get('area')])
-        print(f"Có giá: {has_price}/{len(self.all_data)}")
-        print(f"Có diện tích: {has_area}/{len(self.all_data)}")
+        print(f"Có giá: {totals['has_price']}/{totals['total']}")
+        print(f"Có diện tích: {totals['has_area']}/{totals['total']}")
+        if self.dedup:
+            print(f"Tin trùng đã bỏ: {totals['duplicates']}")
+
+def default_output_name(prefix, export_format):
+    """Tên file/thư mục output mặc định kèm thời gian"""
+    name = f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+    return f'{name}.xlsx' if export_format == 'excel' else name
+
+def save_output(crawler, output_file, export_format, excel_sheets='copy'):
+    with crawler.metrics.timer('export'):
+        if export_format == 'excel':
+            return crawler.save_to_excel(output_file, excel_sheets)
+        return crawler.save_to_parquet(output_file, export_format)
 
 def parse_urls_input(urls_input):
     """Parse input URLs từ nhiều format khác nhau"""
@@ -440,20 +734,54 @@ def parse_urls_input(urls_input):
     # Validate URLs
     valid_urls = []
     for url in urls:
-        if 'alonhadat.com.vn' in url:
+        if find_site(url):
             valid_urls.append(url)
         else:
-            logger.warning(f"URL không hợp lệ (bỏ qua): {url}")
+            logger.warning(f"URL không hợp lệ hoặc site chưa hỗ trợ (bỏ qua): {url}")
     
     return valid_urls
 
 def main():
     """Hàm main"""
-    parser = argparse.ArgumentParser(description='Crawl nhiều URLs từ alonhadat.com.vn')
+    domains = ', '.join(domain for site in SITES.values() for domain in site.domains)
+    parser = argparse.ArgumentParser(description=f'Crawl nhiều URLs từ {domains}')
     parser.add_argument('--urls', '-u', type=str, help='URLs cần crawl (JSON array hoặc cách nhau bởi dấu phẩy)')
     parser.add_argument('--file', '-f', type=str, help='File chứa danh sách URLs (mỗi dòng một URL)')
     parser.add_argument('--pages', '-p', type=int, default=5, help='Số trang tối đa mỗi URL')
     parser.add_argument('--output', '-o', type=str, help='Tên file output')
+    parser.add_argument('--yes', '-y', action='store_true', help='Không hỏi xác nhận trước khi crawl (chạy tự động)')
+    parser.add_argument('--format', default='excel', choices=EXPORT_FORMATS, help='Định dạng output: Excel, hoặc Parquet/Arrow IPC chia thư mục theo source_name')
+    parser.add_argument('--excel-sheets', default='copy', choices=['copy', 'view', 'none'], help='Sheet theo URL: copy = bản sao dữ liệu (tối đa 10), view = All_Data xếp theo URL có bộ lọc + sheet Index, none = không có')
+    parser.add_argument('--stream', '-s', type=str, help='Ghi từng trang ra file .csv/.jsonl ngay khi parse xong (không giữ trong bộ nhớ, không xuất Excel)')
+    parser.add_argument('--checkpoint', '-c', type=str, help='File SQLite lưu tiến độ, chạy lại sẽ tiếp tục từ trang chưa xong')
+    parser.add_argument('--import-done', type=str, help='Đánh dấu xong các URL trong file danh sách cũ (vd. dachay.txt), cần --checkpoint')
+    parser.add_argument('--cache', type=str, help='Thư mục cache HTTP (gửi If-None-Match/If-Modified-Since ở lần chạy sau)')
+    parser.add_argument('--cache-ttl', type=int, default=3600, help='Số giây dùng thẳng cache không cần hỏi lại server')
+    parser.add_argument('--cache-size', type=int, default=500, help='Dung lượng cache tối đa (MB), vượt thì xoá trang lâu không dùng')
+    parser.add_argument('--offline', action='store_true', help='Chỉ parse từ cache, không gửi request (cần --cache)')
+    parser.add_argument('--incremental', type=str, help='File SQLite các tin đã thấy: chỉ ghi tin mới/đã đổi và dừng sớm khi gặp tin cũ')
+    parser.add_argument('--known-threshold', type=float, default=0.8, help='Tỉ lệ tin đã thấy trong một trang để dừng phân trang (incremental)')
+    parser.add_argument('--no-dedup', action='store_true', help='Giữ cả các tin trùng giữa các URL/trang (mặc định tin trùng giữa các URL '
+                        'được giữ ở URL đứng trước trong danh sách; chạy song song thì ở URL có trang về trước, có thể khác nhau giữa các lần chạy)')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Số luồng crawl song song (1 = tuần tự)')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Số process parse HTML (0 = parse ngay trong luồng tải)')
+    parser.add_argument('--parser', default='html.parser', choices=list(PARSER_BACKENDS), help='Backend parse HTML')
+    parser.add_argument('--rps', type=float, help=f'Số request tối đa mỗi giây cho mỗi host (mặc định {DEFAULT_REQUESTS_PER_SECOND} khi chạy song song)')
+    parser.add_argument('--site-cache', type=str, help='File SQLite lưu cách tải/selector dùng được của từng site, lần sau không phải dò lại')
+    parser.add_argument('--store', type=str, help='File SQLite kho tin có index (upsert mỗi lần chạy), lọc/xuất bằng listing_store.py')
+    parser.add_argument('--no-snapshot', action='store_true', help='Chỉ cập nhật kho --store (kèm lịch sử giá/trạng thái), không ghi file snapshot mỗi lần chạy')
+    parser.add_argument('--enrich', type=str, help='Tải trang chi tiết (SĐT, pháp lý, mô tả đầy đủ, toạ độ), lưu vào file SQLite này để lần sau không tải lại')
+    parser.add_argument('--enrich-workers', type=int, default=4, help='Số luồng tải trang chi tiết (không quá số request mỗi giây được phép)')
+    parser.add_argument('--adaptive', action='store_true', help='Tự điều chỉnh tốc độ/số request đồng thời theo phản hồi của server (bắt đầu từ --rps)')
+    parser.add_argument('--max-rps', type=float, help='Tốc độ tối đa mỗi host khi --adaptive (mặc định 5 lần --rps)')
+    parser.add_argument('--pool-size', type=int, help='Số kết nối keep-alive tối đa mỗi host (mặc định max(10, số luồng tải))')
+    parser.add_argument('--connect-timeout', type=float, default=DEFAULT_CONNECT_TIMEOUT, help='Timeout mở kết nối (giây)')
+    parser.add_argument('--read-timeout', type=float, default=DEFAULT_READ_TIMEOUT, help='Timeout chờ dữ liệu (giây)')
+    parser.add_argument('--http2', action='store_true', help='Dùng HTTP/2 qua httpx (cần pip install "httpx[http2]")')
+    parser.add_argument('--summary-json', type=str, help='Ghi thống kê (tỉ lệ có dữ liệu, phân bố VIP, phân vị giá/diện tích) ra file JSON')
+    parser.add_argument('--metrics-json', type=str, help='Ghi báo cáo thời gian/bộ đếm theo giai đoạn ra file JSON khi kết thúc')
+    parser.add_argument('--prometheus', type=str, help='File .prom (định dạng text Prometheus) được cập nhật trong lúc crawl')
+    parser.add_argument('--prometheus-interval', type=float, default=15.0, help='Số giây giữa hai lần cập nhật file --prometheus')
     
     args = parser.parse_args()
     
@@ -492,36 +820,111 @@ def main():
     for i, url in enumerate(urls_list, 1):
         print(f"  {i}. {url}")
     
-    confirm = input(f"\nTiếp tục crawl? (y/n): ").lower()
+    confirm = 'y' if args.yes else input(f"\nTiếp tục crawl? (y/n): ").lower()
     if confirm != 'y':
         print("Đã hủy!")
         sys.exit(0)
     
     # Tạo crawler
-    crawler = AlonhadatMultiCrawler(urls_list)
+    sink = open_sink(args.stream) if args.stream else None
+    checkpoint = CheckpointStore(args.checkpoint) if args.checkpoint else None
+    if args.import_done:
+        if not checkpoint:
+            print("--import-done cần dùng kèm --checkpoint")
+            sys.exit(1)
+        checkpoint.import_done_list(args.import_done)
+    if args.offline and not args.cache:
+        print("--offline cần dùng kèm --cache")
+        sys.exit(1)
+    if args.no_snapshot and not args.store:
+        print("--no-snapshot cần dùng kèm --store")
+        sys.exit(1)
+    if args.enrich and sink:
+        print("--enrich không dùng được với --stream (dữ liệu không giữ trong bộ nhớ)")
+        sys.exit(1)
+    detail_store = DetailStore(args.enrich) if args.enrich else None
+    http_cache = HttpCache(args.cache, ttl=args.cache_ttl, max_bytes=args.cache_size * 1024 * 1024) if args.cache else None
+    seen_store = SeenStore(args.incremental) if args.incremental else None
+    listing_store = ListingStore(args.store) if args.store else None
+    site_profiles = SiteProfiles(args.site_cache)
+    metrics = CrawlMetrics(args.prometheus, args.prometheus_interval)
+    # Pool đủ cho cả luồng tải trang danh sách và luồng tải trang chi tiết
+    pool_size = args.pool_size or max(10, args.workers, args.enrich_workers if args.enrich else 0)
+    transport = create_transport(pool_size, args.connect_timeout, args.read_timeout, args.http2)
+    crawler = AlonhadatMultiCrawler(urls_list, workers=args.workers, rate_limit=args.rps,
+                                    parse_workers=args.parse_workers, parser_backend=args.parser,
+                                    sink=sink, checkpoint=checkpoint, http_cache=http_cache,
+                                    offline=args.offline, seen_store=seen_store,
+                                    known_threshold=args.known_threshold, dedup=not args.no_dedup,
+                                    metrics=metrics, adaptive=args.adaptive, max_rate=args.max_rps,
+                                    transport=transport, listing_store=listing_store, site_profiles=site_profiles)
     
     try:
         # Crawl dữ liệu
-        data = crawler.crawl_all_urls(max_pages_per_url=args.pages)
+        crawler.crawl_all_urls(max_pages_per_url=args.pages)
+
+        # Bổ sung thông tin từ trang chi tiết
+        if detail_store and crawler.all_data:
+            DetailEnricher(crawler, detail_store, args.enrich_workers).enrich(crawler.all_data)
+            if listing_store:
+                listing_store.upsert(crawler.all_data)
         
-        if data:
+        if crawler.stats.total_items:
             # In thống kê
-            crawler.print_summary()
-            
-            # Lưu dữ liệu
-            output_file = args.output or f'alonhadat_multi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            crawler.save_to_excel(output_file)
+            summary = crawler.summarize() if crawler.all_data else None
+            crawler.print_summary(summary)
+            if args.summary_json and summary:
+                from summary import write_json
+
+                write_json(summary, args.summary_json)
+                logger.info(f"Đã ghi thống kê vào {args.summary_json}")
             
-            print(f"\nHoàn thành! Dữ liệu đã được lưu vào: {output_file}")
+            if sink:
+                print(f"\nHoàn thành! Dữ liệu đã được ghi vào: {args.stream}")
+            elif args.no_snapshot:
+                print(f"\nHoàn thành! Dữ liệu đã được cập nhật vào kho: {args.store}")
+            else:
+                # Lưu dữ liệu
+                output_file = args.output or default_output_name('alonhadat_multi', args.format)
+                save_output(crawler, output_file, args.format, args.excel_sheets)
+                
+                print(f"\nHoàn thành! Dữ liệu đã được lưu vào: {output_file}")
         else:
             logger.warning("Không crawl được dữ liệu nào")
             
     except KeyboardInterrupt:
         logger.info("Đã dừng crawl theo yêu cầu người dùng")
-        if crawler.all_data:
-            output_file = f'partial_multi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            crawler.save_to_excel(output_file)
+        if sink:
+            logger.info(f"Dữ liệu đã crawl được nằm trong: {args.stream}")
+        elif crawler.all_data and not args.no_snapshot:
+            output_file = default_output_name('partial_multi', args.format)
+            save_output(crawler, output_file, args.format, args.excel_sheets)
             logger.info(f"Đã lưu dữ liệu partial: {output_file}")
+    finally:
+        if sink:
+            sink.close()
+        if checkpoint:
+            checkpoint.close()
+        if seen_store:
+            seen_store.close()
+        if detail_store:
+            detail_store.close()
+        if listing_store:
+            listing_store.close()
+        if http_cache:
+            logger.info(f"Cache HTTP: {http_cache.counters}")
+            http_cache.close()
+        site_profiles.close()
+        logger.info(f"Kết nối: {transport.stats()}")
+        crawler.fetchers.close()
+        transport.close()
+        if args.adaptive:
+            logger.info(f"Tốc độ cuối cùng theo host: {crawler.rate_limiter.snapshot()}")
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+            logger.info(f"Đã ghi báo cáo metrics vào {args.metrics_json}")
+        if args.prometheus:
+            metrics.write_prometheus()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
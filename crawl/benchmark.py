@@ -0,0 +1,396 @@
+# benchmark.py - Đo tốc độ crawler trên dữ liệu đã lưu, không cần mạng
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import FIXTURES_DIR, SOURCE_URL, load_fixtures
+from parsers import available_parsers, get_page_parser
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = os.path.join(FIXTURES_DIR, 'benchmark_baseline.json')
+
+# Chỉ số -> True nếu càng lớn càng tốt
+METRICS = {
+    'pages_per_sec': True,
+    'listings_per_sec': True,
+    'parse_ms_per_item': False,
+    'peak_rss_mb': False,
+    'excel_export_sec': False,
+    'parquet_export_sec': False,
+}
+
+PAGE_RE = re.compile(r'/trang--(\d+)\.html?$')
+PAGINATION_RE = re.compile(r'<div class="pagination">.*?</div>', re.DOTALL)
+EMPTY_PAGE = b'<!DOCTYPE html><html><body><div class="content-items"></div></body></html>'
+
+
+class StandInServer:
+    """Server HTTP cục bộ giả lập alonhadat bằng các trang đã lưu, có độ trễ và tỉ lệ lỗi cấu hình được"""
+
+    def __init__(self, pages=5, latency=0.02, jitter=0.01, error_rate=0.0, seed=1, retry_after=None):
+        fixtures = load_fixtures()
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        # Đường dẫn các request đã nhận, theo thứ tự
+        self.paths = []
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+        first_page = fixtures['listing_page_1.html'].decode('utf-8')
+        self.first_page = PAGINATION_RE.sub(self.pagination_html(), first_page).encode('utf-8')
+        self.next_page = fixtures['listing_page_2.html']
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def pagination_html(self):
+        links = ''.join(f'<a href="/trang--{page}.html">{page}</a>' for page in range(1, self.pages + 1))
+        return f'<div class="pagination">{links}</div>'
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def source_urls(self, count):
+        return [f"{self.base_url}/nha-dat/can-ban/nha-dat/{i}/tinh-{i}.html" for i in range(1, count + 1)]
+
+    def handle(self, handler):
+        with self.lock:
+            self.requests += 1
+            self.paths.append(handler.path)
+            fail = self.random.random() < self.error_rate
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+
+        if fail:
+            with self.lock:
+                self.errors += 1
+            handler.send_response(503)
+            if self.retry_after is not None:
+                handler.send_header('Retry-After', str(self.retry_after))
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+
+        match = PAGE_RE.search(handler.path)
+        page = int(match.group(1)) if match else 1
+        if page == 1:
+            body = self.first_page
+        elif page <= self.pages:
+            body = self.next_page
+        else:
+            body = EMPTY_PAGE
+
+        # ETag theo nội dung: request có If-None-Match khớp thì trả 304 không kèm body
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if handler.headers.get('If-None-Match') == etag:
+            with self.lock:
+                self.not_modified += 1
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header('ETag', etag)
+        handler.send_header('Content-Type', 'text/html; charset=utf-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        with self.lock:
+            self.bytes_sent += len(body)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_parsers(repeat=20, backends=None):
+    """Số listing parse được mỗi giây cho từng backend"""
+    fixtures = list(load_fixtures().values())
+    results = {}
+
+    for name in backends or available_parsers():
+        parse = get_page_parser(name)
+        items = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for content in fixtures:
+                items += len(parse(content, SOURCE_URL))
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'items': items,
+            'seconds': round(elapsed, 4),
+            'listings_per_sec': round(items / elapsed, 1) if elapsed else 0.0,
+        }
+    return results
+
+
+def print_parser_results(results):
+    baseline = results.get('html.parser', {}).get('listings_per_sec')
+    print(f"\n{'Backend':<14}{'Listings':>10}{'Giây':>10}{'Listings/s':>14}{'x html.parser':>16}")
+    for name, result in results.items():
+        speedup = f"{result['listings_per_sec'] / baseline:.1f}x" if baseline else '-'
+        print(f"{name:<14}{result['items']:>10}{result['seconds']:>10}{result['listings_per_sec']:>14}{speedup:>16}")
+
+
+def peak_rss_mb():
+    """Bộ nhớ RSS cao nhất của process (và các process parse con), MB"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(peak, children) / scale, 1)
+
+
+def bench_crawl(sources=5, pages=5, workers=4, parse_workers=0, parser_backend='html.parser',
+                latency=0.02, error_rate=0.0, rps=1000.0):
+    """Chạy AlonhadatMultiCrawler end-to-end trên server giả lập và đo các chỉ số"""
+    from a import AlonhadatMultiCrawler
+
+    with StandInServer(pages=pages, latency=latency, error_rate=error_rate) as server:
+        crawler = AlonhadatMultiCrawler(server.source_urls(sources), workers=workers, rate_limit=rps,
+                                        parse_workers=parse_workers, parser_backend=parser_backend,
+                                        dedup=False)
+        start = time.perf_counter()
+        crawler.crawl_all_urls()
+        crawl_seconds = time.perf_counter() - start
+        requests_served = server.requests
+        errors = server.errors
+        connections = crawler.transport.stats()
+
+    items = crawler.stats.total_items
+    parse = get_page_parser(parser_backend)
+    fixtures = list(load_fixtures().values())
+    start = time.perf_counter()
+    parsed = sum(len(parse(content, SOURCE_URL)) for content in fixtures)
+    parse_ms_per_item = (time.perf_counter() - start) * 1000 / parsed
+
+    # Import trước các thư viện export (được import lười) để không tính thời gian import vào export
+    import excel_export  # noqa: F401
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+
+    export_dir = tempfile.mkdtemp(prefix='alonhadat_bench_')
+    try:
+        start = time.perf_counter()
+        crawler.save_to_excel(os.path.join(export_dir, 'bench.xlsx'))
+        excel_seconds = time.perf_counter() - start
+
+        parquet_seconds = None
+        try:
+            start = time.perf_counter()
+            crawler.save_to_parquet(os.path.join(export_dir, 'bench_parquet'))
+            parquet_seconds = round(time.perf_counter() - start, 4)
+        except ImportError:
+            logger.warning("⚠️ Chưa cài pyarrow, bỏ qua export Parquet")
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+    return {
+        'config': {
+            'sources': sources, 'pages': pages, 'workers': workers, 'parse_workers': parse_workers,
+            'parser': parser_backend, 'latency': latency, 'error_rate': error_rate,
+        },
+        'requests': requests_served,
+        'errors': errors,
+        'items': items,
+        'connections_opened': connections['connections_opened'],
+        'connection_reuse_ratio': connections['reuse_ratio'],
+        'crawl_sec': round(crawl_seconds, 4),
+        'pages_per_sec': round(requests_served / crawl_seconds, 2),
+        'listings_per_sec': round(items / crawl_seconds, 1),
+        'parse_ms_per_item': round(parse_ms_per_item, 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'excel_export_sec': round(excel_seconds, 4),
+        'parquet_export_sec': parquet_seconds,
+    }
+
+
+def legacy_save_excel(df, stats_rows, filename):
+    """Cách xuất Excel cũ (pandas + openpyxl, đo độ rộng từng ô) để so sánh"""
+    import pandas as pd
+    from excel_export import sheet_title
+
+    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='All_Data', index=False)
+        pd.DataFrame(stats_rows).to_excel(writer, sheet_name='Statistics', index=False)
+        for i, (url, df_url) in enumerate(df.groupby('source_url', sort=False, observed=True)):
+            if i >= 10:
+                break
+            df_url.to_excel(writer, sheet_name=sheet_title(url), index=False)
+        for worksheet in writer.sheets.values():
+            for column in worksheet.columns:
+                max_length = max(len(str(cell.value)) for cell in column)
+                worksheet.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+
+
+def bench_excel(rows=20000, sources=12):
+    """Thời gian xuất Excel: cách cũ so với ghi stream (từng engine, từng chế độ sheet)"""
+    from excel_export import SHEET_MODES, write_workbook
+    from records import ListingBatch
+    from stats import RunningStats
+
+    parse = get_page_parser('html.parser')
+    items = [item for content in load_fixtures().values() for item in parse(content, SOURCE_URL)]
+    batch, stats = ListingBatch(), RunningStats()
+    for index in range(rows):
+        item = dict(items[index % len(items)])
+        item['source_url'] = f"{SOURCE_URL.rsplit('.', 1)[0]}-{index % sources}.html"
+        batch.append(item)
+        stats.add_page(item['source_url'], [item])
+    df = batch.to_frame()
+
+    engines = ['openpyxl']
+    try:
+        import xlsxwriter  # noqa: F401
+        engines.append('xlsxwriter')
+    except ImportError:
+        logger.warning("⚠️ Chưa cài xlsxwriter, chỉ đo engine openpyxl")
+
+    export_dir = tempfile.mkdtemp(prefix='alonhadat_bench_')
+    results = {}
+    try:
+        start = time.perf_counter()
+        legacy_save_excel(df, stats.rows(), os.path.join(export_dir, 'legacy.xlsx'))
+        results['legacy'] = {'seconds': round(time.perf_counter() - start, 3)}
+        for engine in engines:
+            for mode in SHEET_MODES:
+                filename = os.path.join(export_dir, f'{engine}_{mode}.xlsx')
+                start = time.perf_counter()
+                write_workbook(filename, df, {'Statistics': stats.rows()}, mode, engine)
+                results[f'{engine}/{mode}'] = {
+                    'seconds': round(time.perf_counter() - start, 3),
+                    'mb': round(os.path.getsize(filename) / 1024 / 1024, 2),
+                }
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+    return results
+
+
+def print_excel_results(rows, results):
+    legacy = results['legacy']['seconds']
+    print(f"\n{'Excel (' + str(rows) + ' dòng)':<22}{'Giây':>10}{'MB':>8}{'x cũ':>8}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['seconds']:>10}{result.get('mb', '-'):>8}{legacy / result['seconds']:>7.1f}x")
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(result, path=BASELINE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    logger.info(f"💾 Đã lưu baseline vào {path}")
+
+
+def compare_with_baseline(result, baseline, tolerance=0.2):
+    """In bảng so sánh với baseline, trả về danh sách chỉ số bị chậm đi quá tolerance"""
+    regressions = []
+    print(f"\n{'Chỉ số':<22}{'Hiện tại':>12}{'Baseline':>12}{'Thay đổi':>12}")
+    for metric, higher_is_better in METRICS.items():
+        current, previous = result.get(metric), baseline.get(metric)
+        if current is None or not previous:
+            print(f"{metric:<22}{str(current):>12}{str(previous):>12}{'-':>12}")
+            continue
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        flag = ' ⚠️' if worse > tolerance else ''
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<22}{current:>12}{previous:>12}{change:>+11.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline cho crawler alonhadat')
+    parser.add_argument('suite', nargs='?', default='all', choices=['parsers', 'crawl', 'excel', 'all'], help='Nhóm benchmark cần chạy')
+    parser.add_argument('--repeat', '-r', type=int, default=20, help='Số lần parse lại mỗi fixture')
+    parser.add_argument('--parser', action='append', help='Chỉ đo backend này (có thể lặp lại)')
+    parser.add_argument('--sources', type=int, default=5, help='Số URL nguồn giả lập')
+    parser.add_argument('--pages', type=int, default=5, help='Số trang mỗi URL nguồn')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Số luồng crawl')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Số process parse')
+    parser.add_argument('--latency', type=float, default=0.02, help='Độ trễ mỗi response của server giả lập (giây)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Tỉ lệ response 503 của server giả lập')
+    parser.add_argument('--rows', type=int, default=20000, help='Số dòng cho benchmark xuất Excel')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='File baseline để so sánh')
+    parser.add_argument('--save-baseline', action='store_true', help='Ghi kết quả lần này làm baseline mới')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Mức chậm đi cho phép so với baseline')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Hiện log của crawler')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.suite in ('parsers', 'all'):
+        print_parser_results(bench_parsers(args.repeat, args.parser))
+
+    if args.suite in ('excel', 'all'):
+        print_excel_results(args.rows, bench_excel(args.rows))
+
+    if args.suite in ('crawl', 'all'):
+        result = bench_crawl(args.sources, args.pages, args.workers, args.parse_workers,
+                             (args.parser or ['html.parser'])[0], args.latency, args.error_rate)
+        print(f"\n{json.dumps(result, ensure_ascii=False, indent=2)}")
+
+        if args.save_baseline:
+            save_baseline(result, args.baseline)
+            return
+
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            logger.warning(f"⚠️ Chưa có baseline ({args.baseline}), chạy với --save-baseline để tạo")
+            return
+        if baseline.get('config') != result['config']:
+            logger.warning(f"⚠️ Cấu hình khác baseline: {baseline.get('config')}")
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Chậm hơn baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """Lưu tiến độ crawl (URL nguồn, số trang) vào SQLite để chạy tiếp sau khi bị dừng"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sources (
+                source_url TEXT PRIMARY KEY,
+                total_pages INTEGER,
+                completed_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                source_url TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                item_count INTEGER NOT NULL,
+                items TEXT NOT NULL,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (source_url, page)
+            );
+        ''')
+
+    def now(self):
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def get_total_pages(self, source_url):
+        with self.lock:
+            row = self.conn.execute('SELECT total_pages FROM sources WHERE source_url = ?',
+                                    (source_url,)).fetchone()
+        return row[0] if row else None
+
+    def set_total_pages(self, source_url, total_pages):
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO sources (source_url, total_pages) VALUES (?, ?)
+                ON CONFLICT(source_url) DO UPDATE SET total_pages = excluded.total_pages
+            ''', (source_url, total_pages))
+
+    def mark_page(self, source_url, page, page_data):
+        """Ghi nhận một trang đã crawl xong cùng các item của nó"""
+        items = json.dumps(page_data, ensure_ascii=False)
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                              (source_url, page, len(page_data), items, self.now()))
+
+    def load_pages(self, source_url):
+        """Các trang đã crawl xong: {số trang: list item}"""
+        with self.lock:
+            rows = self.conn.execute('SELECT page, items FROM pages WHERE source_url = ? ORDER BY page',
+                                     (source_url,)).fetchall()
+        return {page: json.loads(items) for page, items in rows}
+
+    def mark_source_done(self, source_url):
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO sources (source_url, completed_at) VALUES (?, ?)
+                ON CONFLICT(source_url) DO UPDATE SET completed_at = excluded.completed_at
+            ''', (source_url, self.now()))
+
+    def is_source_done(self, source_url):
+        with self.lock:
+            row = self.conn.execute('SELECT completed_at FROM sources WHERE source_url = ?',
+                                    (source_url,)).fetchone()
+        return bool(row and row[0])
+
+    def import_done_list(self, path):
+        """Đánh dấu xong các URL trong file danh sách cũ (vd. dachay.txt)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+        for url in urls:
+            self.mark_source_done(url)
+        logger.info(f"Đã đánh dấu {len(urls)} URL hoàn thành từ {path}")
+        return urls
+
+    def summary(self):
+        with self.lock:
+            done = self.conn.execute('SELECT COUNT(*) FROM sources WHERE completed_at IS NOT NULL').fetchone()[0]
+            pages, items = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(item_count), 0) FROM pages').fetchone()
+        return {'sources_done': done, 'pages_done': pages, 'items': items}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,223 @@
+# daemon.py - Chạy nền: crawl lại từng URL nguồn theo chu kỳ riêng, giữ session/kết nối giữa các lần chạy
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from a import (DEFAULT_REQUESTS_PER_SECOND, EXPORT_FORMATS, AlonhadatMultiCrawler, parse_urls_input,
+               save_output)
+from http_cache import HttpCache
+from listing_store import ListingStore
+from metrics import CrawlMetrics
+from rate_limiter import AdaptiveRateLimiter, HostRateLimiter
+from seen_store import SeenStore
+from sinks import open_sink
+from sites import SiteProfiles
+from transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, FetchMethods, create_transport
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ScheduledSource:
+    """Một URL nguồn với chu kỳ crawl riêng"""
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.next_run = 0.0
+        self.runs = 0
+        self.last_items = None
+        self.last_finished = None
+
+
+class CrawlScheduler:
+    """Lập lịch crawl định kỳ dùng chung một transport (pool kết nối), rate limiter, cache và seen-store
+    cho mọi lần chạy; một URL đang crawl dở thì không được khởi động lần nữa"""
+
+    def __init__(self, sources, pages=None, workers=4, max_runs=2, rate_limit=None, parser_backend='html.parser',
+                 adaptive=False, output_dir='daemon_output', export_format='excel', excel_sheets='copy', sink=None,
+                 seen_store=None, http_cache=None, metrics=None, transport=None, listing_store=None,
+                 site_profiles=None):
+        self.sources = {source.url: source for source in sources}
+        self.pages = pages
+        self.workers = workers
+        self.parser_backend = parser_backend
+        self.output_dir = output_dir
+        self.export_format = export_format
+        self.excel_sheets = excel_sheets
+        self.sink = sink
+        self.seen_store = seen_store
+        self.listing_store = listing_store
+        # Cách tải/selector dò được ở lần chạy đầu dùng lại cho các lần sau
+        self.site_profiles = site_profiles or SiteProfiles()
+        self.http_cache = http_cache
+        self.metrics = metrics or CrawlMetrics()
+        # Giữ kết nối keep-alive giữa các lần chạy, đủ cho mọi lần chạy song song
+        self.transport = transport or create_transport(max(10, workers * max_runs))
+        self.fetchers = FetchMethods(self.transport)
+        rate_limit = rate_limit or DEFAULT_REQUESTS_PER_SECOND
+        if adaptive:
+            self.rate_limiter = AdaptiveRateLimiter(rate_limit, max_concurrency=workers * max_runs)
+        else:
+            self.rate_limiter = HostRateLimiter(rate_limit)
+        self.executor = ThreadPoolExecutor(max_workers=max_runs, thread_name_prefix='crawl-run')
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def due_sources(self, now):
+        with self.lock:
+            return [source for source in self.sources.values()
+                    if source.next_run <= now and source.url not in self.running]
+
+    def start_run(self, sources, now):
+        urls = [source.url for source in sources]
+        with self.lock:
+            self.running.update(urls)
+        for source in sources:
+            source.next_run = now + source.interval
+        logger.info(f"Bắt đầu crawl {len(urls)} URL đến hạn")
+        future = self.executor.submit(self.run_batch, urls)
+        future.add_done_callback(lambda future: self.finish_run(urls, future))
+
+    def run_batch(self, urls):
+        """Một lần crawl các URL đến hạn bằng crawler mới nhưng dùng chung transport/rate limiter"""
+        crawler = AlonhadatMultiCrawler(urls, workers=self.workers, parser_backend=self.parser_backend,
+                                        sink=self.sink, http_cache=self.http_cache, seen_store=self.seen_store,
+                                        metrics=self.metrics, transport=self.transport, rate_limiter=self.rate_limiter,
+                                        listing_store=self.listing_store, site_profiles=self.site_profiles,
+                                        fetchers=self.fetchers)
+        crawler.crawl_all_urls(max_pages_per_url=self.pages)
+        # export_format None: chỉ cập nhật kho tin (--no-snapshot)
+        if not self.sink and self.export_format and crawler.all_data:
+            output = os.path.join(self.output_dir, f'alonhadat_{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}')
+            if self.export_format == 'excel':
+                output += '.xlsx'
+            save_output(crawler, output, self.export_format, self.excel_sheets)
+        return {url: crawler.stats.count(url) for url in urls}
+
+    def finish_run(self, urls, future):
+        try:
+            counts = future.result()
+        except Exception as e:
+            logger.error(f"Lỗi khi crawl {urls}: {e}")
+            counts = {}
+        with self.lock:
+            self.running.difference_update(urls)
+            for url in urls:
+                source = self.sources[url]
+                source.runs += 1
+                source.last_items = counts.get(url)
+                source.last_finished = time.time()
+        logger.info(f"Xong {len(urls)} URL: {sum(counts.values())} items")
+
+    def run_forever(self, once=False, poll_interval=1.0):
+        """Vòng lặp chính; once=True chỉ chạy một lượt cho mọi URL rồi dừng"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info(f"Daemon bắt đầu với {len(self.sources)} URL nguồn")
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                due = self.due_sources(now)
+                if due:
+                    self.start_run(due, now)
+                if once:
+                    break
+                next_run = min(source.next_run for source in self.sources.values())
+                self.stop_event.wait(min(max(next_run - time.time(), 0), poll_interval))
+        finally:
+            logger.info("Daemon dừng, chờ các lần crawl đang chạy hoàn thành")
+            self.executor.shutdown(wait=True)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def load_sources(path, interval):
+    with open(path, 'r', encoding='utf-8') as f:
+        urls = parse_urls_input([line.strip() for line in f if line.strip()])
+    return {url: interval for url in urls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daemon crawl định kỳ alonhadat.com.vn')
+    parser.add_argument('--file', '-f', type=str, required=True, help='File danh sách URL nguồn')
+    parser.add_argument('--interval', type=int, default=3600, help='Chu kỳ crawl mặc định (giây)')
+    parser.add_argument('--hot', type=str, help='File các URL "nóng" cần crawl thường xuyên hơn')
+    parser.add_argument('--hot-interval', type=int, default=900, help='Chu kỳ crawl URL nóng (giây)')
+    parser.add_argument('--pages', '-p', type=int, default=5, help='Số trang tối đa mỗi URL mỗi lần')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Số luồng crawl của mỗi lần chạy')
+    parser.add_argument('--max-runs', type=int, default=2, help='Số lần crawl được chạy đồng thời')
+    parser.add_argument('--rps', type=float, help=f'Số request tối đa mỗi giây cho mỗi host, chung cho mọi lần chạy (mặc định {DEFAULT_REQUESTS_PER_SECOND})')
+    parser.add_argument('--adaptive', action='store_true', help='Tự điều chỉnh tốc độ theo phản hồi của server')
+    parser.add_argument('--connect-timeout', type=float, default=DEFAULT_CONNECT_TIMEOUT, help='Timeout mở kết nối (giây)')
+    parser.add_argument('--read-timeout', type=float, default=DEFAULT_READ_TIMEOUT, help='Timeout chờ dữ liệu (giây)')
+    parser.add_argument('--http2', action='store_true', help='Dùng HTTP/2 qua httpx (cần pip install "httpx[http2]")')
+    parser.add_argument('--parser', default='html.parser', help='Backend parse HTML')
+    parser.add_argument('--output-dir', default='daemon_output', help='Thư mục chứa file output của mỗi lần chạy')
+    parser.add_argument('--format', default='excel', choices=EXPORT_FORMATS, help='Định dạng output mỗi lần chạy')
+    parser.add_argument('--excel-sheets', default='copy', choices=['copy', 'view', 'none'], help='Sheet theo URL khi xuất Excel')
+    parser.add_argument('--stream', '-s', type=str, help='Ghi nối mọi lần chạy vào một file .csv/.jsonl thay cho file riêng')
+    parser.add_argument('--incremental', type=str, help='File SQLite các tin đã thấy: mỗi lần chỉ ghi tin mới/đã đổi')
+    parser.add_argument('--store', type=str, help='File SQLite kho tin có index, mọi lần chạy upsert vào đây')
+    parser.add_argument('--no-snapshot', action='store_true', help='Chỉ cập nhật kho --store, không ghi file output mỗi lần chạy')
+    parser.add_argument('--site-cache', type=str, help='File SQLite lưu cách tải/selector dùng được của từng site')
+    parser.add_argument('--cache', type=str, help='Thư mục cache HTTP')
+    parser.add_argument('--prometheus', type=str, help='File .prom được cập nhật trong lúc chạy')
+    parser.add_argument('--once', action='store_true', help='Chạy một lượt rồi thoát')
+    args = parser.parse_args()
+
+    intervals = load_sources(args.file, args.interval)
+    if args.hot:
+        intervals.update(load_sources(args.hot, args.hot_interval))
+    if not intervals:
+        print("Không có URL hợp lệ nào!")
+        return
+    if args.no_snapshot and not args.store:
+        print("--no-snapshot cần dùng kèm --store")
+        return
+    sources = [ScheduledSource(url, interval) for url, interval in intervals.items()]
+
+    sink = open_sink(args.stream) if args.stream else None
+    seen_store = SeenStore(args.incremental) if args.incremental else None
+    http_cache = HttpCache(args.cache) if args.cache else None
+    listing_store = ListingStore(args.store) if args.store else None
+    site_profiles = SiteProfiles(args.site_cache)
+    transport = create_transport(max(10, args.workers * args.max_runs), args.connect_timeout, args.read_timeout,
+                                 args.http2)
+    scheduler = CrawlScheduler(sources, pages=args.pages, workers=args.workers, max_runs=args.max_runs,
+                               rate_limit=args.rps, adaptive=args.adaptive, parser_backend=args.parser, output_dir=args.output_dir,
+                               export_format=None if args.no_snapshot else args.format, excel_sheets=args.excel_sheets, sink=sink,
+                               seen_store=seen_store, http_cache=http_cache, listing_store=listing_store,
+                               site_profiles=site_profiles,
+                               metrics=CrawlMetrics(args.prometheus), transport=transport)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    try:
+        scheduler.run_forever(once=args.once)
+    except KeyboardInterrupt:
+        logger.info("Đã dừng daemon theo yêu cầu người dùng")
+    finally:
+        if sink:
+            sink.close()
+        if seen_store:
+            seen_store.close()
+        if http_cache:
+            http_cache.close()
+        if listing_store:
+            listing_store.close()
+        site_profiles.close()
+        logger.info(f"Kết nối: {transport.stats()}")
+        scheduler.fetchers.close()
+        transport.close()
+        if args.prometheus:
+            scheduler.metrics.write_prometheus()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import hashlib
+import re
+import threading
+from urllib.parse import urlparse
+
+# Các trường dùng để nhận diện tin khi không có detail_url
+CONTENT_FIELDS = ('title', 'price', 'area', 'address')
+
+
+def normalize_url(url):
+    """Chuẩn hoá detail_url: bỏ www, query, fragment, dấu / cuối; host viết thường"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def content_key(item):
+    parts = (re.sub(r'\s+', ' ', str(item.get(field, ''))).strip().lower() for field in CONTENT_FIELDS)
+    return '\x1f'.join(parts)
+
+
+class DedupIndex:
+    """Chỉ mục chống trùng tin giữa các URL nguồn và giữa các trang (tin VIP lặp lại); tin trùng giữ ở
+    trang được ghi nhận trước. Số tin trùng mỗi URL do RunningStats đếm."""
+
+    def __init__(self):
+        self.keys = set()
+        self.lock = threading.Lock()
+
+    def item_key(self, item):
+        detail_url = item.get('detail_url')
+        raw = f"url:{normalize_url(detail_url)}" if detail_url else f"content:{content_key(item)}"
+        # Lưu digest 16 byte thay vì chuỗi để chỉ mục gọn
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).digest()
+
+    def filter_page(self, page_data):
+        """Bỏ các item đã gặp, trả về list item chưa trùng"""
+        unique = []
+        with self.lock:
+            for item in page_data:
+                key = self.item_key(item)
+                if key in self.keys:
+                    continue
+                self.keys.add(key)
+                unique.append(item)
+        return unique
@@ -0,0 +1,185 @@
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from parsers import clean_text
+from rate_limiter import DEFAULT_REQUESTS_PER_SECOND, HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Các cột lấy thêm từ trang chi tiết, nối vào sau COLUMN_ORDER khi export
+DETAIL_COLUMNS = ['phone', 'legal_status', 'full_description', 'latitude', 'longitude']
+
+PHONE_RE = re.compile(r'(?:\+?84|0)(?:[\s.\-]?\d){8,10}')
+COORDINATES_RE = re.compile(r'(-?\d{1,2}\.\d{3,})\s*,\s*(-?\d{1,3}\.\d{3,})')
+
+
+def parse_detail_page(content):
+    """Parse trang chi tiết tin: số điện thoại, pháp lý, mô tả đầy đủ, toạ độ"""
+    soup = BeautifulSoup(content, 'html.parser')
+    detail = dict.fromkeys(DETAIL_COLUMNS)
+
+    # Số điện thoại: ưu tiên link tel:, sau đó đến khối liên hệ
+    phone_link = soup.select_one('a[href^="tel:"]')
+    if phone_link:
+        detail['phone'] = re.sub(r'\D', '', phone_link['href'][4:]) or None
+    else:
+        contact = soup.find('div', class_='fone') or soup.find('div', class_='contact-info')
+        match = PHONE_RE.search(contact.get_text()) if contact else None
+        detail['phone'] = re.sub(r'\D', '', match.group(0)) if match else None
+
+    # Pháp lý nằm trong bảng thông tin: ô nhãn rồi đến ô giá trị
+    for cell in soup.find_all('td'):
+        if clean_text(cell.get_text()).lower() == 'pháp lý':
+            value = cell.find_next_sibling('td')
+            detail['legal_status'] = clean_text(value.get_text()) if value else None
+            break
+
+    description = soup.find('div', class_='text-content') or soup.find('div', class_='detail')
+    if description:
+        for link in description.find_all('a'):
+            link.decompose()
+        detail['full_description'] = clean_text(description.get_text(' '))
+
+    # Toạ độ: iframe/bản đồ Google có dạng q=lat,lng
+    for tag in soup.select('#ggmap iframe, iframe[src*="maps"], [data-lat]'):
+        if tag.has_attr('data-lat') and tag.has_attr('data-lng'):
+            detail['latitude'], detail['longitude'] = float(tag['data-lat']), float(tag['data-lng'])
+            break
+        match = COORDINATES_RE.search(tag.get('src', ''))
+        if match:
+            detail['latitude'], detail['longitude'] = float(match.group(1)), float(match.group(2))
+            break
+
+    return detail
+
+
+class DetailStore:
+    """Các trang chi tiết đã lấy (SQLite), lần chạy sau không tải lại"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS details (
+                detail_url TEXT PRIMARY KEY,
+                fields TEXT NOT NULL,
+                fetched_at TEXT NOT NULL
+            ) WITHOUT ROWID;
+        ''')
+
+    def get_many(self, detail_urls):
+        """{detail_url: các trường chi tiết} cho những URL đã có trong store"""
+        detail_urls = list(detail_urls)
+        found = {}
+        # SQLite giới hạn số tham số mỗi câu lệnh
+        for start in range(0, len(detail_urls), 500):
+            chunk = detail_urls[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(f'SELECT detail_url, fields FROM details WHERE detail_url IN ({placeholders})',
+                                         chunk).fetchall()
+            found.update((url, json.loads(fields)) for url, fields in rows)
+        return found
+
+    def save(self, detail_url, fields):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO details VALUES (?, ?, ?)',
+                              (detail_url, json.dumps(fields, ensure_ascii=False), now))
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM details').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class DetailEnricher:
+    """Tải trang chi tiết của các tin đã crawl bằng pool giới hạn số luồng và gộp thêm trường vào chính ListingBatch"""
+
+    def __init__(self, crawler, store, workers=4, rate_limit=None):
+        self.crawler = crawler
+        self.store = store
+        # Crawler chạy tuần tự không có rate limiter: pool chi tiết vẫn phải giới hạn tốc độ như crawl song song
+        self.rate_limiter = None
+        if not crawler.rate_limiter:
+            self.rate_limiter = HostRateLimiter(rate_limit or DEFAULT_REQUESTS_PER_SECOND)
+        # Luồng nhiều hơn số request mỗi giây chỉ đứng chờ token
+        rate = (crawler.rate_limiter or self.rate_limiter).rate
+        self.workers = max(1, min(workers, math.ceil(rate)))
+
+    def fetch_detail(self, detail_url, source_url):
+        if self.rate_limiter:
+            self.rate_limiter.acquire(detail_url)
+        response = self.crawler.get_page_content(detail_url, source_url=source_url)
+        if not response:
+            return None
+        with self.crawler.metrics.timer('enrich', source_url):
+            return self.crawler.site_for(detail_url).detail_parser(response.content)
+
+    def enrich(self, batch):
+        """Gộp trường chi tiết vào batch (sửa trực tiếp), chỉ tải các detail_url chưa có trong store"""
+        # detail_url -> vị trí các tin trong batch
+        by_url = {}
+        for index, detail_url in enumerate(batch.column('detail_url')):
+            # Chỉ các site có parser trang chi tiết
+            if detail_url and self.crawler.site_for(detail_url).detail_parser:
+                by_url.setdefault(detail_url, []).append(index)
+        if not by_url:
+            return 0
+
+        known = self.store.get_many(by_url)
+        missing = [url for url in by_url if url not in known]
+        logger.info(f"Trang chi tiết: {len(known)} đã có, {len(missing)} cần tải ({self.workers} luồng)")
+        self.crawler.metrics.inc('details_cached', len(known))
+
+        fetched = 0
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {}
+        todo = iter(missing)
+        try:
+            while True:
+                # Chỉ giữ tối đa workers * 2 job để Ctrl-C dừng được ngay
+                while len(pending) < self.workers * 2:
+                    detail_url = next(todo, None)
+                    if detail_url is None:
+                        break
+                    source_url = batch.get(by_url[detail_url][0], 'source_url')
+                    pending[executor.submit(self.fetch_detail, detail_url, source_url)] = detail_url
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    detail_url = pending.pop(future)
+                    try:
+                        fields = future.result()
+                    except Exception as e:
+                        logger.error(f"Lỗi khi lấy trang chi tiết {detail_url}: {e}")
+                        fields = None
+                    if fields is None:
+                        self.crawler.metrics.inc('details_failed')
+                        continue
+                    self.store.save(detail_url, fields)
+                    known[detail_url] = fields
+                    fetched += 1
+                    self.crawler.metrics.inc('details_fetched')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for detail_url, fields in known.items():
+                for index in by_url[detail_url]:
+                    for column, value in fields.items():
+                        batch.set(index, column, value)
+
+        logger.info(f"Đã bổ sung chi tiết cho {len(known)}/{len(by_url)} tin ({fetched} trang mới tải)")
+        return fetched
@@ -0,0 +1,212 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from parsers import get_url_name
+
+MAX_COLUMN_WIDTH = 50
+MAX_SOURCE_SHEETS = 10
+# copy: mỗi URL một sheet chứa bản sao dữ liệu (như trước); view: All_Data xếp theo URL, có bộ lọc
+# và sheet Index trỏ tới từng khối; none: chỉ All_Data và Statistics
+SHEET_MODES = ('copy', 'view', 'none')
+INVALID_SHEET_CHARS_RE = re.compile(r'[\\/*?:"<>|\[\]]')
+
+
+def column_widths(df):
+    """Độ rộng từng cột (độ dài chuỗi dài nhất kể cả tiêu đề + 2, tối đa 50), tính theo cả cột bằng pandas"""
+    widths = []
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Cột mã hoá: chỉ cần đo các giá trị khác nhau thực sự xuất hiện
+            values = pd.Series(values.cat.remove_unused_categories().cat.categories)
+        lengths = values.dropna().astype(str).str.len()
+        longest = int(lengths.max()) if len(lengths) else 0
+        widths.append(min(max(longest, len(str(column))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def frame_rows(df):
+    """Các dòng của DataFrame dạng tuple, ô trống (NaN/NA) là None"""
+    values = df.astype(object)
+    return values.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def column_letter(index):
+    """Tên cột Excel của cột thứ index (bắt đầu từ 1)"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def sheet_title(url, used=()):
+    """Tên sheet hợp lệ từ URL, thêm hậu tố nếu trùng tên sheet đã có"""
+    title = INVALID_SHEET_CHARS_RE.sub('', get_url_name(url))[:31] or 'Sheet'
+    suffix = 1
+    candidate = title
+    while candidate.lower() in used:
+        suffix += 1
+        candidate = f'{title[:31 - len(str(suffix)) - 1]}_{suffix}'
+    return candidate
+
+
+class XlsxWriterBook:
+    """Ghi bằng xlsxwriter ở chế độ constant_memory: mỗi dòng được ghi thẳng ra file tạm"""
+
+    def __init__(self, filename):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(filename, {
+            'constant_memory': True,
+            # Giữ nguyên text như khi ghi bằng pandas/openpyxl: không tự đổi URL thành link
+            'strings_to_urls': False,
+            'strings_to_formulas': False,
+        })
+        self.header_format = self.workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self.link_format = self.workbook.add_format({'font_color': 'blue', 'underline': 1})
+
+    def write_sheet(self, title, df, widths, autofilter=False):
+        sheet = self.workbook.add_worksheet(title)
+        for index, width in enumerate(widths):
+            sheet.set_column(index, index, width)
+        if autofilter and len(df.columns):
+            sheet.autofilter(0, 0, len(df), len(df.columns) - 1)
+            sheet.freeze_panes(1, 0)
+        sheet.write_row(0, 0, list(df.columns), self.header_format)
+        for row_number, row in enumerate(frame_rows(df), 1):
+            sheet.write_row(row_number, 0, row)
+
+    def write_links(self, title, header, rows, widths):
+        """Sheet mà ô đầu mỗi dòng là link nội bộ: rows gồm (vị trí đích, giá trị các ô)"""
+        sheet = self.workbook.add_worksheet(title)
+        for index, width in enumerate(widths):
+            sheet.set_column(index, index, width)
+        sheet.write_row(0, 0, header, self.header_format)
+        for row_number, (location, values) in enumerate(rows, 1):
+            sheet.write_url(row_number, 0, f'internal:{location}', self.link_format, string=values[0])
+            sheet.write_row(row_number, 1, values[1:])
+
+    def close(self):
+        self.workbook.close()
+
+
+class OpenpyxlBook:
+    """Ghi bằng workbook write-only của openpyxl khi chưa cài xlsxwriter"""
+
+    def __init__(self, filename):
+        from openpyxl import Workbook
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        self.filename = filename
+        self.workbook = Workbook(write_only=True)
+        self.header_style = {
+            'font': Font(bold=True),
+            'border': Border(*(Side(style='thin'),) * 4),
+            'alignment': Alignment(horizontal='center', vertical='top'),
+        }
+
+    def header(self, sheet, columns):
+        from openpyxl.cell import WriteOnlyCell
+
+        cells = []
+        for column in columns:
+            cell = WriteOnlyCell(sheet, column)
+            for attribute, value in self.header_style.items():
+                setattr(cell, attribute, value)
+            cells.append(cell)
+        return cells
+
+    def add_sheet(self, title, widths):
+        sheet = self.workbook.create_sheet(title)
+        for index, width in enumerate(widths, 1):
+            sheet.column_dimensions[column_letter(index)].width = width
+        return sheet
+
+    def write_sheet(self, title, df, widths, autofilter=False):
+        sheet = self.add_sheet(title, widths)
+        if autofilter and len(df.columns):
+            sheet.auto_filter.ref = f'A1:{column_letter(len(df.columns))}{len(df) + 1}'
+            sheet.freeze_panes = 'A2'
+        sheet.append(self.header(sheet, df.columns))
+        for row in frame_rows(df):
+            sheet.append(row)
+
+    def write_links(self, title, header, rows, widths):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.worksheet.hyperlink import Hyperlink
+
+        sheet = self.add_sheet(title, widths)
+        sheet.append(self.header(sheet, header))
+        for row_number, (location, values) in enumerate(rows, 2):
+            link = WriteOnlyCell(sheet, values[0])
+            link.hyperlink = Hyperlink(ref=f'A{row_number}', location=location)
+            link.style = 'Hyperlink'
+            sheet.append([link, *values[1:]])
+
+    def close(self):
+        self.workbook.save(self.filename)
+
+
+def open_book(filename, engine=None):
+    """xlsxwriter nếu đã cài (nhanh hơn vài lần), không thì openpyxl write-only"""
+    if engine is None:
+        try:
+            import xlsxwriter  # noqa: F401
+            engine = 'xlsxwriter'
+        except ImportError:
+            engine = 'openpyxl'
+    if engine == 'xlsxwriter':
+        return XlsxWriterBook(filename)
+    return OpenpyxlBook(filename)
+
+
+def group_by_source(df):
+    """Xếp các dòng cùng source_url liền nhau (giữ thứ tự URL xuất hiện và thứ tự trong từng URL)"""
+    groups = df.groupby('source_url', sort=False, observed=True).ngroup().to_numpy()
+    return df.iloc[np.argsort(groups, kind='stable')].reset_index(drop=True)
+
+
+def write_index_sheet(book, df):
+    """Sheet Index: mỗi URL một dòng, link tới khối dòng của URL đó trong All_Data"""
+    last_column = column_letter(len(df.columns))
+    header = ['Source', 'URL', 'Items', 'Rows']
+    rows = []
+    start = 2
+    for url, count in df.groupby('source_url', sort=False, observed=True).size().items():
+        end = start + count - 1
+        rows.append((f"'All_Data'!A{start}:{last_column}{end}", (get_url_name(url), url, int(count), f'{start}-{end}')))
+        start = end + 1
+    widths = column_widths(pd.DataFrame([values for _, values in rows], columns=header))
+    book.write_links('Index', header, rows, widths)
+
+
+def write_workbook(filename, df, stat_sheets, sheets='copy', engine=None):
+    """Ghi file Excel theo kiểu stream: All_Data, các sheet thống kê ({tên: list dòng}) rồi các sheet theo URL"""
+    if sheets not in SHEET_MODES:
+        raise ValueError(f"Chế độ sheet không hợp lệ: {sheets} (chọn {', '.join(SHEET_MODES)})")
+    book = open_book(filename, engine)
+    try:
+        if sheets == 'view':
+            df = group_by_source(df)
+        book.write_sheet('All_Data', df, column_widths(df), autofilter=sheets == 'view')
+        for title, rows in stat_sheets.items():
+            stats_df = pd.DataFrame(rows)
+            book.write_sheet(title, stats_df, column_widths(stats_df))
+
+        if sheets == 'view':
+            write_index_sheet(book, df)
+        elif sheets == 'copy':
+            used = {'all_data', *(title.lower() for title in stat_sheets)}
+            url_groups = df.groupby('source_url', sort=False, observed=True)
+            for i, (url, df_url) in enumerate(url_groups):
+                if i >= MAX_SOURCE_SHEETS:
+                    break
+                title = sheet_title(url, used)
+                used.add(title.lower())
+                book.write_sheet(title, df_url, column_widths(df_url))
+    finally:
+        book.close()
+    return filename
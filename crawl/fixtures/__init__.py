@@ -0,0 +1,29 @@
+# fixtures - Các trang HTML đã lưu, dùng chung cho test và benchmark
+import glob
+import os
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_URL = 'https://alonhadat.com.vn/nha-dat/can-ban/nha-dat/1/ha-noi.html'
+
+
+def load_fixtures():
+    """Đọc các trang danh sách đã lưu trong fixtures/"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'listing_page_*.html'))):
+        with open(path, 'rb') as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+
+class FakeClock:
+    """Đồng hồ giả truyền vào tham số clock để cho thời gian trôi qua mà không phải chờ;
+    sleep() chỉ cộng thêm thời gian"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    """Cache response HTTP trên đĩa (body + ETag/Last-Modified) với TTL, giới hạn dung lượng và xoá theo LRU"""
+
+    def __init__(self, directory, ttl=3600, max_bytes=500 * 1024 * 1024, clock=time.time):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Đồng hồ cho TTL/LRU (test truyền đồng hồ giả)
+        self.clock = clock
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+        ''')
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        self.counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+    def filename(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.z'
+
+    def get(self, url):
+        """Entry trong cache của url (kèm body), None nếu chưa có"""
+        with self.lock:
+            row = self.conn.execute('''
+                SELECT filename, etag, last_modified, stored_at, size FROM entries WHERE url = ?
+            ''', (url,)).fetchone()
+            if not row:
+                self.counters['misses'] += 1
+                return None
+            filename, etag, last_modified, stored_at, size = row
+            try:
+                with open(os.path.join(self.directory, filename), 'rb') as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self.delete_entry(url, filename, size)
+                self.counters['misses'] += 1
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (self.clock(), url))
+        return {'url': url, 'body': body, 'etag': etag, 'last_modified': last_modified, 'stored_at': stored_at}
+
+    def is_fresh(self, entry):
+        return self.clock() - entry['stored_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        """Header If-None-Match / If-Modified-Since cho lần request lại"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        filename = self.filename(url)
+        data = zlib.compress(body)
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        now = self.clock()
+        with self.lock:
+            os.replace(tmp_path, path)
+            row = self.conn.execute('SELECT size FROM entries WHERE url = ?', (url,)).fetchone()
+            with self.conn:
+                self.conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                  (url, filename, etag, last_modified, now, now, len(data)))
+            self.total_bytes += len(data) - (row[0] if row else 0)
+            self.counters['stored'] += 1
+            self.evict()
+
+    def revalidated(self, url):
+        """Server trả 304: làm mới thời điểm lưu của entry"""
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.execute('UPDATE entries SET stored_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            self.counters['revalidated'] += 1
+
+    def hit(self):
+        with self.lock:
+            self.counters['hits'] += 1
+
+    def delete_entry(self, url, filename, size):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            pass
+        with self.conn:
+            self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+        self.total_bytes -= size
+
+    def evict(self):
+        """Xoá các entry lâu không dùng nhất cho đến khi dưới giới hạn dung lượng"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        rows = self.conn.execute('SELECT url, filename, size FROM entries ORDER BY accessed_at').fetchall()
+        for url, filename, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.delete_entry(url, filename, size)
+            self.counters['evicted'] += 1
+
+    def to_response(self, entry):
+        """Dựng lại requests.Response từ entry trong cache"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry['url']
+        response._content = entry['body']
+        response.encoding = 'utf-8'
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
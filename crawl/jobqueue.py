@@ -0,0 +1,327 @@
+# jobqueue.py - Chia việc crawl cho nhiều worker (nhiều process hoặc nhiều máy) qua hàng đợi SQLite
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class JobQueue:
+    """Hàng đợi job (URL nguồn, số trang) trong SQLite; worker thuê job có thời hạn,
+    hết hạn mà chưa xong (worker chết) thì job được trả lại hàng đợi"""
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Đồng hồ tính hạn thuê (test truyền đồng hồ giả)
+        self.clock = clock
+        self.lock = threading.Lock()
+        # Nhiều process cùng ghi: WAL + chờ khoá tối đa 30 giây, tự quản lý transaction
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sources (
+                source_url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                max_pages INTEGER,
+                total_pages INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                source_url TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT,
+                PRIMARY KEY (source_url, page)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+            CREATE TABLE IF NOT EXISTS results (
+                source_url TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                worker TEXT NOT NULL,
+                item_count INTEGER NOT NULL,
+                items TEXT NOT NULL,
+                PRIMARY KEY (source_url, page)
+            );
+        ''')
+
+    def now(self):
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def transaction(self, sql_steps):
+        """Chạy các bước trong một transaction ghi (BEGIN IMMEDIATE giữ khoá ghi ngay từ đầu)"""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = sql_steps(self.conn)
+                self.conn.execute('COMMIT')
+                return result
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def enqueue_sources(self, urls, max_pages=None):
+        """Thêm URL nguồn; mỗi nguồn bắt đầu bằng job trang 1, các trang sau được thêm khi đọc được phân trang"""
+        def steps(conn):
+            position = conn.execute('SELECT COALESCE(MAX(position), 0) FROM sources').fetchone()[0]
+            added = 0
+            for url in urls:
+                position += 1
+                cursor = conn.execute('INSERT OR IGNORE INTO sources (source_url, position, max_pages) VALUES (?, ?, ?)',
+                                      (url, position, max_pages))
+                if cursor.rowcount:
+                    conn.execute('INSERT OR IGNORE INTO jobs (source_url, page, updated_at) VALUES (?, 1, ?)',
+                                 (url, self.now()))
+                    added += 1
+            return added
+        return self.transaction(steps)
+
+    def lease(self, worker):
+        """Thuê một job đang chờ hoặc đã hết hạn thuê; trả về (source_url, page, max_pages) hoặc None"""
+        def steps(conn):
+            now = self.clock()
+            # Job hết hạn thuê quá số lần thử thì bỏ
+            conn.execute('''UPDATE jobs SET state = 'failed', updated_at = ?
+                            WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?''',
+                         (self.now(), now, self.max_attempts))
+            row = conn.execute('''
+                SELECT j.source_url, j.page, s.max_pages FROM jobs j JOIN sources s USING (source_url)
+                WHERE j.state = 'pending' OR (j.state = 'leased' AND j.lease_expires < ?)
+                ORDER BY j.page, s.position LIMIT 1
+            ''', (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('''UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1,
+                            updated_at = ? WHERE source_url = ? AND page = ?''',
+                         (worker, now + self.lease_seconds, self.now(), row[0], row[1]))
+            return row
+        return self.transaction(steps)
+
+    def complete(self, source_url, page, worker, page_data, total_pages=None):
+        """Lưu kết quả một trang nếu worker còn giữ job; trang 1 kèm tổng số trang thì thêm job cho các trang còn lại.
+        Trả về False khi job đã hết hạn thuê và được giao cho worker khác (kết quả muộn bị bỏ)"""
+        items = json.dumps(page_data, ensure_ascii=False)
+
+        def steps(conn):
+            owner = conn.execute('SELECT worker, state FROM jobs WHERE source_url = ? AND page = ?',
+                                 (source_url, page)).fetchone()
+            if owner != (worker, 'leased'):
+                return False
+            conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                         (source_url, page, worker, len(page_data), items))
+            conn.execute('''UPDATE jobs SET state = 'done', worker = ?, lease_expires = NULL, updated_at = ?
+                            WHERE source_url = ? AND page = ?''', (worker, self.now(), source_url, page))
+            if total_pages is not None:
+                conn.execute('UPDATE sources SET total_pages = ? WHERE source_url = ?', (total_pages, source_url))
+                conn.executemany('INSERT OR IGNORE INTO jobs (source_url, page, updated_at) VALUES (?, ?, ?)',
+                                 [(source_url, next_page, self.now()) for next_page in range(2, total_pages + 1)])
+            return True
+        return self.transaction(steps)
+
+    def release(self, source_url, page, worker, failed=False):
+        """Trả job về hàng đợi (worker dừng hoặc tải lỗi); lỗi quá số lần thử thì đánh dấu failed"""
+        def steps(conn):
+            conn.execute('''UPDATE jobs SET state = CASE WHEN ? AND attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            worker = NULL, lease_expires = NULL, updated_at = ?
+                            WHERE source_url = ? AND page = ? AND worker = ? AND state = 'leased' ''',
+                         (failed, self.max_attempts, self.now(), source_url, page, worker))
+        self.transaction(steps)
+
+    def is_finished(self):
+        """Không còn job đang chờ hay đang được thuê"""
+        with self.lock:
+            row = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()
+        return row[0] == 0
+
+    def source_urls(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT source_url FROM sources ORDER BY position')]
+
+    def iter_results(self):
+        """Kết quả theo thứ tự nguồn rồi số trang: (source_url, page, list item)"""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT r.source_url, r.page, r.items FROM results r JOIN sources s USING (source_url)
+                ORDER BY s.position, r.page
+            ''').fetchall()
+        for source_url, page, items in rows:
+            yield source_url, page, json.loads(items)
+
+    def summary(self):
+        with self.lock:
+            states = dict(self.conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+            items = self.conn.execute('SELECT COALESCE(SUM(item_count), 0) FROM results').fetchone()[0]
+        return {'pending': states.get('pending', 0), 'leased': states.get('leased', 0),
+                'done': states.get('done', 0), 'failed': states.get('failed', 0), 'items': items}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue_path, worker_id=None, rate_limit=None, parser_backend='html.parser', cache_dir=None,
+               lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=1.0):
+    """Vòng lặp worker: thuê job, crawl đúng một trang, ghi kết quả vào hàng đợi; dừng khi hết job"""
+    from a import AlonhadatMultiCrawler
+    from http_cache import HttpCache
+
+    worker_id = worker_id or default_worker_id()
+    job_queue = JobQueue(queue_path, lease_seconds=lease_seconds)
+    http_cache = HttpCache(cache_dir) if cache_dir else None
+    # Chống trùng làm một lần ở bước merge, worker chỉ crawl
+    crawler = AlonhadatMultiCrawler(rate_limit=rate_limit, parser_backend=parser_backend,
+                                    http_cache=http_cache, dedup=False)
+    done = 0
+    job = None
+    try:
+        while True:
+            job = job_queue.lease(worker_id)
+            if job is None:
+                if job_queue.is_finished():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            source_url, page, max_pages = job
+            if page == 1:
+                total_pages, page_data = crawler.plan_source(source_url, max_pages)
+            else:
+                total_pages, page_data = None, crawler.crawl_page(crawler.get_page_url(source_url, page), source_url)
+
+            if crawler.failed_urls:
+                crawler.failed_urls.clear()
+                job_queue.release(source_url, page, worker_id, failed=True)
+            elif job_queue.complete(source_url, page, worker_id, page_data, total_pages):
+                done += 1
+            else:
+                logger.warning(f"Worker {worker_id}: hết hạn thuê {source_url} trang {page}, kết quả bị bỏ")
+            job = None
+            crawler.polite_sleep(2)
+    except KeyboardInterrupt:
+        logger.info(f"Worker {worker_id} dừng theo yêu cầu")
+    finally:
+        if job is not None:
+            # Trả lại job đang làm dở để worker khác nhận ngay, không phải chờ hết hạn thuê
+            job_queue.release(job[0], job[1], worker_id)
+        job_queue.close()
+        crawler.fetchers.close()
+        if http_cache:
+            http_cache.close()
+    logger.info(f"Worker {worker_id} xong {done} trang")
+    return done
+
+
+def merge_results(queue_path, output_file, export_format='excel', dedup=True):
+    """Gộp kết quả các worker theo thứ tự nguồn/trang, chống trùng rồi xuất file như crawl thường"""
+    from a import AlonhadatMultiCrawler, save_output
+
+    job_queue = JobQueue(queue_path)
+    crawler = AlonhadatMultiCrawler(job_queue.source_urls(), dedup=dedup)
+    try:
+        for source_url, page, page_data in job_queue.iter_results():
+            crawler.all_data.extend(crawler.record_page(source_url, page, page_data, restored=True))
+        logger.info(f"Hàng đợi: {job_queue.summary()}")
+    finally:
+        job_queue.close()
+
+    if not crawler.all_data:
+        logger.warning("Hàng đợi chưa có kết quả nào")
+        return None
+    crawler.print_summary()
+    return save_output(crawler, output_file, export_format)
+
+
+def read_urls(args):
+    from a import parse_urls_input
+
+    if args.urls:
+        return parse_urls_input(args.urls)
+    with open(args.file, 'r', encoding='utf-8') as f:
+        return parse_urls_input([line.strip() for line in f if line.strip()])
+
+
+def main():
+    from a import DEFAULT_REQUESTS_PER_SECOND, EXPORT_FORMATS, default_output_name
+
+    parser = argparse.ArgumentParser(description='Crawl phân tán: coordinator đưa job vào hàng đợi SQLite, nhiều worker cùng crawl')
+    parser.add_argument('command', choices=['enqueue', 'worker', 'run', 'status', 'merge'],
+                        help='enqueue: thêm URL; worker: chạy một worker; run: enqueue + chạy N worker cục bộ + merge; '
+                             'status: xem tiến độ; merge: gộp kết quả ra file')
+    parser.add_argument('--queue', '-q', required=True, help='File SQLite của hàng đợi (dùng chung giữa các worker)')
+    parser.add_argument('--urls', '-u', type=str, help='URLs cần crawl (JSON array hoặc cách nhau bởi dấu phẩy)')
+    parser.add_argument('--file', '-f', type=str, help='File chứa danh sách URLs (mỗi dòng một URL)')
+    parser.add_argument('--pages', '-p', type=int, help='Số trang tối đa mỗi URL (mặc định: tất cả)')
+    parser.add_argument('--local-workers', '-n', type=int, default=os.cpu_count() or 2, help='Số process worker khi chạy run')
+    parser.add_argument('--worker-id', type=str, help='Tên worker (mặc định hostname-pid)')
+    parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='Thời hạn thuê job (giây), quá hạn thì job được giao lại')
+    parser.add_argument('--rps', type=float, help='Tổng số request mỗi giây tới mỗi host: run chia đều cho các worker cục bộ, '
+                                                   f'worker dùng cho riêng mình (mặc định {DEFAULT_REQUESTS_PER_SECOND} khi run)')
+    parser.add_argument('--parser', default='html.parser', help='Backend parse HTML')
+    parser.add_argument('--cache', type=str, help='Thư mục cache HTTP của worker')
+    parser.add_argument('--output', '-o', type=str, help='File/thư mục output khi merge')
+    parser.add_argument('--format', default='excel', choices=EXPORT_FORMATS, help='Định dạng output khi merge')
+    parser.add_argument('--no-dedup', action='store_true', help='Giữ cả các tin trùng khi merge')
+    args = parser.parse_args()
+
+    if args.command in ('enqueue', 'run') and (args.urls or args.file):
+        job_queue = JobQueue(args.queue)
+        added = job_queue.enqueue_sources(read_urls(args), args.pages)
+        logger.info(f"Đã thêm {added} URL nguồn vào {args.queue}")
+        job_queue.close()
+    elif args.command == 'enqueue':
+        print("enqueue cần --urls hoặc --file")
+        sys.exit(1)
+
+    if args.command == 'worker':
+        run_worker(args.queue, args.worker_id, args.rps, args.parser, args.cache, args.lease)
+
+    elif args.command == 'run':
+        # Các worker cục bộ cùng gửi tới một host: chia đều tổng --rps, không nhân lên theo số worker
+        worker_rps = (args.rps or DEFAULT_REQUESTS_PER_SECOND) / args.local_workers
+        workers = [multiprocessing.Process(target=run_worker, name=f'worker-{i}',
+                                           args=(args.queue, f"{default_worker_id()}-{i}", worker_rps, args.parser,
+                                                 args.cache, args.lease))
+                   for i in range(1, args.local_workers + 1)]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # Các worker cũng nhận Ctrl-C và tự trả lại job đang làm
+            for worker in workers:
+                worker.join()
+
+    if args.command in ('run', 'merge'):
+        output_file = args.output or default_output_name('alonhadat_distributed', args.format)
+        if merge_results(args.queue, output_file, args.format, dedup=not args.no_dedup):
+            print(f"\nHoàn thành! Dữ liệu đã được lưu vào: {output_file}")
+
+    if args.command == 'status':
+        job_queue = JobQueue(args.queue)
+        print(json.dumps(job_queue.summary(), ensure_ascii=False, indent=2))
+        job_queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+# listing_store.py - Kho tin đã crawl (SQLite có index): upsert mỗi lần crawl, lọc/xuất bằng CLI thay cho mở từng file Excel
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from enrichment import DETAIL_COLUMNS
+from normalize import NUMERIC_COLUMNS, normalize_listing, parse_post_date, parse_price
+from parsers import get_url_name
+from records import FLOAT_COLUMNS, SCHEMA
+from seen_store import SeenStore
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Cột thêm của store: ngày đăng chuẩn hoá, thời điểm thấy tin lần đầu/lần cuối, trạng thái (còn/đã gỡ)
+STORE_COLUMNS = SCHEMA + ['posted_on', 'first_seen', 'last_seen', 'status', 'removed_at']
+STATUS_ACTIVE = 'active'
+STATUS_REMOVED = 'removed'
+# Cột được theo dõi: mỗi lần đổi ghi một dòng (cũ, mới, thời điểm) vào listing_changes thay cho cả bản chụp
+TRACKED_COLUMNS = ('price_vnd', 'price', 'area_m2', 'vip_level', 'title', 'description')
+CHANGE_COLUMNS = ['field', 'old_value', 'new_value', 'changed_at']
+# Index (source_name, price_vnd) dùng được cho cả lọc theo source_name nên không cần index riêng
+INDEXES = {
+    'source_price': 'source_name, price_vnd',
+    'source_seen': 'source_url, last_seen',
+    'removed_at': 'removed_at',
+    'posted_on': 'posted_on',
+    'detail_url': 'detail_url',
+    'price_vnd': 'price_vnd',
+    'price_per_m2': 'price_per_m2',
+    'area_m2': 'area_m2',
+    'last_seen': 'last_seen',
+}
+
+# Cách sắp xếp kết quả query -> (ORDER BY, cột số bắt buộc có): sắp theo giá/diện tích thì bỏ tin
+# không có giá trị đó để đọc thẳng theo index, không phải sắp xếp lại cả bảng
+ORDERS = {
+    'newest': ('posted_on DESC, last_seen DESC', None),
+    'price': ('price_vnd', 'price_vnd'),
+    'price-desc': ('price_vnd DESC', 'price_vnd'),
+    'area': ('area_m2', 'area_m2'),
+    'area-desc': ('area_m2 DESC', 'area_m2'),
+    'price-m2': ('price_per_m2', 'price_per_m2'),
+}
+RELATIVE_SINCE_RE = re.compile(r'^(\d+)d$')
+
+
+def column_type(column):
+    if column in NUMERIC_COLUMNS and NUMERIC_COLUMNS[column] == 'Int64':
+        return 'INTEGER'
+    if column in FLOAT_COLUMNS:
+        return 'REAL'
+    return 'TEXT'
+
+
+def blank_to_none(value):
+    return None if value == '' else value
+
+
+def listing_key(item):
+    """Khoá của tin: detail_url, không có thì theo nội dung (giống SeenStore)"""
+    return item.get('detail_url') or f"#{SeenStore.fingerprint(item)}"
+
+
+class ListingStore:
+    """Tất cả tin đã crawl qua các lần chạy (SQLite), mỗi tin một dòng theo detail_url; thay đổi giá,
+    VIP, mô tả... và tin bị gỡ được ghi thành từng dòng trong listing_changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        columns = ',\n'.join(f'{column} {column_type(column)}' for column in STORE_COLUMNS)
+        indexes = '\n'.join(f'CREATE INDEX IF NOT EXISTS idx_listings_{name} ON listings ({indexed});'
+                            for name, indexed in INDEXES.items())
+        self.conn.executescript(f'''
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS listings (
+                listing_key TEXT PRIMARY KEY,
+                {columns}
+            );
+            CREATE TABLE IF NOT EXISTS listing_changes (
+                listing_key TEXT NOT NULL,
+                field TEXT NOT NULL,
+                old_value,
+                new_value,
+                changed_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_changes_field_time ON listing_changes (field, changed_at);
+            CREATE INDEX IF NOT EXISTS idx_changes_key ON listing_changes (listing_key, changed_at);
+        ''')
+        self.add_missing_columns()
+        self.conn.executescript(indexes)
+
+        updates = []
+        for column in STORE_COLUMNS:
+            if column == 'first_seen':
+                continue
+            # Cột trang chi tiết (enrichment.DETAIL_COLUMNS): lần crawl sau không có thì giữ giá trị cũ
+            if column in DETAIL_COLUMNS or column == 'posted_on':
+                updates.append(f'{column} = COALESCE(excluded.{column}, listings.{column})')
+            else:
+                updates.append(f'{column} = excluded.{column}')
+        # Vị trí các cột theo dõi trong một dòng upsert (sau listing_key)
+        self.tracked_positions = {column: STORE_COLUMNS.index(column) + 1 for column in (*TRACKED_COLUMNS, 'status')}
+        self.upsert_sql = f'''
+            INSERT INTO listings (listing_key, {', '.join(STORE_COLUMNS)})
+            VALUES ({', '.join('?' * (len(STORE_COLUMNS) + 1))})
+            ON CONFLICT(listing_key) DO UPDATE SET {', '.join(updates)}
+        '''
+
+    def add_missing_columns(self):
+        """Kho tạo bởi phiên bản cũ: thêm các cột mới, tin cũ coi như còn đăng"""
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(listings)')}
+        missing = [column for column in STORE_COLUMNS if column not in existing]
+        with self.conn:
+            for column in missing:
+                self.conn.execute(f'ALTER TABLE listings ADD COLUMN {column} {column_type(column)}')
+            if 'status' in missing:
+                self.conn.execute('UPDATE listings SET status = ?', (STATUS_ACTIVE,))
+
+    def upsert(self, items):
+        """Thêm/cập nhật các tin (dict hoặc ListingBatch), giữ first_seen của tin đã có và ghi lại
+        các cột theo dõi đã đổi; trả về số dòng"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for item in items:
+            seen_at = item.get('crawl_time') or now
+            values = [item.get(column) for column in SCHEMA]
+            values += [parse_post_date(item.get('post_date'), seen_at), seen_at, seen_at, STATUS_ACTIVE, None]
+            rows.append((listing_key(item), *values))
+        if rows:
+            with self.lock, self.conn:
+                changes = self.diff(rows)
+                self.conn.executemany(self.upsert_sql, rows)
+                if changes:
+                    self.conn.executemany('INSERT INTO listing_changes VALUES (?, ?, ?, ?, ?)', changes)
+        return len(rows)
+
+    def current_values(self, keys):
+        """{listing_key: {cột theo dõi: giá trị}} của các tin đã có trong kho"""
+        columns = ', '.join(self.tracked_positions)
+        current = {}
+        # SQLite giới hạn số tham số mỗi câu lệnh
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for row in self.conn.execute(f"SELECT listing_key, {columns} FROM listings "
+                                         f"WHERE listing_key IN ({','.join('?' * len(chunk))})", chunk):
+                current[row[0]] = {column: blank_to_none(row[column]) for column in self.tracked_positions}
+        return current
+
+    def diff(self, rows):
+        """Các dòng listing_changes (khoá, cột, cũ, mới, thời điểm) của những tin đã có và vừa đổi"""
+        current = self.current_values(list({row[0] for row in rows}))
+        seen_at_position = STORE_COLUMNS.index('last_seen') + 1
+        changes = []
+        for row in rows:
+            key = row[0]
+            new = {column: blank_to_none(row[position]) for column, position in self.tracked_positions.items()}
+            old = current.get(key)
+            if old is not None:
+                changes.extend((key, column, old[column], value, row[seen_at_position])
+                               for column, value in new.items() if old[column] != value)
+            # Tin lặp lại trong cùng lô so với bản vừa ghi
+            current[key] = new
+        return changes
+
+    def mark_removed(self, source_url, started_at):
+        """Sau một lần crawl đủ mọi trang của source_url bắt đầu lúc started_at: tin của nguồn này
+        không còn xuất hiện (last_seen cũ hơn) được đánh dấu đã gỡ; trả về số tin"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        condition = 'source_url = ? AND status = ? AND last_seen < ?'
+        params = (source_url, STATUS_ACTIVE, started_at)
+        with self.lock, self.conn:
+            self.conn.execute(f"INSERT INTO listing_changes SELECT listing_key, 'status', status, ?, ? "
+                              f"FROM listings WHERE {condition}", (STATUS_REMOVED, now, *params))
+            return self.conn.execute(f'UPDATE listings SET status = ?, removed_at = ? WHERE {condition}',
+                                     (STATUS_REMOVED, now, *params)).rowcount
+
+    def changes(self, since=None, fields=('price_vnd',), sources=None, direction=None, limit=None):
+        """Các thay đổi (mới nhất trước) kèm thông tin hiện tại của tin; direction 'down'/'up' lọc giảm/tăng"""
+        clauses = [f"c.field IN ({','.join('?' * len(fields))})"]
+        params = list(fields)
+        if since:
+            clauses.append('c.changed_at >= ?')
+            params.append(since)
+        if sources:
+            clauses.append(f"l.source_name IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if direction:
+            clauses.append('c.new_value < c.old_value' if direction == 'down' else 'c.new_value > c.old_value')
+        sql = (f"SELECT {', '.join('c.' + column for column in CHANGE_COLUMNS)}, "
+               f"{', '.join('l.' + column for column in STORE_COLUMNS)} "
+               f"FROM listing_changes c JOIN listings l ON l.listing_key = c.listing_key "
+               f"WHERE {' AND '.join(clauses)} ORDER BY c.changed_at DESC")
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def price_changes(self, since=None, sources=None, direction=None, limit=None):
+        """Tin đổi giá từ since (YYYY-MM-DD), thêm change_pct so với giá cũ"""
+        rows = self.changes(since, ('price_vnd',), sources, direction, limit)
+        for row in rows:
+            old, new = row['old_value'], row['new_value']
+            row['change_pct'] = round((new - old) / old * 100, 2) if old and new is not None else None
+        return rows
+
+    def removed(self, since=None, sources=None, limit=None):
+        """Tin đã bị gỡ (không còn trong lần crawl đầy đủ gần nhất của nguồn), mới gỡ trước"""
+        clauses, params = ['status = ?'], [STATUS_REMOVED]
+        if since:
+            clauses.append('removed_at >= ?')
+            params.append(since)
+        if sources:
+            clauses.append(f"source_name IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        sql = (f"SELECT {', '.join(STORE_COLUMNS)} FROM listings WHERE {' AND '.join(clauses)} "
+               f"ORDER BY removed_at DESC")
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def history(self, detail_url):
+        """Mọi thay đổi của một tin theo thời gian"""
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(
+                f"SELECT {', '.join(CHANGE_COLUMNS)} FROM listing_changes WHERE listing_key = ? ORDER BY changed_at",
+                (detail_url,))]
+
+    def query(self, sources=None, min_price=None, max_price=None, min_area=None, max_area=None, since=None,
+              until=None, text=None, vip_only=False, order='newest', limit=None, active_only=False):
+        """Lọc tin theo nguồn, khoảng giá (VND), diện tích (m²), ngày đăng (YYYY-MM-DD) và từ khoá trong tiêu đề"""
+        clauses, params = [], []
+        if sources:
+            clauses.append(f"source_name IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        for column, operator, value in (('price_vnd', '>=', min_price), ('price_vnd', '<=', max_price),
+                                        ('area_m2', '>=', min_area), ('area_m2', '<=', max_area),
+                                        ('posted_on', '>=', since), ('posted_on', '<=', until)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(value)
+        if text:
+            clauses.append('title LIKE ?')
+            params.append(f'%{text}%')
+        if vip_only:
+            clauses.append("vip_level LIKE 'vip-%'")
+        if active_only:
+            clauses.append('status = ?')
+            params.append(STATUS_ACTIVE)
+        if order not in ORDERS:
+            raise ValueError(f"Cách sắp xếp không hợp lệ: {order} (chọn {', '.join(ORDERS)})")
+        order_by, required = ORDERS[order]
+        if required:
+            clauses.append(f'{required} IS NOT NULL')
+
+        sql = f"SELECT {', '.join(STORE_COLUMNS)} FROM listings"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY {order_by}'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def source_counts(self):
+        """(source_name, số tin, ngày đăng sớm nhất, muộn nhất, lần thấy cuối) theo nguồn"""
+        with self.lock:
+            return [tuple(row) for row in self.conn.execute('''
+                SELECT source_name, COUNT(*), MIN(posted_on), MAX(posted_on), MAX(last_seen)
+                FROM listings GROUP BY source_name ORDER BY COUNT(*) DESC
+            ''')]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+
+    def change_counts(self):
+        """Số dòng thay đổi theo cột"""
+        with self.lock:
+            return dict(self.conn.execute('SELECT field, COUNT(*) FROM listing_changes GROUP BY field').fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def file_crawl_time(path):
+    """Thời điểm crawl của file Excel cũ: theo tên file (alonhadat_multi_YYYYmmdd_HHMMSS.xlsx), không có thì theo mtime"""
+    match = re.search(r'(\d{8})_(\d{6})', os.path.basename(path))
+    moment = (datetime.strptime(''.join(match.groups()), '%Y%m%d%H%M%S')
+              if match else datetime.fromtimestamp(os.path.getmtime(path)))
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def read_excel_history(path):
+    """Đọc các tin trong file Excel cũ (sheet All_Data hoặc sheet đầu tiên), bổ sung cột số nếu thiếu"""
+    import pandas as pd
+
+    sheets = pd.read_excel(path, sheet_name=None, dtype=object)
+    df = sheets.get('All_Data', next(iter(sheets.values())))
+    df = df.rename(columns={'url': 'detail_url'})
+    fallback_time = file_crawl_time(path)
+
+    items = []
+    for row in df.astype(object).where(df.notna(), None).to_dict('records'):
+        item = {key: text_cell(value) if key not in FLOAT_COLUMNS else value
+                for key, value in row.items() if value is not None}
+        item.setdefault('crawl_time', fallback_time)
+        if item.get('source_url'):
+            # File cũ có source_name sai (vd. "ha-noil"), tính lại từ URL nguồn
+            item['source_name'] = get_url_name(item['source_url'])
+        if 'price_vnd' not in df.columns:
+            normalize_listing(item)
+        items.append(item)
+    return items
+
+
+def text_cell(value):
+    """Ô text mà Excel lưu thành số (vd. diện tích "35") trở lại chuỗi như lúc crawl"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value if isinstance(value, str) else str(value)
+
+
+def parse_price_arg(value):
+    """'5 tỷ', '800 triệu' hoặc số VND"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        price, _ = parse_price(value)
+        if price is None:
+            raise argparse.ArgumentTypeError(f"Không đọc được giá: {value}")
+        return price
+
+
+def parse_since_arg(value):
+    """'7d' (7 ngày gần đây) hoặc YYYY-MM-DD"""
+    match = RELATIVE_SINCE_RE.match(value)
+    if match:
+        return (datetime.now() - timedelta(days=int(match.group(1)))).strftime('%Y-%m-%d')
+    return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def export_rows(rows, output, columns=STORE_COLUMNS):
+    """Xuất kết quả query ra .xlsx, .csv hoặc .jsonl (ghi đè file cũ)"""
+    if output.lower().endswith('.xlsx'):
+        import pandas as pd
+        from excel_export import write_workbook
+
+        write_workbook(output, pd.DataFrame(rows, columns=columns), {}, 'none')
+        return
+    from sinks import CsvSink, JsonlSink
+
+    if os.path.exists(output):
+        os.remove(output)
+    # CSV gồm cả các cột của store (posted_on, first_seen, last_seen...)
+    sink = CsvSink(output, columns) if output.lower().endswith('.csv') else JsonlSink(output)
+    try:
+        sink.write_page(rows)
+    finally:
+        sink.close()
+
+
+def print_rows(rows, limit=20):
+    print(f"{'Ngày đăng':<12}{'Nguồn':<16}{'Giá':>16}{'DT (m²)':>9}  Tiêu đề")
+    for row in rows[:limit]:
+        price = f"{row['price_vnd']:,}" if row['price_vnd'] is not None else (row['price'] or '-')
+        area = f"{row['area_m2']:g}" if row['area_m2'] is not None else '-'
+        print(f"{row['posted_on'] or '-':<12}{(row['source_name'] or '')[:15]:<16}{price:>16}{area:>9}  {(row['title'] or '')[:70]}")
+    if len(rows) > limit:
+        print(f"... và {len(rows) - limit} tin khác (dùng --output để xuất toàn bộ)")
+
+
+def format_value(field, value):
+    if value is None:
+        return '-'
+    if field == 'price_vnd':
+        return f"{value:,}"
+    return str(value)[:15]
+
+
+def print_changes(rows, limit=20):
+    print(f"{'Thời điểm':<21}{'Nguồn':<16}{'Cột':<12}{'Cũ':>16}{'Mới':>16}{'%':>8}  Tiêu đề")
+    for row in rows[:limit]:
+        pct = row.get('change_pct')
+        print(f"{row['changed_at']:<21}{(row['source_name'] or '')[:15]:<16}{row['field']:<12}"
+              f"{format_value(row['field'], row['old_value']):>16}{format_value(row['field'], row['new_value']):>16}"
+              f"{'-' if pct is None else f'{pct:+.1f}':>8}  {(row['title'] or '')[:60]}")
+    if len(rows) > limit:
+        print(f"... và {len(rows) - limit} thay đổi khác (dùng --output để xuất toàn bộ)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kho tin đã crawl: nhập, lọc, xuất và theo dõi thay đổi')
+    parser.add_argument('store', help='File SQLite của kho tin (vd. listings.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help='Lọc tin trong kho')
+    query.add_argument('--source', action='append', help='source_name, vd. ha-noi (có thể lặp lại)')
+    query.add_argument('--min-price', type=parse_price_arg, help='Giá tối thiểu, vd. "2 tỷ" hoặc số VND')
+    query.add_argument('--max-price', type=parse_price_arg, help='Giá tối đa, vd. "5 tỷ"')
+    query.add_argument('--min-area', type=float, help='Diện tích tối thiểu (m²)')
+    query.add_argument('--max-area', type=float, help='Diện tích tối đa (m²)')
+    query.add_argument('--since', type=parse_since_arg, help='Đăng từ ngày (YYYY-MM-DD) hoặc N ngày gần đây (vd. 7d)')
+    query.add_argument('--until', type=parse_since_arg, help='Đăng đến ngày (YYYY-MM-DD)')
+    query.add_argument('--text', help='Từ khoá trong tiêu đề')
+    query.add_argument('--vip', action='store_true', help='Chỉ tin VIP')
+    query.add_argument('--active', action='store_true', help='Bỏ các tin đã bị gỡ')
+    query.add_argument('--order', default='newest', choices=list(ORDERS), help='Sắp xếp kết quả')
+    query.add_argument('--limit', type=int, help='Số tin tối đa')
+    query.add_argument('--output', '-o', help='Xuất kết quả ra .xlsx/.csv/.jsonl')
+
+    import_command = commands.add_parser('import', help='Nhập các file Excel đã crawl trước đây vào kho')
+    import_command.add_argument('files', nargs='+', help='Các file .xlsx (vd. alonhadat_multi_*.xlsx)')
+
+    changes = commands.add_parser('changes', help='Tin đổi giá (hoặc cột khác) từ một thời điểm')
+    changes.add_argument('--since', type=parse_since_arg, default='7d', help='Từ ngày (YYYY-MM-DD) hoặc N ngày gần đây (mặc định 7d)')
+    changes.add_argument('--field', action='append', choices=TRACKED_COLUMNS,
+                         help='Cột cần xem thay đổi (mặc định price_vnd, có thể lặp lại)')
+    changes.add_argument('--drops', action='store_true', help='Chỉ các lần giảm')
+    changes.add_argument('--rises', action='store_true', help='Chỉ các lần tăng')
+    changes.add_argument('--source', action='append', help='source_name (có thể lặp lại)')
+    changes.add_argument('--limit', type=int, help='Số dòng tối đa')
+    changes.add_argument('--output', '-o', help='Xuất kết quả ra .xlsx/.csv/.jsonl')
+
+    removed = commands.add_parser('removed', help='Tin đã bị gỡ khỏi site')
+    removed.add_argument('--since', type=parse_since_arg, help='Gỡ từ ngày (YYYY-MM-DD) hoặc N ngày gần đây')
+    removed.add_argument('--source', action='append', help='source_name (có thể lặp lại)')
+    removed.add_argument('--limit', type=int, help='Số tin tối đa')
+    removed.add_argument('--output', '-o', help='Xuất kết quả ra .xlsx/.csv/.jsonl')
+
+    history = commands.add_parser('history', help='Lịch sử thay đổi của một tin')
+    history.add_argument('detail_url', help='URL trang chi tiết của tin')
+
+    commands.add_parser('stats', help='Số tin theo nguồn')
+    args = parser.parse_args()
+
+    store = ListingStore(args.store)
+    try:
+        if args.command == 'import':
+            # File cũ trước, file mới sau: thông tin mới nhất được giữ lại, thay đổi ghi đúng chiều
+            for path in sorted(args.files, key=file_crawl_time):
+                count = store.upsert(read_excel_history(path))
+                logger.info(f"Đã nhập {count} tin từ {path}")
+            logger.info(f"Kho có {store.count()} tin")
+
+        elif args.command == 'stats':
+            print(f"{'Nguồn':<24}{'Số tin':>8}  {'Đăng từ':<12}{'Đến':<12}Lần thấy cuối")
+            for source_name, count, first, last, last_seen in store.source_counts():
+                print(f"{source_name or '-':<24}{count:>8}  {first or '-':<12}{last or '-':<12}{last_seen}")
+            print(f"Tổng: {store.count()} tin, đã gỡ: {len(store.removed())}")
+            print(f"Thay đổi đã ghi: {store.change_counts()}")
+
+        elif args.command == 'history':
+            for row in store.history(args.detail_url):
+                print(f"{row['changed_at']}  {row['field']}: {format_value(row['field'], row['old_value'])}"
+                      f" -> {format_value(row['field'], row['new_value'])}")
+
+        else:
+            start = time.perf_counter()
+            columns = STORE_COLUMNS
+            if args.command == 'changes':
+                direction = 'down' if args.drops else 'up' if args.rises else None
+                fields = args.field or ['price_vnd']
+                if fields == ['price_vnd']:
+                    rows = store.price_changes(args.since, args.source, direction, args.limit)
+                    columns = CHANGE_COLUMNS + ['change_pct'] + STORE_COLUMNS
+                else:
+                    rows = store.changes(args.since, fields, args.source, direction, args.limit)
+                    columns = CHANGE_COLUMNS + STORE_COLUMNS
+            elif args.command == 'removed':
+                rows = store.removed(args.since, args.source, args.limit)
+            else:
+                rows = store.query(args.source, args.min_price, args.max_price, args.min_area, args.max_area,
+                                   args.since, args.until, args.text, args.vip, args.order, args.limit,
+                                   args.active)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if args.output:
+                export_rows(rows, args.output, columns)
+                print(f"Đã xuất {len(rows)} dòng vào {args.output} ({elapsed_ms:.1f} ms)")
+            else:
+                if args.command == 'changes':
+                    print_changes(rows)
+                else:
+                    print_rows(rows)
+                print(f"{len(rows)} dòng ({elapsed_ms:.1f} ms)")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        logger.error(f"Lỗi: {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
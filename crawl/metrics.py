@@ -0,0 +1,234 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Mốc histogram độ trễ (giây), giống mặc định của Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Các giai đoạn được đo thời gian
+STAGES = {
+    'ttfb': 'Thời gian tới khi nhận header (kết nối + chờ server)',
+    'download': 'Thời gian tải xong một trang',
+    'parse': 'Thời gian parse một trang (process pool: tính cả thời gian chuyển dữ liệu)',
+    'sleep': 'Thời gian ngủ: delay cố định, chờ rate limiter, backoff khi retry',
+    'record': 'Thời gian ghi nhận một trang (dedup, checkpoint, sink)',
+    'export': 'Thời gian xuất file',
+    'enrich': 'Thời gian parse một trang chi tiết tin',
+}
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Histogram độ trễ với các mốc cố định"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Ước lượng phân vị theo mốc trên của bucket chứa nó"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 6),
+        }
+
+
+class CrawlMetrics:
+    """Bộ đếm và histogram theo giai đoạn và theo URL nguồn; xuất JSON hoặc file text Prometheus"""
+
+    def __init__(self, prometheus_path=None, prometheus_interval=15.0):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # (tên, URL nguồn) -> giá trị; URL nguồn '' là không gắn với nguồn nào
+        self.counters = {}
+        self.histograms = {}
+        # Nguồn số liệu bên ngoài đọc lúc báo cáo (vd. thống kê kết nối của transport): tên -> hàm trả về dict
+        self.collectors = {}
+        self.prometheus_path = prometheus_path
+        self.prometheus_interval = prometheus_interval
+        # Riêng cho việc ghi file: prometheus_text() đã giữ self.lock
+        self.flush_lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def inc(self, name, value=1, source_url=None):
+        key = (name, source_url or '')
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds, source_url=None):
+        key = (stage, source_url or '')
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, source_url=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, source_url)
+
+    def register(self, name, collect):
+        """Đăng ký nguồn số liệu; đăng ký lại cùng tên thì thay nguồn cũ"""
+        self.collectors[name] = collect
+
+    def collect(self):
+        return {name: collect() for name, collect in self.collectors.items()}
+
+    def counter_totals(self):
+        totals = {}
+        for (name, _), value in self.counters.items():
+            totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def stage_totals(self):
+        """Gộp histogram các URL nguồn lại theo giai đoạn"""
+        stages = {}
+        for (stage, _), histogram in self.histograms.items():
+            merged = stages.get(stage)
+            if merged is None:
+                merged = stages[stage] = Histogram(histogram.buckets)
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+            merged.sum += histogram.sum
+            merged.max = max(merged.max, histogram.max)
+        return stages
+
+    def report(self):
+        """Báo cáo dạng dict: tổng hợp và chi tiết theo từng URL nguồn"""
+        with self.lock:
+            counters = self.counter_totals()
+            stages = {stage: histogram.to_dict() for stage, histogram in self.stage_totals().items()}
+            sources = {}
+            for (name, source_url), value in self.counters.items():
+                if source_url:
+                    sources.setdefault(source_url, {'counters': {}, 'stages': {}})['counters'][name] = value
+            for (stage, source_url), histogram in self.histograms.items():
+                if source_url:
+                    sources.setdefault(source_url, {'counters': {}, 'stages': {}})['stages'][stage] = histogram.to_dict()
+
+        elapsed = time.time() - self.started
+        items = counters.get('items_parsed', 0)
+        parse = stages.get('parse')
+        return {
+            'elapsed_sec': round(elapsed, 3),
+            'pages_per_sec': round(counters.get('pages_fetched', 0) / elapsed, 3) if elapsed else None,
+            'parse_ms_per_item': round(parse['sum'] * 1000 / items, 4) if parse and items else None,
+            'counters': counters,
+            'stages': stages,
+            'sources': sources,
+            **self.collect(),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def labels(source_url, **extra):
+        pairs = dict(extra)
+        if source_url:
+            pairs['source'] = source_url
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs.items()) + '}'
+
+    def prometheus_text(self):
+        """Nội dung theo định dạng text exposition của Prometheus"""
+        lines = []
+        with self.lock:
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f'# TYPE crawler_{name}_total counter')
+                for (counter_name, source_url), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f'crawler_{name}_total{self.labels(source_url)} {value}')
+
+            stages = sorted({stage for stage, _ in self.histograms})
+            for stage in stages:
+                metric = f'crawler_{stage}_seconds'
+                if stage in STAGES:
+                    lines.append(f'# HELP {metric} {STAGES[stage]}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (histogram_stage, source_url), histogram in sorted(self.histograms.items()):
+                    if histogram_stage != stage:
+                        continue
+                    cumulative = 0
+                    for bucket, bucket_count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'{metric}_bucket{self.labels(source_url, le=bucket)} {cumulative}')
+                    lines.append(f'{metric}_sum{self.labels(source_url)} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{self.labels(source_url)} {histogram.count}')
+
+        # Số liệu từ collector: chỉ các giá trị số, xuất dạng gauge
+        for name, values in self.collect().items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE crawler_{name}_{key} gauge')
+                    lines.append(f'crawler_{name}_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        """Ghi file .prom qua file tạm để node_exporter không đọc phải file ghi dở"""
+        with self.flush_lock:
+            self._write_prometheus(path or self.prometheus_path)
+
+    def _write_prometheus(self, path):
+        # Mỗi lần ghi một file tạm riêng cùng thư mục để os.replace không đụng file tạm của lần ghi khác
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path) or '.',
+                                         prefix=f'.{os.path.basename(path)}.', suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            try:
+                f.write(self.prometheus_text())
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, path)
+        self.last_flush = time.monotonic()
+
+    def flush_due(self):
+        return time.monotonic() - self.last_flush >= self.prometheus_interval
+
+    def maybe_flush(self):
+        """Cập nhật file Prometheus định kỳ trong lúc crawl; nhiều luồng cùng đến hạn thì chỉ một luồng ghi"""
+        if not self.prometheus_path or not self.flush_due():
+            return
+        with self.flush_lock:
+            # Luồng khác có thể vừa ghi xong trong lúc chờ lock
+            if self.flush_due():
+                self._write_prometheus(self.prometheus_path)
@@ -0,0 +1,150 @@
+import re
+from datetime import datetime, timedelta
+
+# Đơn vị giá -> số VND
+PRICE_UNITS = {
+    'tỷ': 1_000_000_000,
+    'tỉ': 1_000_000_000,
+    'triệu': 1_000_000,
+    'nghìn': 1_000,
+    'ngàn': 1_000,
+    'vnđ': 1,
+    'vnd': 1,
+    'đồng': 1,
+    'đ': 1,
+}
+
+# Đơn vị diện tích -> m²
+AREA_UNITS = {
+    'm2': 1,
+    'm²': 1,
+    'm': 1,
+    'ha': 10_000,
+    'km2': 1_000_000,
+}
+
+# Các cột số thêm vào mỗi listing và kiểu dữ liệu khi export dạng cột
+NUMERIC_COLUMNS = {
+    'price_vnd': 'Int64',
+    'price_per_m2': 'float64',
+    'area_m2': 'float64',
+    'width_m': 'float64',
+    'length_m': 'float64',
+    'floors_count': 'Int64',
+    'road_width_m': 'float64',
+}
+
+NUMBER = r'\d+(?:[.,]\d+)*'
+NUMBER_RE = re.compile(NUMBER)
+THOUSANDS_RE = re.compile(r'\d{1,3}(?:\.\d{3})+')
+PRICE_PART_RE = re.compile(
+    rf"({NUMBER})\s*({'|'.join(sorted(PRICE_UNITS, key=len, reverse=True))})(?!\w)", re.IGNORECASE)
+PER_M2_RE = re.compile(r'/\s*m(?:2|²)', re.IGNORECASE)
+AREA_RE = re.compile(rf"({NUMBER})\s*({'|'.join(sorted(AREA_UNITS, key=len, reverse=True))})?(?!\w)", re.IGNORECASE)
+DIMENSIONS_RE = re.compile(rf'({NUMBER})\s*m?\s*[x×*]\s*({NUMBER})', re.IGNORECASE)
+INT_RE = re.compile(r'\d+')
+POST_DATE_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+# Ngày đăng dạng tương đối -> số ngày trước ngày crawl
+RELATIVE_POST_DATES = {'hôm nay': 0, 'hôm qua': 1}
+
+
+def parse_number(text):
+    """Đọc số kiểu Việt Nam: ',' là dấu thập phân, '.' phân cách hàng nghìn (1.250 = 1250)"""
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    elif THOUSANDS_RE.fullmatch(text):
+        text = text.replace('.', '')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_price(text):
+    """'3,5 tỷ' -> (3500000000, False); '45 triệu/m2' -> (45000000, True); không đọc được -> (None, False)"""
+    if not text:
+        return None, False
+    total = 0.0
+    found = False
+    for number, unit in PRICE_PART_RE.findall(text):
+        value = parse_number(number)
+        if value is not None:
+            total += value * PRICE_UNITS[unit.lower()]
+            found = True
+    if not found:
+        return None, False
+    return total, bool(PER_M2_RE.search(text))
+
+
+def parse_area(text):
+    """'Diện tích: 78,5 m2' -> 78.5 (m²)"""
+    if not text:
+        return None
+    match = AREA_RE.search(text)
+    if not match:
+        return None
+    value = parse_number(match.group(1))
+    if value is None:
+        return None
+    return value * AREA_UNITS.get((match.group(2) or 'm2').lower(), 1)
+
+
+def parse_dimensions(text):
+    """'4 x 15m' -> (4.0, 15.0); chỉ có một số thì coi là mặt tiền"""
+    if not text:
+        return None, None
+    match = DIMENSIONS_RE.search(text)
+    if match:
+        return parse_number(match.group(1)), parse_number(match.group(2))
+    match = NUMBER_RE.search(text)
+    return (parse_number(match.group(0)) if match else None), None
+
+
+def parse_first_number(text):
+    match = NUMBER_RE.search(text) if text else None
+    return parse_number(match.group(0)) if match else None
+
+
+def parse_int(text):
+    match = INT_RE.search(text) if text else None
+    return int(match.group(0)) if match else None
+
+
+def parse_post_date(text, crawl_time=None):
+    """'Ngày đăng: 08/08/2025' -> '2025-08-08'; 'Hôm nay'/'Hôm qua' tính từ crawl_time ('YYYY-MM-DD HH:MM:SS')"""
+    if not text:
+        return None
+    match = POST_DATE_RE.search(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        try:
+            return datetime(year, month, day).strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    days_ago = RELATIVE_POST_DATES.get(text.rsplit(':', 1)[-1].strip().lower())
+    if days_ago is None:
+        return None
+    reference = datetime.strptime(crawl_time[:10], '%Y-%m-%d') if crawl_time else datetime.now()
+    return (reference - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+def normalize_listing(property_data):
+    """Thêm các cột số (VND, m², mét, số tầng) vào listing, chạy một lần ngay khi parse"""
+    price, per_m2 = parse_price(property_data.get('price'))
+    area_m2 = parse_area(property_data.get('area_text') or property_data.get('area'))
+    width, length = parse_dimensions(property_data.get('dimensions'))
+
+    if price is not None and per_m2:
+        price_per_m2 = price
+        price = price * area_m2 if area_m2 else None
+    else:
+        price_per_m2 = price / area_m2 if price is not None and area_m2 else None
+
+    property_data['price_vnd'] = round(price) if price is not None else None
+    property_data['price_per_m2'] = round(price_per_m2) if price_per_m2 is not None else None
+    property_data['area_m2'] = area_m2
+    property_data['width_m'] = width
+    property_data['length_m'] = length
+    property_data['floors_count'] = parse_int(property_data.get('floors'))
+    property_data['road_width_m'] = parse_first_number(property_data.get('road_width'))
+    return property_data
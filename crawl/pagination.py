@@ -0,0 +1,72 @@
+import re
+from urllib.parse import urlparse, urlunparse
+
+from bs4 import BeautifulSoup
+
+from parsers import available_parsers
+
+# Trang N của alonhadat: .../ha-noi/trang--N.html (URL cũ dùng .htm)
+PAGE_SUFFIX_RE = re.compile(r'/trang--\d+(\.html?)$')
+EXTENSION_RE = re.compile(r'\.html?$')
+# Đường nhanh: khối phân trang không lồng thẻ; markup khác (lồng div/ul, class không có nháy...) thì parse cây
+PAGINATION_RE = re.compile(
+    r'<(div|ul)\b[^>]*class=(["\'])[^"\']*\bpagination\b[^"\']*\2[^>]*>(.*?)</\1>', re.IGNORECASE | re.DOTALL)
+NESTED_BLOCK_RE = re.compile(r'<(?:div|ul)\b', re.IGNORECASE)
+PAGE_LINK_RE = re.compile(r'trang--(\d+)\.html?', re.IGNORECASE)
+LINK_TEXT_RE = re.compile(r'<a\b[^>]*>\s*(\d+)\s*</a>', re.IGNORECASE)
+
+
+def detect_url_pattern(url):
+    """Mẫu URL các trang của một URL danh sách, có chỗ {page}; giữ nguyên đuôi .htm/.html và query"""
+    parsed = urlparse(url.strip())
+    path = parsed.path
+
+    match = PAGE_SUFFIX_RE.search(path)
+    if match:
+        # URL đã là trang N: bỏ phần trang--N để lấy gốc
+        base, extension = path[:match.start()], match.group(1)
+    else:
+        match = EXTENSION_RE.search(path)
+        if match:
+            base, extension = path[:match.start()], match.group(0)
+        else:
+            base, extension = path.rstrip('/'), '.html'
+
+    return urlunparse(parsed._replace(path=f"{base}/trang--{{page}}{extension}"))
+
+
+def get_page_url(crawl_url, page):
+    """URL của trang thứ page (trang 1 là chính URL gốc)"""
+    if page == 1:
+        return crawl_url
+    return detect_url_pattern(crawl_url).format(page=page)
+
+
+def total_pages_from_html(content):
+    """Số trang lớn nhất trong khối phân trang (theo link trang--N và số trên link), 1 nếu không có"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='ignore')
+    if 'pagination' not in content.lower():
+        return 1
+    match = PAGINATION_RE.search(content)
+    if match and not NESTED_BLOCK_RE.search(match.group(3)):
+        block = match.group(3)
+        pages = [int(page) for page in PAGE_LINK_RE.findall(block)]
+        pages.extend(int(page) for page in LINK_TEXT_RE.findall(block))
+        return max(pages, default=1)
+    return total_pages_from_tree(content)
+
+
+def total_pages_from_tree(content):
+    """Như total_pages_from_html nhưng tìm khối phân trang trên cây DOM (chịu được thẻ lồng nhau)"""
+    soup = BeautifulSoup(content, 'lxml' if 'lxml' in available_parsers() else 'html.parser')
+    pagination = soup.find(['div', 'ul'], class_='pagination')
+    if pagination is None:
+        return 1
+    pages = []
+    for link in pagination.find_all('a'):
+        pages.extend(int(page) for page in PAGE_LINK_RE.findall(link.get('href') or ''))
+        text = link.get_text(strip=True)
+        if text.isdigit():
+            pages.append(int(text))
+    return max(pages, default=1)
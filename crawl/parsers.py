@@ -0,0 +1,393 @@
+import logging
+import re
+import signal
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup, Tag
+
+from normalize import normalize_listing
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://alonhadat.com.vn"
+
+# Thứ tự cột khi export
+COLUMN_ORDER = [
+    'source_name', 'title', 'price', 'price_vnd', 'price_per_m2', 'area', 'area_m2', 'area_text',
+    'dimensions', 'width_m', 'length_m', 'direction', 'floors', 'floors_count', 'road_width',
+    'road_width_m', 'address', 'description', 'post_date', 'vip_level', 'detail_url', 'image_url',
+    'source_url', 'crawl_time'
+]
+
+
+WHITESPACE_RE = re.compile(r'\s+')
+AREA_NUMBER_RE = re.compile(r'(\d+(?:[.,]\d+)?)')
+DIMENSIONS_RE = re.compile(r'KT:\s*(.+)')
+DIRECTION_RE = re.compile(r'Hướng:\s*(.+)')
+PRICE_RE = re.compile(r'Giá:\s*(.+)')
+
+# Kế hoạch trích xuất: (khoá, thẻ, class) của các phần tử cần trong một content-item.
+# Cả item chỉ được duyệt một lần, mỗi khoá giữ phần tử khớp đầu tiên (giống find())
+FIELD_PLAN = (
+    ('title', 'div', 'ct_title'),
+    ('date', 'div', 'ct_date'),
+    ('vip', 'div', 'vipstar'),
+    ('thumbnail', 'div', 'thumbnail'),
+    ('brief', 'div', 'ct_brief'),
+    ('area', 'div', 'ct_dt'),
+    ('size', 'div', 'ct_kt'),
+    ('direction', 'div', 'ct_direct'),
+    ('road_width', 'span', 'road-width'),
+    ('floors', 'span', 'floors'),
+    ('price', 'div', 'ct_price'),
+    ('price_fallback', 'div', 'ct*price'),
+    ('address', 'div', 'ct_dis'),
+)
+# (thẻ, class) -> các khoá cần phần tử đó
+PLAN_INDEX = {}
+for _key, _tag, _cls in FIELD_PLAN:
+    PLAN_INDEX.setdefault((_tag, _cls), []).append(_key)
+
+# Trường "Nhãn: giá trị": trường -> (khoá phần tử, regex lấy phần giá trị)
+LABELLED_FIELDS = (
+    ('dimensions', 'size', DIMENSIONS_RE),
+    ('direction', 'direction', DIRECTION_RE),
+)
+
+
+def clean_text(text):
+    """Làm sạch text"""
+    if not text:
+        return ""
+    return WHITESPACE_RE.sub(' ', text.strip())
+
+
+@lru_cache(maxsize=1024)
+def get_url_name(url):
+    """Lấy tên ngắn gọn từ URL (mỗi URL nguồn chỉ tính một lần)"""
+    parsed_url = urlparse(url)
+    path = parsed_url.path.strip('/')
+    if path:
+        # Lấy phần cuối của path và loại bỏ đuôi .htm/.html
+        name = re.sub(r'\.html?$', '', path.split('/')[-1])
+        # Làm ngắn gọn hơn
+        if len(name) > 50:
+            name = name[:50] + "..."
+        return name
+    return "unknown"
+
+
+def page_constants(source_url):
+    """Các trường giống nhau cho mọi item của một trang, tính một lần mỗi trang"""
+    return {
+        'source_url': source_url,
+        'source_name': get_url_name(source_url),
+        'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def parse_property_item(item, source_url, base_url=BASE_URL, page=None):
+    """Parse thông tin từ một item bất động sản"""
+    return extract_property_item(BS_DOM, item, source_url, base_url, page)
+
+
+def parse_page(content, source_url, base_url=BASE_URL):
+    """Parse toàn bộ một trang danh sách, trả về list các item có tiêu đề"""
+    soup = BeautifulSoup(content, 'html.parser')
+    items = soup.find_all('div', class_='content-item')
+
+    page = page_constants(source_url)
+    page_data = []
+    for item in items:
+        property_data = parse_property_item(item, source_url, base_url, page)
+        if property_data and property_data.get('title'):
+            page_data.append(property_data)
+    return page_data
+
+
+class BsDom:
+    """Truy cập cây BeautifulSoup qua cùng giao diện với LxmlDom/SelectolaxDom"""
+
+    def walk(self, node):
+        """(thẻ, các class, phần tử) của mọi phần tử con cháu, theo thứ tự trong tài liệu"""
+        for child in node.descendants:
+            if isinstance(child, Tag):
+                yield child.name, child.get('class') or (), child
+
+    def find(self, node, tag, cls=None):
+        return node.find(tag, class_=cls) if cls else node.find(tag)
+
+    def text(self, node):
+        return node.get_text()
+
+    def attr(self, node, name, default=''):
+        return node.get(name, default)
+
+    def classes(self, node):
+        return node.get('class', [])
+
+    def text_without_links(self, node):
+        for link in node.find_all('a'):
+            link.decompose()
+        return node.get_text()
+
+
+class LxmlDom:
+    """Truy cập cây lxml theo đúng ngữ nghĩa find/get_text của BeautifulSoup"""
+
+    def __init__(self):
+        self.parser = lxml.html.HTMLParser(encoding='utf-8')
+        self.finders = {}
+
+    def parse(self, content):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return lxml.html.document_fromstring(content, parser=self.parser)
+
+    def compile(self, tag, cls=None, prefix='.//'):
+        key = (prefix, tag, cls)
+        finder = self.finders.get(key)
+        if finder is None:
+            expr = f"{prefix}{tag}"
+            if cls:
+                expr += f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+            finder = self.finders[key] = etree.XPath(f"({expr})[1]" if prefix == './/' else expr)
+        return finder
+
+    def find_items(self, root):
+        return self.compile('div', 'content-item', prefix='//')(root)
+
+    def walk(self, node):
+        for child in node.iterdescendants():
+            # Bỏ qua comment/processing instruction (tag không phải chuỗi)
+            if isinstance(child.tag, str):
+                yield child.tag, (child.get('class') or '').split(), child
+
+    def find(self, node, tag, cls=None):
+        found = self.compile(tag, cls)(node)
+        return found[0] if found else None
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name, default=''):
+        return node.get(name, default)
+
+    def classes(self, node):
+        return (node.get('class') or '').split()
+
+    def text_without_links(self, node):
+        parts = []
+
+        def walk(elem):
+            if elem.text and isinstance(elem.tag, str):
+                parts.append(elem.text)
+            for child in elem:
+                if isinstance(child.tag, str) and child.tag != 'a':
+                    walk(child)
+                if child.tail:
+                    parts.append(child.tail)
+
+        walk(node)
+        return ''.join(parts)
+
+
+class SelectolaxDom:
+    """Truy cập cây selectolax (lexbor) theo đúng ngữ nghĩa find/get_text của BeautifulSoup"""
+
+    def parse(self, content):
+        return LexborHTMLParser(content)
+
+    def find_items(self, root):
+        return root.css('div[class~="content-item"]')
+
+    def walk(self, node):
+        for child in node.traverse(include_text=False):
+            # traverse() gồm cả chính node và comment
+            if child is not node and child.tag[0] not in '-_!':
+                yield child.tag, (child.attributes.get('class') or '').split(), child
+
+    def find(self, node, tag, cls=None):
+        return node.css_first(f'{tag}[class~="{cls}"]' if cls else tag)
+
+    def text(self, node):
+        return node.text(deep=True, separator='', strip=False)
+
+    def attr(self, node, name, default=''):
+        attributes = node.attributes
+        if name not in attributes:
+            return default
+        return attributes[name] or ''
+
+    def classes(self, node):
+        return (node.attributes.get('class') or '').split()
+
+    def text_without_links(self, node):
+        parts = []
+
+        def walk(elem):
+            for child in elem.iter(include_text=True):
+                if child.tag == '-text':
+                    parts.append(child.text_content)
+                elif child.tag != 'a' and not child.tag.startswith(('_', '!')):
+                    walk(child)
+
+        walk(node)
+        return ''.join(parts)
+
+
+def collect_elements(dom, item):
+    """Một lượt duyệt item: khoá trong FIELD_PLAN -> phần tử khớp đầu tiên"""
+    found = {}
+    for tag, classes, node in dom.walk(item):
+        for cls in classes:
+            for key in PLAN_INDEX.get((tag, cls), ()):
+                if key not in found:
+                    found[key] = node
+        if len(found) == len(FIELD_PLAN):
+            break
+    return found
+
+
+def extract_property_item(dom, item, source_url, base_url=BASE_URL, page=None):
+    """Parse một item qua lớp truy cập dom, theo FIELD_PLAN với một lượt duyệt cây"""
+    try:
+        property_data = dict(page or page_constants(source_url))
+        found = collect_elements(dom, item)
+
+        title_elem = found.get('title')
+        link_elem = dom.find(title_elem, 'a') if title_elem is not None else None
+        if link_elem is not None:
+            property_data['title'] = clean_text(dom.text(link_elem))
+            property_data['detail_url'] = urljoin(base_url, dom.attr(link_elem, 'href'))
+            property_data['vip_class'] = dom.classes(link_elem)
+        else:
+            property_data['title'] = clean_text(dom.text(title_elem)) if title_elem is not None else ''
+            property_data['detail_url'] = ''
+            property_data['vip_class'] = []
+
+        date_elem = found.get('date')
+        property_data['post_date'] = clean_text(dom.text(date_elem)) if date_elem is not None else ''
+
+        vip_elem = found.get('vip')
+        vip_classes = dom.classes(vip_elem) if vip_elem is not None else []
+        property_data['vip_level'] = next((cls for cls in vip_classes if cls.startswith('vip-')), '')
+
+        img_elem = found.get('thumbnail')
+        img_tag = dom.find(img_elem, 'img') if img_elem is not None else None
+        if img_tag is not None:
+            property_data['image_url'] = urljoin(base_url, dom.attr(img_tag, 'src'))
+            property_data['image_alt'] = dom.attr(img_tag, 'alt')
+        else:
+            property_data['image_url'] = ''
+            property_data['image_alt'] = ''
+
+        brief_elem = found.get('brief')
+        property_data['description'] = clean_text(dom.text_without_links(brief_elem)) if brief_elem is not None else ''
+
+        area_elem = found.get('area')
+        if area_elem is not None:
+            area_text = dom.text(area_elem)
+            area_match = AREA_NUMBER_RE.search(area_text.replace(',', '.'))
+            property_data['area'] = area_match.group(1) if area_match else ''
+            property_data['area_text'] = clean_text(area_text)
+        else:
+            property_data['area'] = ''
+            property_data['area_text'] = ''
+
+        for field, key, pattern in LABELLED_FIELDS:
+            property_data[field] = labelled_value(dom, found.get(key), pattern)
+
+        for field in ('road_width', 'floors'):
+            elem = found.get(field)
+            property_data[field] = clean_text(dom.text(elem)) if elem is not None else ''
+
+        price_elem = found.get('price')
+        if price_elem is None:
+            price_elem = found.get('price_fallback')
+        property_data['price'] = labelled_value(dom, price_elem, PRICE_RE)
+
+        address_elem = found.get('address')
+        property_data['address'] = clean_text(dom.text(address_elem)) if address_elem is not None else ''
+
+        return normalize_listing(property_data)
+
+    except Exception as e:
+        logger.error(f"Lỗi khi parse item: {e}")
+        return None
+
+
+def labelled_value(dom, elem, pattern):
+    """Phần sau nhãn (vd. "Giá: ...") của phần tử, hoặc cả text nếu không có nhãn"""
+    if elem is None:
+        return ''
+    text = dom.text(elem)
+    match = pattern.search(text)
+    return match.group(1).strip() if match else clean_text(text)
+
+
+def parse_page_with_dom(dom, content, source_url, base_url=BASE_URL):
+    page = page_constants(source_url)
+    page_data = []
+    for item in dom.find_items(dom.parse(content)):
+        property_data = extract_property_item(dom, item, source_url, base_url, page)
+        if property_data and property_data.get('title'):
+            page_data.append(property_data)
+    return page_data
+
+
+BS_DOM = BsDom()
+_doms = {}
+
+
+def parse_page_lxml(content, source_url, base_url=BASE_URL):
+    """Parse một trang bằng lxml (libxml2)"""
+    dom = _doms.get('lxml') or _doms.setdefault('lxml', LxmlDom())
+    return parse_page_with_dom(dom, content, source_url, base_url)
+
+
+def parse_page_selectolax(content, source_url, base_url=BASE_URL):
+    """Parse một trang bằng selectolax (lexbor)"""
+    dom = _doms.get('selectolax') or _doms.setdefault('selectolax', SelectolaxDom())
+    return parse_page_with_dom(dom, content, source_url, base_url)
+
+
+# Tên backend -> (hàm parse trang, module cần có)
+PARSER_BACKENDS = {
+    'html.parser': (parse_page, BeautifulSoup),
+    'lxml': (parse_page_lxml, lxml),
+    'selectolax': (parse_page_selectolax, LexborHTMLParser),
+}
+
+
+def available_parsers():
+    """Các backend parse dùng được trong môi trường hiện tại"""
+    return [name for name, (_, module) in PARSER_BACKENDS.items() if module is not None]
+
+
+def get_page_parser(name='html.parser'):
+    """Lấy hàm parse trang theo tên backend"""
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Parser không hỗ trợ: {name} (chọn một trong {', '.join(PARSER_BACKENDS)})")
+    parse_func, module = PARSER_BACKENDS[name]
+    if module is None:
+        raise ImportError(f"Parser {name} chưa được cài đặt (pip install {name})")
+    return parse_func
+
+
+def init_parse_worker():
+    """Khởi tạo process parse: bỏ qua Ctrl-C, để process chính tự dừng pool"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Tốc độ mặc định mỗi host khi không chỉ định --rps (crawl song song, daemon, trang chi tiết)
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+
+# Mã trạng thái nên thử lại; 429/503 là server báo quá tải -> phải giảm tốc
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+# Sai số làm tròn khi cộng token: ngủ đúng delay đã tính có thể vẫn thiếu ~1e-13 token
+TOKEN_EPSILON = 1e-9
+
+
+def parse_retry_after(value):
+    """Header Retry-After (số giây hoặc HTTP date) -> số giây cần chờ, None nếu không đọc được"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff có jitter (full jitter) để các worker không retry cùng lúc"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Token bucket giới hạn số request mỗi giây (an toàn đa luồng)"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self.tokens = self.capacity
+        # Đồng hồ và hàm ngủ (test truyền đồng hồ giả)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def set_rate(self, rate, burst=None):
+        with self.lock:
+            self._refill(self.clock())
+            self.rate = float(rate)
+            self.capacity = float(burst) if burst else max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self, tokens=1):
+        """Chờ đến khi đủ token, trả về số giây đã phải chờ"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(self.clock())
+                if self.tokens >= tokens - TOKEN_EPSILON:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """Mỗi host một token bucket, dùng chung cho tất cả các worker"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, self.clock, self.sleep)
+                self.buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """Chờ lượt request cho host của url"""
+        return self.get_bucket(url).acquire()
+
+    def release(self, url, status=None, latency=None, retry_after=None):
+        """Tốc độ cố định: không cần điều chỉnh theo kết quả request"""
+
+
+class HostController:
+    """Trạng thái điều tốc của một host: token bucket, số request đồng thời, thời điểm được gửi lại"""
+
+    def __init__(self, rate, concurrency):
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.paused_until = 0.0
+        self.last_decrease = float('-inf')
+        self.successes = 0
+        self.latency = None  # EWMA độ trễ
+
+
+class AdaptiveRateLimiter:
+    """Điều tốc kiểu AIMD theo từng host: tăng dần tốc độ và số request đồng thời khi server
+    trả lời nhanh và ổn định, giảm một nửa khi gặp 429/503 hoặc độ trễ tăng, tôn trọng Retry-After"""
+
+    def __init__(self, rate, min_rate=0.2, max_rate=None, max_concurrency=1, latency_target=2.0,
+                 increase_step=0.5, decrease_factor=0.5, cooldown=5.0, clock=time.monotonic):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or self.rate * 5
+        self.max_concurrency = max(1, max_concurrency)
+        self.latency_target = latency_target
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        # Đồng hồ cho tạm dừng/cooldown (test truyền đồng hồ giả)
+        self.clock = clock
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.decreases = 0
+
+    def get_host(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            controller = self.hosts.get(host)
+            if controller is None:
+                controller = self.hosts[host] = HostController(self.rate, min(2, self.max_concurrency))
+            return controller
+
+    def acquire(self, url):
+        """Chờ hết thời gian tạm dừng, chờ slot đồng thời rồi chờ token; trả về số giây đã chờ"""
+        controller = self.get_host(url)
+        start = self.clock()
+        with controller.condition:
+            while True:
+                pause = controller.paused_until - self.clock()
+                if pause > 0:
+                    controller.condition.wait(pause)
+                elif controller.in_flight >= controller.concurrency:
+                    controller.condition.wait()
+                else:
+                    controller.in_flight += 1
+                    break
+        controller.bucket.acquire()
+        return self.clock() - start
+
+    def release(self, url, status=None, latency=None, retry_after=None):
+        """Trả slot và điều chỉnh tốc độ theo kết quả request (status None = lỗi mạng, không đổi tốc độ)"""
+        controller = self.get_host(url)
+        with controller.condition:
+            controller.in_flight -= 1
+            now = self.clock()
+            if latency is not None:
+                controller.latency = latency if controller.latency is None else 0.8 * controller.latency + 0.2 * latency
+
+            slow = status is not None and (controller.latency or 0) > self.latency_target
+            if status in THROTTLE_STATUSES or slow:
+                if retry_after:
+                    controller.paused_until = max(controller.paused_until, now + retry_after)
+                # Nhiều request đang bay cùng bị 429: chỉ giảm một lần mỗi cooldown
+                if now - controller.last_decrease >= self.cooldown:
+                    self.decrease(controller, now)
+            elif status is not None and status < 400:
+                controller.successes += 1
+                if controller.successes >= controller.concurrency and now - controller.last_decrease >= self.cooldown:
+                    self.increase(controller)
+            controller.condition.notify_all()
+
+    def decrease(self, controller, now):
+        rate = max(self.min_rate, controller.bucket.rate * self.decrease_factor)
+        controller.bucket.set_rate(rate)
+        controller.concurrency = max(1, controller.concurrency // 2)
+        controller.successes = 0
+        controller.last_decrease = now
+        self.decreases += 1
+
+    def increase(self, controller):
+        controller.bucket.set_rate(min(self.max_rate, controller.bucket.rate + self.increase_step))
+        controller.concurrency = min(self.max_concurrency, controller.concurrency + 1)
+        controller.successes = 0
+
+    def snapshot(self):
+        """Tốc độ và số request đồng thời hiện tại của từng host"""
+        with self.lock:
+            return {host: {'rate': round(controller.bucket.rate, 2), 'concurrency': controller.concurrency}
+                    for host, controller in self.hosts.items()}
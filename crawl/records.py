@@ -0,0 +1,148 @@
+import math
+from array import array
+
+from enrichment import DETAIL_COLUMNS
+from normalize import NUMERIC_COLUMNS
+from parsers import COLUMN_ORDER
+
+# Cột lặp lại nhiều (cùng nguồn, cùng lần crawl, vài mức VIP): lưu mã số + bảng giá trị dùng chung
+DICTIONARY_COLUMNS = ('source_url', 'source_name', 'crawl_time', 'vip_level', 'direction', 'post_date')
+
+# Cột số lưu trong array('d'), NaN thay cho None
+FLOAT_COLUMNS = {**NUMERIC_COLUMNS, 'latitude': 'float64', 'longitude': 'float64'}
+
+SCHEMA = COLUMN_ORDER + DETAIL_COLUMNS
+
+
+class Dictionary:
+    """Bảng giá trị của một cột mã hoá: giá trị -> mã và ngược lại"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return None if code < 0 else self.values[code]
+
+
+class ListingBatch:
+    """Lưu listing theo cột thay cho mỗi tin một dict: cột lặp lại được mã hoá từ điển,
+    cột số nằm trong array('d'); chỉ giữ các cột export (bỏ vip_class, image_alt)"""
+
+    def __init__(self, items=None):
+        self.size = 0
+        self.columns = {}
+        for column in SCHEMA:
+            if column in DICTIONARY_COLUMNS:
+                self.columns[column] = array('i')
+            elif column in FLOAT_COLUMNS:
+                self.columns[column] = array('d')
+            else:
+                self.columns[column] = []
+        self.dictionaries = {column: Dictionary() for column in DICTIONARY_COLUMNS}
+        # Cột đã từng có dữ liệu, để DataFrame chỉ gồm các cột thực sự có (giống list dict trước đây)
+        self.present = set()
+        if items:
+            self.extend(items)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, item):
+        self.present.update(column for column in item if column in self.columns)
+        for column, values in self.columns.items():
+            value = item.get(column)
+            if column in self.dictionaries:
+                values.append(self.dictionaries[column].encode(value))
+            elif column in FLOAT_COLUMNS:
+                values.append(math.nan if value is None else value)
+            else:
+                values.append(value)
+        self.size += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def get(self, index, column):
+        value = self.columns[column][index]
+        if column in self.dictionaries:
+            return self.dictionaries[column].decode(value)
+        if column in FLOAT_COLUMNS:
+            if math.isnan(value):
+                return None
+            return int(value) if FLOAT_COLUMNS[column] == 'Int64' else value
+        return value
+
+    def set(self, index, column, value):
+        self.present.add(column)
+        if column in self.dictionaries:
+            value = self.dictionaries[column].encode(value)
+        elif column in FLOAT_COLUMNS and value is None:
+            value = math.nan
+        self.columns[column][index] = value
+
+    def column(self, column):
+        """Toàn bộ giá trị một cột dạng list Python"""
+        return [self.get(index, column) for index in range(self.size)]
+
+    def row(self, index):
+        return {column: self.get(index, column) for column in SCHEMA if column in self.present}
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.row(index)
+
+    def to_frame(self):
+        """DataFrame theo thứ tự SCHEMA; cột mã hoá thành Categorical, không phải dựng lại từng dict"""
+        # Import khi export mới cần, để khởi động nhanh (chế độ daemon, worker)
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for column in SCHEMA:
+            if column not in self.present:
+                continue
+            values = self.columns[column]
+            if column in self.dictionaries:
+                codes = np.frombuffer(values, dtype=np.int32) if self.size else np.empty(0, dtype=np.int32)
+                data[column] = pd.Categorical.from_codes(codes, categories=self.dictionaries[column].values)
+            elif column in FLOAT_COLUMNS:
+                floats = np.frombuffer(values, dtype=np.float64) if self.size else np.empty(0)
+                data[column] = pd.Series(floats).astype(FLOAT_COLUMNS[column])
+            else:
+                data[column] = values
+        return pd.DataFrame(data)
+
+    @classmethod
+    def concat(cls, batches):
+        """Gộp nhiều batch theo thứ tự (mã từ điển được ánh xạ lại sang bảng chung)"""
+        merged = cls()
+        for batch in batches:
+            merged.present |= batch.present
+            for column, values in batch.columns.items():
+                if column in merged.dictionaries:
+                    mapping = [merged.dictionaries[column].encode(value) for value in batch.dictionaries[column].values]
+                    merged.columns[column].extend(-1 if code < 0 else mapping[code] for code in values)
+                else:
+                    merged.columns[column].extend(values)
+            merged.size += batch.size
+        return merged
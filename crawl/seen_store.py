@@ -0,0 +1,71 @@
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+# Các trường dùng để nhận biết tin đã thay đổi
+FINGERPRINT_FIELDS = ('title', 'price', 'area', 'dimensions', 'address', 'description', 'vip_level')
+
+
+class SeenStore:
+    """Tập detail_url đã thấy ở các lần chạy trước (SQLite), dùng cho crawl incremental"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS seen (
+                detail_url TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            ) WITHOUT ROWID;
+        ''')
+
+    @staticmethod
+    def fingerprint(item):
+        raw = '\x1f'.join(str(item.get(field, '')) for field in FINGERPRINT_FIELDS)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def key(self, item, fingerprint):
+        # Tin không có link chi tiết thì nhận diện bằng nội dung
+        return item.get('detail_url') or f"#{fingerprint}"
+
+    def classify(self, page_data):
+        """Tách các item mới/đã đổi; trả về (list item mới hoặc đã đổi, số item đã biết không đổi)"""
+        keyed = []
+        for item in page_data:
+            fingerprint = self.fingerprint(item)
+            keyed.append((self.key(item, fingerprint), fingerprint, item))
+        if not keyed:
+            return [], 0
+
+        placeholders = ','.join('?' * len(keyed))
+        with self.lock:
+            rows = self.conn.execute(f'SELECT detail_url, fingerprint FROM seen WHERE detail_url IN ({placeholders})',
+                                     [key for key, _, _ in keyed]).fetchall()
+        known = dict(rows)
+
+        fresh = [item for key, fingerprint, item in keyed if known.get(key) != fingerprint]
+        return fresh, len(keyed) - len(fresh)
+
+    def mark_seen(self, page_data):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for item in page_data:
+            fingerprint = self.fingerprint(item)
+            rows.append((self.key(item, fingerprint), fingerprint, now, now))
+        with self.lock, self.conn:
+            self.conn.executemany('''
+                INSERT INTO seen VALUES (?, ?, ?, ?)
+                ON CONFLICT(detail_url) DO UPDATE SET fingerprint = excluded.fingerprint, last_seen = excluded.last_seen
+            ''', rows)
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
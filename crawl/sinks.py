@@ -0,0 +1,73 @@
+import csv
+import json
+import logging
+import os
+import threading
+
+from parsers import COLUMN_ORDER
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlSink:
+    """Ghi nối tiếp từng trang ra file JSON Lines (mỗi dòng một item)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+        self.items_written = 0
+
+    def write_page(self, page_data):
+        with self.lock:
+            for item in page_data:
+                self.file.write(json.dumps(item, ensure_ascii=False) + '\n')
+            self.file.flush()
+            self.items_written += len(page_data)
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class CsvSink:
+    """Ghi nối tiếp từng trang ra file CSV theo COLUMN_ORDER"""
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns or COLUMN_ORDER
+        self.lock = threading.Lock()
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        # BOM để Excel đọc đúng tiếng Việt, chỉ ghi ở đầu file mới
+        self.file = open(path, 'a', encoding='utf-8-sig' if is_new else 'utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+        if is_new:
+            self.writer.writeheader()
+        self.items_written = 0
+
+    def write_page(self, page_data):
+        with self.lock:
+            self.writer.writerows(page_data)
+            self.file.flush()
+            self.items_written += len(page_data)
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+SINKS = {
+    '.jsonl': JsonlSink,
+    '.csv': CsvSink,
+}
+
+
+def open_sink(path):
+    """Mở sink theo đuôi file (.csv hoặc .jsonl)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"Định dạng stream không hỗ trợ: {path} (dùng {', '.join(SINKS)})")
+    logger.info(f"Ghi dữ liệu trực tiếp ra {path}")
+    return SINKS[ext](path)
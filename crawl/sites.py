@@ -0,0 +1,258 @@
+# sites.py - Adapter cho từng trang BĐS: cách tải, selector thẻ tin, map trường và phân trang
+import logging
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from bs4 import BeautifulSoup
+
+from enrichment import parse_detail_page
+from normalize import normalize_listing
+from pagination import get_page_url, total_pages_from_html
+from parsers import AREA_NUMBER_RE, BASE_URL, COLUMN_ORDER, clean_text, get_page_parser, page_constants
+
+logger = logging.getLogger(__name__)
+
+
+class SiteAdapter(ABC):
+    """Mô tả một site: các cách tải (thử theo thứ tự), các selector thẻ tin (thử theo thứ tự)
+    và map trường -> (CSS selector trong thẻ, thuộc tính hoặc None = text). Site con phải có
+    get_page_url và total_pages, thiếu thì báo lỗi ngay khi tạo adapter"""
+
+    name = None
+    domains = ()
+    base_url = None
+    fetch_methods = ('requests',)
+    card_selectors = ()
+    field_map = {}
+    # Header riêng của site (vd. Referer), gộp vào header trình duyệt chung
+    headers = {}
+    # Hàm parse trang chi tiết cho DetailEnricher, None = site không hỗ trợ
+    detail_parser = None
+
+    def matches(self, url):
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == domain or host.endswith('.' + domain) for domain in self.domains)
+
+    @property
+    def needs_probe(self):
+        """Có nhiều cách tải/selector để chọn thì phải dò ở lần đầu"""
+        return len(self.fetch_methods) > 1 or len(self.card_selectors) > 1
+
+    def default_profile(self):
+        return self.fetch_methods[0], self.card_selectors[0]
+
+    @abstractmethod
+    def get_page_url(self, crawl_url, page):
+        """URL của trang thứ page (trang 1 là chính crawl_url)"""
+
+    @abstractmethod
+    def total_pages(self, content, crawl_url):
+        """Số trang của URL danh sách, đọc từ nội dung trang 1"""
+
+    def parse_page(self, content, source_url, selector, parser_backend='html.parser'):
+        """Các tin (có tiêu đề) trong trang theo selector thẻ tin đã biết"""
+        soup = self.soup(content, parser_backend)
+        return self.parse_cards(soup.select(selector), source_url)
+
+    def detect(self, content, source_url, parser_backend='html.parser'):
+        """Thử lần lượt các selector thẻ tin, trả về (selector đầu tiên tìm được tin, các tin)"""
+        soup = self.soup(content, parser_backend)
+        for selector in self.card_selectors:
+            page_data = self.parse_cards(soup.select(selector), source_url)
+            if page_data:
+                return selector, page_data
+        return None, []
+
+    def soup(self, content, parser_backend):
+        return BeautifulSoup(content, 'lxml' if parser_backend == 'lxml' else 'html.parser')
+
+    def parse_cards(self, cards, source_url):
+        page = page_constants(source_url)
+        page_data = []
+        for card in cards:
+            property_data = self.parse_card(card, page)
+            if property_data.get('title') and property_data.get('detail_url'):
+                page_data.append(property_data)
+        return page_data
+
+    def parse_card(self, card, page):
+        """Một thẻ tin -> dict theo field_map, đã chuẩn hoá các cột số"""
+        property_data = dict(page)
+        for field, (selector, attributes) in self.field_map.items():
+            elem = card.select_one(selector) if selector else card
+            property_data[field] = self.field_value(elem, attributes) if elem is not None else ''
+        for field in ('detail_url', 'image_url'):
+            if property_data.get(field):
+                property_data[field] = urljoin(self.base_url, property_data[field])
+        if property_data.get('area_text') and not property_data.get('area'):
+            match = AREA_NUMBER_RE.search(property_data['area_text'].replace(',', '.'))
+            property_data['area'] = match.group(1) if match else ''
+        # Đủ các cột như tin alonhadat để export giống nhau
+        for field in COLUMN_ORDER:
+            property_data.setdefault(field, '')
+        return normalize_listing(property_data)
+
+    def field_value(self, elem, attributes):
+        """Thuộc tính đầu tiên có giá trị (None trong danh sách = text của phần tử)"""
+        for attribute in attributes or (None,):
+            # Bỏ dấu chấm ngăn cách (·) ở đầu/cuối text
+            value = clean_text(elem.get_text(' ')).strip('· ') if attribute is None else elem.get(attribute)
+            if value:
+                return value
+        return ''
+
+
+class AlonhadatSite(SiteAdapter):
+    """alonhadat.com.vn: một cách tải, một selector, parse bằng backend nhanh trong parsers.py"""
+
+    name = 'alonhadat'
+    domains = ('alonhadat.com.vn',)
+    base_url = BASE_URL
+    card_selectors = ('div.content-item',)
+    detail_parser = staticmethod(parse_detail_page)
+
+    def get_page_url(self, crawl_url, page):
+        return get_page_url(crawl_url, page)
+
+    def total_pages(self, content, crawl_url):
+        return total_pages_from_html(content)
+
+    def parse_page(self, content, source_url, selector=None, parser_backend='html.parser'):
+        return get_page_parser(parser_backend)(content, source_url, self.base_url)
+
+    def detect(self, content, source_url, parser_backend='html.parser'):
+        return self.card_selectors[0], self.parse_page(content, source_url, None, parser_backend)
+
+
+class BatdongsanSite(SiteAdapter):
+    """batdongsan.com.vn: hay chặn request thường, markup thẻ tin đổi theo thời gian nên có nhiều
+    cách tải và selector dự phòng (giống test_crawler.py)"""
+
+    name = 'batdongsan'
+    domains = ('batdongsan.com.vn',)
+    base_url = 'https://batdongsan.com.vn'
+    fetch_methods = ('requests', 'mobile', 'cloudscraper')
+    card_selectors = (
+        'div.js__card.js__card-full-web',
+        'div.re__card-full',
+        'div[class*="js__card"]',
+        'div[class*="re__card"]',
+        'div[class*="card"]',
+        'div[class*="item"]',
+        'article',
+    )
+    field_map = {
+        'title': ('.re__card-title, .js__card-title, h3', None),
+        'detail_url': ('a.js__product-link-for-product-id, a[href]', ('href',)),
+        'price': ('.re__card-config-price', None),
+        'area_text': ('.re__card-config-area', None),
+        'address': ('.re__card-location', None),
+        'description': ('.re__card-description', None),
+        'post_date': ('.re__card-published-info-published-at', ('aria-label', None)),
+        'image_url': ('img', ('data-src', 'src')),
+    }
+    headers = {'Referer': 'https://batdongsan.com.vn/'}
+    VIP_PREFIX = 're__vip-'
+    PAGE_SUFFIX_RE = re.compile(r'/p\d+$')
+
+    def parse_card(self, card, page):
+        property_data = super().parse_card(card, page)
+        # Hạng tin nằm trên class của thẻ: re__vip-diamond -> vip-diamond (tin thường: re__vip-normal)
+        level = next((cls[len(self.VIP_PREFIX):] for cls in card.get('class', []) if cls.startswith(self.VIP_PREFIX)), '')
+        property_data['vip_level'] = f'vip-{level}' if level and level != 'normal' else ''
+        return property_data
+
+    def base_path(self, crawl_url):
+        return self.PAGE_SUFFIX_RE.sub('', urlparse(crawl_url).path.rstrip('/'))
+
+    def get_page_url(self, crawl_url, page):
+        """Trang N: .../nha-dat-ban-tp-hcm/pN (giữ query lọc)"""
+        if page == 1:
+            return crawl_url
+        parsed = urlparse(crawl_url)
+        return urlunparse(parsed._replace(path=f"{self.base_path(crawl_url)}/p{page}"))
+
+    def total_pages(self, content, crawl_url):
+        """Số trang lớn nhất trong các link /pN của chính URL danh sách này"""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', errors='ignore')
+        pattern = re.compile(rf'href="(?:https?://[^/"]+)?{re.escape(self.base_path(crawl_url))}/p(\d+)[/?"#]')
+        return max((int(page) for page in pattern.findall(content)), default=1)
+
+
+SITES = {site.name: site for site in (AlonhadatSite(), BatdongsanSite())}
+DEFAULT_SITE = SITES['alonhadat']
+
+
+def find_site(url):
+    """Adapter của site chứa URL, None nếu chưa hỗ trợ"""
+    for site in SITES.values():
+        if site.matches(url):
+            return site
+    return None
+
+
+class SiteProfiles:
+    """Cách tải và selector thẻ tin đã dùng được của từng site. Giữ trong bộ nhớ (dùng chung giữa các lần
+    chạy của daemon); có path thì lưu SQLite để các lần chạy sau không phải dò lại từng cách"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.probe_locks = {}
+        self.profiles = {}
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS site_profiles (
+                    site TEXT PRIMARY KEY,
+                    fetch_method TEXT NOT NULL,
+                    card_selector TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+            ''')
+            for site, fetch_method, card_selector in self.conn.execute(
+                    'SELECT site, fetch_method, card_selector FROM site_profiles'):
+                self.profiles[site] = (fetch_method, card_selector)
+
+    def get(self, site):
+        """(cách tải, selector) của site; site chỉ có một lựa chọn thì không cần dò"""
+        if not site.needs_probe:
+            return site.default_profile()
+        with self.lock:
+            return self.profiles.get(site.name)
+
+    def save(self, site, fetch_method, card_selector):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            self.profiles[site.name] = (fetch_method, card_selector)
+            if self.conn:
+                with self.conn:
+                    self.conn.execute('INSERT OR REPLACE INTO site_profiles VALUES (?, ?, ?, ?)',
+                                      (site.name, fetch_method, card_selector, now))
+
+    def forget(self, site, profile):
+        """Bỏ profile không còn dùng được (nếu luồng khác chưa kịp dò ra profile mới)"""
+        with self.lock:
+            if self.profiles.get(site.name) != profile:
+                return
+            del self.profiles[site.name]
+            if self.conn:
+                with self.conn:
+                    self.conn.execute('DELETE FROM site_profiles WHERE site = ?', (site.name,))
+
+    def probe_lock(self, site):
+        """Mỗi site chỉ một luồng dò cùng lúc, các luồng khác chờ rồi dùng kết quả"""
+        with self.lock:
+            return self.probe_locks.setdefault(site.name, threading.Lock())
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,65 @@
+import threading
+
+from parsers import get_url_name
+
+
+class RunningStats:
+    """Thống kê cộng dồn theo từng URL nguồn, cập nhật mỗi khi có trang mới"""
+
+    COUNTERS = ('total', 'has_price', 'has_area', 'vip', 'duplicates')
+
+    def __init__(self):
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def counter(self, source_url):
+        counter = self.sources.get(source_url)
+        if counter is None:
+            counter = self.sources[source_url] = dict.fromkeys(self.COUNTERS, 0)
+        return counter
+
+    def add_duplicates(self, source_url, count):
+        with self.lock:
+            self.counter(source_url)['duplicates'] += count
+
+    def add_page(self, source_url, page_data):
+        with self.lock:
+            counter = self.counter(source_url)
+            counter['total'] += len(page_data)
+            for item in page_data:
+                if item.get('price'):
+                    counter['has_price'] += 1
+                if item.get('area'):
+                    counter['has_area'] += 1
+                if item.get('vip_level'):
+                    counter['vip'] += 1
+
+    def count(self, source_url):
+        return self.sources.get(source_url, {}).get('total', 0)
+
+    def totals(self):
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for counter in self.sources.values():
+            for key in self.COUNTERS:
+                totals[key] += counter[key]
+        return totals
+
+    @property
+    def total_items(self):
+        return sum(counter['total'] for counter in self.sources.values())
+
+    def duplicates(self):
+        """{URL nguồn: số tin trùng đã bỏ}, gồm cả URL không có tin nào"""
+        return {url: counter['duplicates'] for url, counter in self.sources.items()}
+
+    def rows(self):
+        """Các dòng cho sheet Statistics"""
+        return [{
+            'URL': get_url_name(url),
+            'Full_URL': url,
+            'Total_Items': counter['total'],
+            'Has_Price': counter['has_price'],
+            'Has_Area': counter['has_area'],
+            'VIP_Items': counter['vip'],
+            'Duplicates': counter['duplicates'],
+        } for url, counter in self.sources.items()]
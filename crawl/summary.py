@@ -0,0 +1,132 @@
+import json
+
+import pandas as pd
+
+from parsers import get_url_name
+
+# Các cột số cần phân vị
+PERCENTILE_COLUMNS = ('price_vnd', 'price_per_m2', 'area_m2')
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Tin không gắn mức VIP nào
+NO_VIP = 'none'
+
+
+def filled_mask(df):
+    """True ở ô có dữ liệu (không NaN/None, không chuỗi rỗng), cùng nghĩa với item.get(cột) trước đây"""
+    return df.notna() & df.ne('')
+
+
+def percentile_dict(quantiles):
+    """{cột: {p10: ..., p50: ...}} từ bảng quantile (index là q), ô trống thành None"""
+    return {
+        column: {
+            f'p{round(q * 100)}': None if pd.isna(quantiles.at[q, column]) else round(float(quantiles.at[q, column]), 2)
+            for q in PERCENTILES
+        } for column in quantiles.columns
+    }
+
+
+def describe(items, fill_counts, vip_counts, percentiles, duplicates=0):
+    items = int(items)
+    return {
+        'items': items,
+        'duplicates': int(duplicates),
+        'filled': {column: int(count) for column, count in fill_counts.items()},
+        'fill_rate': {column: round(int(count) / items, 4) if items else None for column, count in fill_counts.items()},
+        'vip': {level: int(count) for level, count in vip_counts.items()},
+        'percentiles': percentiles,
+    }
+
+
+def summarize(df, duplicates=None):
+    """Thống kê một lượt trên DataFrame export: số tin, tỉ lệ có dữ liệu từng cột, phân bố VIP
+    và phân vị giá/diện tích, theo từng URL nguồn và tổng; duplicates: {URL: số tin trùng đã bỏ}"""
+    duplicates = duplicates or {}
+    sources = df['source_url']
+    filled = filled_mask(df)
+    vip = df['vip_level'].astype(object).where(filled['vip_level'], NO_VIP) if 'vip_level' in df else None
+    numeric = df[[column for column in PERCENTILE_COLUMNS if column in df]].astype('float64')
+
+    # Mỗi phép gom nhóm chạy một lần trên toàn bộ cột
+    items = sources.value_counts(sort=False)
+    fill_counts = filled.groupby(sources, observed=True, sort=False).sum()
+    vip_counts = vip.groupby(sources, observed=True, sort=False).value_counts() if vip is not None else None
+    quantiles = numeric.groupby(sources, observed=True, sort=False).quantile(list(PERCENTILES))
+
+    per_source = {}
+    for url in fill_counts.index:
+        per_source[url] = describe(items[url], fill_counts.loc[url],
+                                   vip_counts.loc[url] if vip_counts is not None else {},
+                                   percentile_dict(quantiles.loc[url]), duplicates.get(url, 0))
+        per_source[url]['name'] = get_url_name(url)
+    # URL mà mọi tin đều trùng với URL khác vẫn có dòng riêng
+    for url, count in duplicates.items():
+        if url not in per_source:
+            per_source[url] = describe(0, {}, {}, {}, count)
+            per_source[url]['name'] = get_url_name(url)
+
+    total = describe(len(df), filled.sum(), vip.value_counts() if vip is not None else {},
+                     percentile_dict(numeric.quantile(list(PERCENTILES))), sum(duplicates.values()))
+    return {'total': total, 'sources': per_source}
+
+
+def statistics_rows(summary):
+    """Các dòng sheet Statistics: cột cũ (Has_Price, VIP_Items...) kèm phân vị và phân bố VIP, dòng cuối là tổng"""
+    levels = sorted(level for level in summary['total']['vip'] if level != NO_VIP)
+    rows = []
+    for url, source in [*summary['sources'].items(), (None, summary['total'])]:
+        row = {
+            'URL': source['name'] if url else 'TOTAL',
+            'Full_URL': url or '',
+            'Total_Items': source['items'],
+            'Has_Price': source['filled'].get('price', 0),
+            'Has_Area': source['filled'].get('area', 0),
+            'VIP_Items': source['filled'].get('vip_level', 0),
+            'Duplicates': source['duplicates'],
+        }
+        for column, values in source['percentiles'].items():
+            for name in ('p25', 'p50', 'p75'):
+                row[f'{column}_{name}'] = values[name]
+        for level in levels:
+            row[level] = source['vip'].get(level, 0)
+        rows.append(row)
+    return rows
+
+
+def fill_rate_rows(summary):
+    """Sheet Fill_Rates: mỗi cột dữ liệu một dòng, tỉ lệ có dữ liệu (%) của tổng và từng URL"""
+    rows = []
+    for column, rate in summary['total']['fill_rate'].items():
+        row = {'Column': column, 'All': round(rate * 100, 1)}
+        for source in summary['sources'].values():
+            source_rate = source['fill_rate'].get(column)
+            row[source['name']] = None if source_rate is None else round(source_rate * 100, 1)
+        rows.append(row)
+    return rows
+
+
+def format_table(summary):
+    """Bảng text để in ra console"""
+    header = f"{'URL':<32}{'Items':>8}{'Giá':>8}{'DT':>8}{'VIP':>8}{'Trùng':>8}{'Giá p50 (tr)':>14}{'DT p50 (m²)':>13}"
+    lines = [header, '-' * len(header)]
+    for url, source in [*summary['sources'].items(), (None, summary['total'])]:
+        if url is None:
+            lines.append('-' * len(header))
+        rates = source['fill_rate']
+        price = source['percentiles'].get('price_vnd', {}).get('p50')
+        area = source['percentiles'].get('area_m2', {}).get('p50')
+        lines.append(
+            f"{(source.get('name') or 'TỔNG')[:31]:<32}{source['items']:>8}"
+            f"{percent(rates.get('price')):>8}{percent(rates.get('area')):>8}{percent(rates.get('vip_level')):>8}"
+            f"{source['duplicates']:>8}{'-' if price is None else f'{price / 1e6:,.0f}':>14}"
+            f"{'-' if area is None else f'{area:,.1f}':>13}")
+    return '\n'.join(lines)
+
+
+def percent(rate):
+    return '-' if rate is None else f'{rate:.0%}'
+
+
+def write_json(summary, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,153 @@
+# test_crawl.py - Kiểm tra AlonhadatMultiCrawler end-to-end trên server giả lập của benchmark
+import logging
+import os
+import shutil
+import tempfile
+
+from a import AlonhadatMultiCrawler
+from benchmark import StandInServer
+from checkpoint import CheckpointStore
+from seen_store import SeenStore
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def run_crawl(urls, max_pages=None, **kwargs):
+    """Crawl xong rồi đóng kết nối; rate limiter nhanh để không phải chờ delay cố định giữa các trang"""
+    kwargs.setdefault('rate_limit', 1000)
+    crawler = AlonhadatMultiCrawler(urls, **kwargs)
+    try:
+        crawler.crawl_all_urls(max_pages_per_url=max_pages)
+    finally:
+        crawler.fetchers.close()
+    return crawler
+
+
+def listings(crawler):
+    return [{key: value for key, value in item.items() if key != 'crawl_time'} for item in crawler.all_data]
+
+
+def test_parse_pool_matches_sequential():
+    """Parse bằng process pool cho ra đúng các tin, đúng thứ tự như crawl tuần tự parse trong luồng tải"""
+    with StandInServer(pages=3, latency=0, jitter=0) as server:
+        urls = server.source_urls(2)
+        sequential = run_crawl(urls, dedup=False)
+        pooled = run_crawl(urls, workers=3, parse_workers=2, dedup=False)
+    assert len(sequential.all_data) == 2 * 3 * 20
+    assert listings(pooled) == listings(sequential)
+    assert [pooled.stats.count(url) for url in urls] == [60, 60]
+
+
+def test_resume_from_checkpoint(tmp_path='.'):
+    """Chạy lại sau khi bị dừng giữa chừng: chỉ tải các trang chưa xong, dữ liệu đủ như chạy một mạch"""
+    db_path = os.path.join(str(tmp_path), 'test_resume.db')
+    with StandInServer(pages=4, latency=0, jitter=0) as server:
+        urls = server.source_urls(2)
+        expected = listings(run_crawl(urls, dedup=False))
+        del server.paths[:]
+
+        checkpoint = CheckpointStore(db_path)
+        crawler = AlonhadatMultiCrawler(urls, rate_limit=1000, checkpoint=checkpoint, dedup=False)
+        crawl_page = crawler.crawl_page
+
+        def interrupted(url, source_url):
+            # Ctrl-C khi đang tải trang 3 của URL đầu tiên
+            if url.endswith('/tinh-1/trang--3.html'):
+                raise KeyboardInterrupt
+            return crawl_page(url, source_url)
+
+        crawler.crawl_page = interrupted
+        try:
+            crawler.crawl_all_urls()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            crawler.fetchers.close()
+            checkpoint.close()
+        assert [path.rsplit('/', 1)[-1] for path in server.paths] == ['tinh-1.html', 'trang--2.html']
+        del server.paths[:]
+
+        checkpoint = CheckpointStore(db_path)
+        try:
+            resumed = run_crawl(urls, checkpoint=checkpoint, dedup=False)
+            assert checkpoint.summary() == {'sources_done': 2, 'pages_done': 8, 'items': 160}
+        finally:
+            checkpoint.close()
+            os.remove(db_path)
+        # Trang 1, 2 của URL đầu tiên không tải lại (số trang lấy từ checkpoint)
+        refetched = [path for path in server.paths if '/tinh-1' in path]
+        assert refetched == ['/nha-dat/can-ban/nha-dat/1/tinh-1/trang--3.html',
+                             '/nha-dat/can-ban/nha-dat/1/tinh-1/trang--4.html']
+        assert len(server.paths) == 2 + 4
+    assert listings(resumed) == expected
+
+
+def test_incremental_stops_at_seen_page(tmp_path='.'):
+    """Incremental: chỉ ghi tin mới, dừng phân trang ở trang đầu tiên gồm toàn tin đã thấy"""
+    db_path = os.path.join(str(tmp_path), 'test_seen.db')
+    seen_store = SeenStore(db_path)
+    try:
+        # Server giả lập trả cùng một trang cho trang 2, 3, 4: trang 3 toàn tin đã thấy ở trang 2
+        with StandInServer(pages=4, latency=0, jitter=0) as server:
+            url = server.source_urls(1)[0]
+            first = run_crawl([url], seen_store=seen_store, dedup=False)
+            assert [path.rsplit('/', 1)[-1] for path in server.paths] == ['tinh-1.html', 'trang--2.html', 'trang--3.html']
+            assert len(first.all_data) == 40 and seen_store.count() == 40
+            del server.paths[:]
+
+            second = run_crawl([url], seen_store=seen_store, dedup=False)
+            assert [path.rsplit('/', 1)[-1] for path in server.paths] == ['tinh-1.html']
+            assert len(second.all_data) == 0 and url in second.caught_up
+    finally:
+        seen_store.close()
+        os.remove(db_path)
+
+
+def test_parquet_partitions():
+    """Export Parquet/Arrow: mỗi source_name một thư mục source_name=..., đọc lại đủ dòng và đúng kiểu số"""
+    try:
+        import pyarrow.dataset as pa_dataset
+    except ImportError:
+        logger.warning("⚠️ Bỏ qua: chưa cài pyarrow")
+        return
+
+    with StandInServer(pages=2, latency=0, jitter=0) as server:
+        crawler = run_crawl(server.source_urls(2), workers=2, dedup=False)
+    names = sorted({item['source_name'] for item in crawler.all_data})
+    assert len(names) == 2
+
+    directory = tempfile.mkdtemp(prefix='test_parquet_')
+    try:
+        for file_format, extension in (('parquet', 'parquet'), ('arrow', 'arrow')):
+            path = os.path.join(directory, file_format)
+            crawler.save_to_parquet(path, file_format)
+            assert sorted(os.listdir(path)) == [f'source_name={name}' for name in names]
+            assert os.listdir(os.path.join(path, f'source_name={names[0]}')) == [f'part-0.{extension}']
+
+            dataset = pa_dataset.dataset(path, format='parquet' if file_format == 'parquet' else 'ipc',
+                                         partitioning='hive')
+            table = dataset.to_table()
+            assert table.num_rows == len(crawler.all_data)
+            assert str(table.schema.field('price_vnd').type) == 'int64'
+            assert str(table.schema.field('area_m2').type) == 'double'
+            rows = sorted(table.select(['source_name', 'detail_url', 'price_vnd']).to_pylist(),
+                          key=lambda row: (row['source_name'], row['detail_url']))
+            expected = sorted(({'source_name': item['source_name'], 'detail_url': item['detail_url'],
+                                'price_vnd': item['price_vnd']} for item in crawler.all_data),
+                              key=lambda row: (row['source_name'], row['detail_url']))
+            assert rows == expected
+
+            # Ghi lại cùng thư mục thay thế các phần cũ, không nhân đôi dữ liệu
+            crawler.save_to_parquet(path, file_format)
+            assert pa_dataset.dataset(path, format=dataset.format, partitioning='hive').count_rows() == table.num_rows
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_parse_pool_matches_sequential()
+    test_resume_from_checkpoint()
+    test_incremental_stops_at_seen_page()
+    test_parquet_partitions()
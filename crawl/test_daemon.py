@@ -0,0 +1,84 @@
+# test_daemon.py - Kiểm tra daemon: chạy một lượt (--once) và nhiều lần chạy song song dùng chung metrics
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from benchmark import StandInServer
+from daemon import CrawlScheduler, ScheduledSource
+from metrics import CrawlMetrics
+from test_metrics import parse_prometheus
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_run_once():
+    """Một lượt: mỗi URL crawl một lần, mỗi lần chạy một file output, chờ lần chạy xong mới thoát;
+    lượt sau trước khi hết chu kỳ thì không crawl lại"""
+    output_dir = tempfile.mkdtemp(prefix='test_daemon_')
+    try:
+        with StandInServer(pages=2, latency=0, jitter=0) as server:
+            urls = server.source_urls(2)
+            sources = [ScheduledSource(url, 3600) for url in urls]
+            scheduler = CrawlScheduler(sources, pages=2, workers=2, max_runs=2, rate_limit=1000,
+                                       output_dir=output_dir, export_format='excel', excel_sheets='none')
+            scheduler.run_forever(once=True)
+            assert server.requests == 4
+
+            assert [source.runs for source in sources] == [1, 1] and not scheduler.running
+            # Hai URL trả cùng các tin: tin trùng chỉ tính ở một URL
+            assert sum(source.last_items for source in sources) == 40
+            outputs = os.listdir(output_dir)
+            assert len(outputs) == 1 and outputs[0].endswith('.xlsx')
+
+            scheduler.run_forever(once=True)
+            assert server.requests == 4 and [source.runs for source in sources] == [1, 1]
+            # Mọi request đi qua transport dùng chung của daemon, kết nối keep-alive được dùng lại
+            stats = scheduler.transport.stats()
+            assert stats['requests'] == 4 and stats['connections_reused'] >= 1
+            scheduler.transport.close()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def test_concurrent_runs_share_metrics():
+    """Hai lần chạy song song (max_runs=2) cùng ghi một file --prometheus: cả hai xong, file .prom hợp lệ"""
+    output_dir = tempfile.mkdtemp(prefix='test_daemon_')
+    prometheus_path = os.path.join(output_dir, 'daemon.prom')
+    try:
+        with StandInServer(pages=3, latency=0.01, jitter=0.005) as server:
+            sources = [ScheduledSource(url, 3600) for url in server.source_urls(2)]
+            # Flush sau mỗi trang để hai lần chạy tranh nhau ghi file
+            metrics = CrawlMetrics(prometheus_path, prometheus_interval=0)
+            scheduler = CrawlScheduler(sources, pages=3, workers=2, max_runs=2, rate_limit=1000,
+                                       output_dir=output_dir, export_format='excel', excel_sheets='none',
+                                       metrics=metrics)
+            # Mỗi URL một lần chạy riêng, chạy cùng lúc trên hai luồng của scheduler
+            now = time.time()
+            for source in sources:
+                scheduler.start_run([source], now)
+            scheduler.run_forever(once=True)
+            scheduler.transport.close()
+            assert server.requests == 6
+
+        assert [source.runs for source in sources] == [1, 1] and not scheduler.running
+        # Mỗi lần chạy một crawler (dedup riêng): trang 2 và 3 của server giả lập trùng nhau
+        assert [source.last_items for source in sources] == [40, 40]
+        outputs = sorted(name for name in os.listdir(output_dir) if name != 'daemon.prom')
+        assert len(outputs) == 2 and all(name.endswith('.xlsx') for name in outputs)
+
+        metrics.write_prometheus()
+        with open(prometheus_path, encoding='utf-8') as f:
+            samples = parse_prometheus(f.read().splitlines())
+        assert sum(samples['crawler_pages_fetched_total']) == 6
+        assert sum(samples['crawler_items_parsed_total']) == 6 * 20
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_run_once()
+    test_concurrent_runs_share_metrics()
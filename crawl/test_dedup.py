@@ -0,0 +1,50 @@
+# test_dedup.py - Kiểm tra chống trùng tin theo detail_url (chuẩn hoá) và theo nội dung khi không có link
+import logging
+
+from benchmark import StandInServer
+from dedup import DedupIndex
+from test_crawl import run_crawl
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_detail_url_and_content_fallback():
+    """Cùng detail_url (khác www, query, / cuối) là trùng; tin không có link so theo tiêu đề/giá/diện tích/địa chỉ"""
+    index = DedupIndex()
+    listing = {'detail_url': 'https://alonhadat.com.vn/ban-nha-12345.html', 'title': 'Bán nhà', 'price': '5 tỷ'}
+    assert index.filter_page([listing]) == [listing]
+    variants = [dict(listing, detail_url='https://www.ALONHADAT.com.vn/ban-nha-12345.html/?utm=x#top'),
+                dict(listing, detail_url='https://alonhadat.com.vn/ban-nha-99999.html')]
+    assert index.filter_page(variants) == variants[1:]
+
+    no_link = {'detail_url': '', 'title': 'Bán  đất Hoà Lạc', 'price': '2 tỷ', 'area': '100 m²', 'address': 'Thạch Thất'}
+    same_content = dict(no_link, title='bán đất hoà lạc ', description='mô tả khác')
+    other_price = dict(no_link, price='2,1 tỷ')
+    assert index.filter_page([no_link]) == [no_link]
+    assert index.filter_page([same_content, other_price]) == [other_price]
+
+
+def test_cross_source_duplicates():
+    """Crawl song song hai URL nguồn trả về cùng các tin: mỗi tin chỉ giữ một lần, số trùng được thống kê"""
+    with StandInServer(pages=2, latency=0, jitter=0) as server:
+        urls = server.source_urls(2)
+        crawler = run_crawl(urls, workers=2)
+    assert len(crawler.all_data) == 40
+    assert len({item['detail_url'] for item in crawler.all_data}) == 40
+    # Trang về không theo thứ tự giữa các nguồn: chỉ tổng số là cố định
+    assert sum(crawler.stats.count(url) for url in urls) == 40
+    assert sum(crawler.stats.duplicates().values()) == 40
+
+    # Crawl tuần tự: tin trùng luôn được giữ ở URL đứng trước trong danh sách
+    with StandInServer(pages=2, latency=0, jitter=0) as server:
+        urls = server.source_urls(2)
+        crawler = run_crawl(urls)
+    assert [crawler.stats.count(url) for url in urls] == [40, 0]
+    assert crawler.stats.duplicates() == {urls[0]: 0, urls[1]: 40}
+
+
+if __name__ == "__main__":
+    test_detail_url_and_content_fallback()
+    test_cross_source_duplicates()
@@ -0,0 +1,37 @@
+# test_enrichment.py - Kiểm tra pool tải trang chi tiết giữ đúng tốc độ cho phép với host
+import logging
+import os
+
+from a import AlonhadatMultiCrawler
+from enrichment import DetailEnricher, DetailStore
+from rate_limiter import DEFAULT_REQUESTS_PER_SECOND
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_enricher_rate_budget(tmp_path='.'):
+    """Crawler tuần tự (không rate limiter): trang chi tiết dùng tốc độ mặc định, số luồng không quá số request/giây;
+    crawler có rate limiter thì dùng chung rate limiter đó"""
+    path = os.path.join(str(tmp_path), 'test_details.db')
+    store = DetailStore(path)
+    try:
+        sequential = AlonhadatMultiCrawler()
+        enricher = DetailEnricher(sequential, store, workers=4)
+        assert sequential.rate_limiter is None
+        assert enricher.rate_limiter.rate == DEFAULT_REQUESTS_PER_SECOND
+        assert enricher.workers == 2
+
+        assert DetailEnricher(sequential, store, workers=4, rate_limit=0.5).workers == 1
+
+        concurrent = AlonhadatMultiCrawler(workers=4, rate_limit=10)
+        enricher = DetailEnricher(concurrent, store, workers=4)
+        assert enricher.rate_limiter is None and enricher.workers == 4
+    finally:
+        store.close()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    test_enricher_rate_budget()
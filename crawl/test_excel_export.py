@@ -0,0 +1,44 @@
+# test_excel_export.py - Kiểm tra xuất Excel: chế độ sheet theo URL, sheet Index, All_Data đủ dòng
+import logging
+import os
+
+from openpyxl import load_workbook
+
+from excel_export import write_workbook
+from fixtures import SOURCE_URL, load_fixtures
+from parsers import get_page_parser
+from records import ListingBatch
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_excel_export(tmp_path='.'):
+    """Xuất Excel chế độ view: All_Data đủ dòng, xếp theo URL, sheet Index link tới từng khối"""
+    parse = get_page_parser('html.parser')
+    items = [item for content in load_fixtures().values() for item in parse(content, SOURCE_URL)]
+    batch = ListingBatch()
+    for index, item in enumerate(items):
+        batch.append(dict(item, source_url=f'{SOURCE_URL[:-5]}-{index % 2}.html'))
+
+    filename = os.path.join(str(tmp_path), 'test_export.xlsx')
+    try:
+        write_workbook(filename, batch.to_frame(), {'Statistics': [{'URL': SOURCE_URL, 'Total_Items': len(items)}]},
+                       'view', 'openpyxl')
+        workbook = load_workbook(filename)
+        assert workbook.sheetnames == ['All_Data', 'Statistics', 'Index']
+        rows = list(workbook['All_Data'].iter_rows(values_only=True))
+        assert len(rows) == len(items) + 1
+        column = rows[0].index('source_url')
+        sources = [row[column] for row in rows[1:]]
+        assert sources == sorted(sources, key=lambda url: url[-6])
+        first = workbook['Index']['A2']
+        assert first.hyperlink.location.startswith("'All_Data'!A2:")
+    finally:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+
+if __name__ == "__main__":
+    test_excel_export()
@@ -0,0 +1,92 @@
+# test_http_cache.py - Kiểm tra cache HTTP: TTL, 304, LRU, file hỏng, chế độ offline
+import logging
+import os
+import shutil
+import tempfile
+
+from benchmark import StandInServer
+from fixtures import FakeClock
+from http_cache import HttpCache
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def crawl(urls, http_cache, offline=False):
+    from a import AlonhadatMultiCrawler
+
+    crawler = AlonhadatMultiCrawler(urls, workers=2, rate_limit=1000, http_cache=http_cache, offline=offline,
+                                    dedup=False)
+    try:
+        crawler.crawl_all_urls()
+    finally:
+        crawler.fetchers.close()
+    return crawler
+
+
+def test_lru_and_corrupt_entry():
+    """Vượt dung lượng thì xoá entry lâu không dùng nhất; file hỏng bị bỏ và trừ khỏi tổng dung lượng"""
+    directory = tempfile.mkdtemp(prefix='test_http_cache_')
+    clock = FakeClock()
+    cache = HttpCache(directory, max_bytes=10_000, clock=clock)
+    try:
+        # Dữ liệu ngẫu nhiên không nén được: mỗi entry ~4KB, ba entry vượt giới hạn 10KB
+        bodies = {url: os.urandom(4000) for url in ('a', 'b', 'c')}
+        for url in ('a', 'b'):
+            clock.now += 1
+            cache.store(url, bodies[url], etag=f'"{url}"')
+        clock.now += 1
+        assert cache.get('a')['body'] == bodies['a']
+        clock.now += 1
+        cache.store('c', bodies['c'])
+        # 'b' lâu không dùng nhất
+        assert cache.counters['evicted'] == 1 and cache.get('b') is None
+        assert cache.get('a')['etag'] == '"a"' and cache.get('c') is not None
+
+        with open(f"{directory}/{cache.filename('c')}", 'wb') as f:
+            f.write(b'not zlib')
+        assert cache.get('c') is None
+        assert cache.total_bytes == cache.conn.execute('SELECT SUM(size) FROM entries').fetchone()[0]
+    finally:
+        cache.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_ttl_revalidation_and_offline():
+    """Trong TTL không gửi request; hết TTL gửi If-None-Match và dùng lại body khi server trả 304;
+    offline chỉ đọc cache"""
+    directory = tempfile.mkdtemp(prefix='test_http_cache_')
+    clock = FakeClock()
+    cache = HttpCache(directory, ttl=60, clock=clock)
+    try:
+        with StandInServer(pages=2, latency=0, jitter=0) as server:
+            urls = server.source_urls(2)
+            first = crawl(urls, cache)
+            assert server.requests == 4 and cache.counters['stored'] == 4
+
+            fresh = crawl(urls, cache)
+            assert server.requests == 4 and cache.counters['hits'] == 4
+
+            clock.now += 61
+            revalidated = crawl(urls, cache)
+            assert server.requests == 8 and server.not_modified == 4
+            assert cache.counters['revalidated'] == 4
+        expected = [item['detail_url'] for item in first.all_data]
+        assert [item['detail_url'] for item in fresh.all_data] == expected
+        assert [item['detail_url'] for item in revalidated.all_data] == expected
+
+        # Server đã tắt: offline vẫn crawl được từ cache, kể cả entry đã hết TTL
+        clock.now += 3600
+        offline = crawl(urls, cache, offline=True)
+        assert [item['detail_url'] for item in offline.all_data] == expected and not offline.failed_urls
+        missing = crawl([urls[0].replace('tinh-1', 'tinh-9')], cache, offline=True)
+        assert not missing.all_data and missing.failed_urls
+    finally:
+        cache.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_lru_and_corrupt_entry()
+    test_ttl_revalidation_and_offline()
@@ -0,0 +1,96 @@
+# test_jobqueue.py - Kiểm tra hàng đợi job: thuê, hết hạn, giao lại, quá số lần thử, kết quả muộn
+import logging
+import os
+
+from fixtures import FakeClock, SOURCE_URL
+from jobqueue import JobQueue
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def open_queue(tmp_path, name, **kwargs):
+    path = os.path.join(str(tmp_path), name)
+    remove_queue(path)
+    return path, JobQueue(path, lease_seconds=60, **kwargs)
+
+
+def remove_queue(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def test_lease_expiry_and_requeue(tmp_path='.'):
+    """Job hết hạn thuê được giao lại; trang 1 xong thì thêm job các trang còn lại"""
+    clock = FakeClock()
+    path, job_queue = open_queue(tmp_path, 'test_queue_lease.db', clock=clock)
+    try:
+        assert job_queue.enqueue_sources([SOURCE_URL], max_pages=3) == 1
+        assert job_queue.lease('A') == (SOURCE_URL, 1, 3)
+        assert job_queue.lease('B') is None and not job_queue.is_finished()
+
+        clock.now += 61
+        assert job_queue.lease('B') == (SOURCE_URL, 1, 3)
+        assert job_queue.complete(SOURCE_URL, 1, 'B', [{'title': 'x'}], total_pages=3)
+        assert job_queue.summary() == {'pending': 2, 'leased': 0, 'done': 1, 'failed': 0, 'items': 1}
+
+        # Trả lại job khi worker dừng: worker khác nhận ngay không phải chờ hết hạn
+        page = job_queue.lease('A')
+        job_queue.release(page[0], page[1], 'A')
+        assert job_queue.lease('B')[:2] == page[:2]
+    finally:
+        job_queue.close()
+        remove_queue(path)
+
+
+def test_stale_completion(tmp_path='.'):
+    """Worker đã mất job (hết hạn, giao cho worker khác) thì kết quả muộn bị bỏ, không ghi đè"""
+    clock = FakeClock()
+    path, job_queue = open_queue(tmp_path, 'test_queue_stale.db', clock=clock)
+    try:
+        job_queue.enqueue_sources([SOURCE_URL])
+        job_queue.lease('A')
+        clock.now += 61
+        job_queue.lease('B')
+
+        assert not job_queue.complete(SOURCE_URL, 1, 'A', [{'title': 'cũ'}])
+        assert job_queue.summary()['leased'] == 1
+        assert job_queue.complete(SOURCE_URL, 1, 'B', [{'title': 'mới'}])
+        assert not job_queue.complete(SOURCE_URL, 1, 'B', [{'title': 'lặp'}])
+        assert list(job_queue.iter_results()) == [(SOURCE_URL, 1, [{'title': 'mới'}])]
+        assert job_queue.is_finished()
+    finally:
+        job_queue.close()
+        remove_queue(path)
+
+
+def test_max_attempts(tmp_path='.'):
+    """Hết hạn thuê hoặc tải lỗi quá max_attempts lần thì job thành failed"""
+    clock = FakeClock()
+    path, job_queue = open_queue(tmp_path, 'test_queue_attempts.db', clock=clock, max_attempts=2)
+    try:
+        job_queue.enqueue_sources([SOURCE_URL, SOURCE_URL.replace('ha-noi', 'da-nang')])
+        assert job_queue.lease('A')[0] == SOURCE_URL
+        clock.now += 61
+        assert job_queue.lease('B')[0] == SOURCE_URL
+        clock.now += 61
+        # Lần thuê thứ hai cũng hết hạn: bỏ job, giao job kế tiếp
+        assert job_queue.lease('C')[0] != SOURCE_URL
+        assert job_queue.summary()['failed'] == 1
+
+        other = job_queue.source_urls()[1]
+        job_queue.release(other, 1, 'C', failed=True)
+        assert job_queue.lease('C')[0] == other
+        job_queue.release(other, 1, 'C', failed=True)
+        assert job_queue.summary()['failed'] == 2 and job_queue.is_finished()
+    finally:
+        job_queue.close()
+        remove_queue(path)
+
+
+if __name__ == "__main__":
+    test_lease_expiry_and_requeue()
+    test_stale_completion()
+    test_max_attempts()
@@ -0,0 +1,133 @@
+# test_listing_store.py - Kiểm tra kho tin SQLite: upsert, lọc, theo dõi thay đổi, lệnh query của CLI
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+import listing_store
+from fixtures import SOURCE_URL, load_fixtures
+from listing_store import ListingStore, parse_price_arg, parse_since_arg
+from parsers import get_page_parser
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def fixture_items():
+    return get_page_parser('html.parser')(load_fixtures()['listing_page_1.html'], SOURCE_URL)
+
+
+def remove_store(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def test_listing_store(tmp_path='.'):
+    """Upsert theo detail_url giữ first_seen và thông tin chi tiết cũ; lọc theo giá/diện tích/ngày đăng"""
+    items = fixture_items()
+    path = os.path.join(str(tmp_path), 'test_listings.db')
+    store = ListingStore(path)
+    try:
+        store.upsert([dict(item, crawl_time='2025-08-10 08:00:00', phone='0900') for item in items])
+        store.upsert([dict(item, crawl_time='2025-08-12 08:00:00', price_vnd=1) for item in items[:3]])
+        assert store.count() == len({item['detail_url'] for item in items})
+
+        cheap = store.query(max_price=1, order='price')
+        assert len(cheap) == 3
+        assert all(row['first_seen'] == '2025-08-10 08:00:00' and row['last_seen'] == '2025-08-12 08:00:00'
+                   and row['phone'] == '0900' for row in cheap)
+
+        priced = [item for item in items[3:] if item.get('price_vnd') and item.get('area_m2') and item['area_m2'] >= 50]
+        rows = store.query(min_price=2, min_area=50)
+        assert len(rows) == len(priced)
+        recent = store.query(since='2025-08-20', order='newest')
+        assert [row['posted_on'] for row in recent] == sorted((f"2025-08-{item['post_date'][-10:-8]}" for item in items
+                                                               if item['post_date'][-10:-8] >= '20'), reverse=True)
+    finally:
+        store.close()
+        remove_store(path)
+
+
+def test_listing_changes(tmp_path='.'):
+    """Chỉ ghi các cột đã đổi giữa hai lần crawl; tin không còn sau lần crawl đủ trang được đánh dấu đã gỡ"""
+    items = [item for item in fixture_items() if item.get('price_vnd')][:4]
+    path = os.path.join(str(tmp_path), 'test_changes.db')
+    store = ListingStore(path)
+    try:
+        store.upsert([dict(item, crawl_time='2025-08-10 08:00:00') for item in items])
+        assert store.change_counts() == {}
+        second = [dict(item, crawl_time='2025-08-12 08:00:00') for item in items[1:]]
+        second[0]['price_vnd'] = items[1]['price_vnd'] // 2
+        second[1]['price_vnd'] = items[2]['price_vnd'] * 2
+        store.upsert(second)
+        store.upsert(second)
+        assert store.mark_removed(SOURCE_URL, '2025-08-12 00:00:00') == 1
+
+        drops = store.price_changes(since='2025-08-11', direction='down')
+        assert [row['detail_url'] for row in drops] == [items[1]['detail_url']]
+        assert drops[0]['old_value'] == items[1]['price_vnd'] and drops[0]['change_pct'] == -50.0
+        assert len(store.price_changes(since='2025-08-11')) == 2 and not store.price_changes(since='2025-08-13')
+
+        removed = store.removed()
+        assert [row['detail_url'] for row in removed] == [items[0]['detail_url']]
+        assert len(store.query(active_only=True)) == 3
+        assert [row['field'] for row in store.history(items[0]['detail_url'])] == ['status']
+
+        # Tin đăng lại thì hoạt động trở lại
+        store.upsert([dict(items[0], crawl_time='2025-08-14 08:00:00')])
+        assert not store.removed() and len(store.query(active_only=True)) == 4
+        assert [row['new_value'] for row in store.history(items[0]['detail_url'])] == ['active', 'removed']
+    finally:
+        store.close()
+        remove_store(path)
+
+
+def test_query_cli(tmp_path='.'):
+    """Lệnh query: giá dạng "5 tỷ", ngày dạng 7d, --active bỏ tin đã gỡ; kết quả xuất ra .jsonl"""
+    assert parse_price_arg('5 tỷ') == 5_000_000_000 and parse_price_arg('800 triệu') == 800_000_000
+    assert parse_price_arg('1200000000') == 1_200_000_000
+    today = datetime.now()
+    assert parse_since_arg('7d') == (today - timedelta(days=7)).strftime('%Y-%m-%d')
+    assert parse_since_arg('2025-08-01') == '2025-08-01'
+
+    def listing(name, price_vnd, days_ago):
+        posted = (today - timedelta(days=days_ago)).strftime('%d/%m/%Y')
+        return dict(fixture_items()[0], detail_url=f'https://alonhadat.com.vn/{name}.html', price_vnd=price_vnd,
+                    post_date=f'Ngày đăng: {posted}')
+
+    path = os.path.join(str(tmp_path), 'test_query_cli.db')
+    output = os.path.join(str(tmp_path), 'test_query_cli.jsonl')
+    remove_store(path)
+    store = ListingStore(path)
+    try:
+        earlier = (today - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+        store.upsert([dict(listing('removed', 4_500_000_000, 1), crawl_time=earlier)])
+        store.upsert([listing('cheap', 800_000_000, 0), listing('match', 3_000_000_000, 2),
+                      listing('expensive', 6_000_000_000, 2), listing('old', 4_000_000_000, 10)])
+        assert store.mark_removed(SOURCE_URL, today.strftime('%Y-%m-%d 00:00:00')) == 1
+    finally:
+        store.close()
+
+    argv = sys.argv
+    sys.argv = ['listing_store.py', path, 'query', '--max-price', '5 tỷ', '--since', '7d', '--active',
+                '--order', 'price', '--output', output]
+    try:
+        listing_store.main()
+        with open(output, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+    finally:
+        sys.argv = argv
+        remove_store(path)
+        if os.path.exists(output):
+            os.remove(output)
+    assert [row['detail_url'].rsplit('/', 1)[-1] for row in rows] == ['cheap.html', 'match.html']
+    assert all(row['status'] == 'active' for row in rows)
+
+
+if __name__ == "__main__":
+    test_listing_store()
+    test_listing_changes()
+    test_query_cli()
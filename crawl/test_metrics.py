@@ -0,0 +1,118 @@
+# test_metrics.py - Kiểm tra file text Prometheus: counter, histogram tích luỹ, gauge từ collector
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+from benchmark import StandInServer
+from metrics import CrawlMetrics
+from test_crawl import run_crawl
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SAMPLE_RE = re.compile(r'^(crawler_\w+)(\{(?:\w+="(?:[^"\\]|\\.)*",?)*\})? (-?[\d.]+(?:e[-+]?\d+)?)$')
+
+
+def parse_prometheus(lines):
+    """Kiểm tra từng dòng text exposition, trả về tên metric -> các giá trị"""
+    samples = {}
+    for line in lines:
+        if line.startswith('#'):
+            assert re.match(r'^# (HELP|TYPE) crawler_\w+ ', line), line
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, line
+        samples.setdefault(match.group(1), []).append(float(match.group(3)))
+    return samples
+
+
+def test_prometheus_text():
+    """Đúng định dạng text exposition: nhãn được escape, bucket cộng dồn tới +Inf, gauge chỉ lấy giá trị số"""
+    metrics = CrawlMetrics()
+    metrics.inc('requests', 2, 'http://x/"a"')
+    metrics.inc('requests')
+    metrics.observe('parse', 0.02, 'http://x/')
+    metrics.observe('parse', 0.3, 'http://x/')
+    metrics.register('transport', lambda: {'opened': 3, 'http2': True, 'backend': 'requests'})
+
+    lines = metrics.prometheus_text().splitlines()
+    assert lines[:3] == [
+        '# TYPE crawler_requests_total counter',
+        'crawler_requests_total 1',
+        'crawler_requests_total{source="http://x/\\"a\\""} 2',
+    ]
+    assert lines[3].startswith('# HELP crawler_parse_seconds ') and lines[4] == '# TYPE crawler_parse_seconds histogram'
+    buckets = [line for line in lines if line.startswith('crawler_parse_seconds_bucket')]
+    assert buckets[0] == 'crawler_parse_seconds_bucket{le="0.005",source="http://x/"} 0'
+    assert 'crawler_parse_seconds_bucket{le="0.025",source="http://x/"} 1' in buckets
+    assert 'crawler_parse_seconds_bucket{le="0.5",source="http://x/"} 2' in buckets
+    assert buckets[-1] == 'crawler_parse_seconds_bucket{le="+Inf",source="http://x/"} 2'
+    assert 'crawler_parse_seconds_sum{source="http://x/"} 0.320000' in lines
+    assert 'crawler_parse_seconds_count{source="http://x/"} 2' in lines
+    assert lines[-2:] == ['# TYPE crawler_transport_opened gauge', 'crawler_transport_opened 3']
+
+
+def test_prometheus_file_from_crawl(tmp_path='.'):
+    """Crawl có --prometheus: file .prom hợp lệ, số trang tải khớp số request server nhận"""
+    path = os.path.join(str(tmp_path), 'test_metrics.prom')
+    metrics = CrawlMetrics(path, prometheus_interval=0)
+    try:
+        with StandInServer(pages=3, latency=0, jitter=0) as server:
+            run_crawl(server.source_urls(2), workers=2, dedup=False, metrics=metrics)
+            requests = server.requests
+        metrics.write_prometheus()
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    samples = parse_prometheus(lines)
+    assert sum(samples['crawler_pages_fetched_total']) == requests == 6
+    assert sum(samples['crawler_items_parsed_total']) == 6 * 20
+    assert samples['crawler_download_seconds_count'] == [3.0, 3.0]
+
+
+def test_concurrent_flush():
+    """Nhiều luồng cùng ghi nhận và flush: không luồng nào lỗi, file .prom luôn đầy đủ, không sót file tạm"""
+    directory = tempfile.mkdtemp(prefix='test_metrics_')
+    path = os.path.join(directory, 'crawl.prom')
+    metrics = CrawlMetrics(path, prometheus_interval=0)
+    errors = []
+    start = threading.Barrier(8)
+
+    def work():
+        try:
+            start.wait()
+            for _ in range(50):
+                metrics.inc('pages_fetched', 1, 'http://x/')
+                metrics.maybe_flush()
+                metrics.write_prometheus()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert os.listdir(directory) == ['crawl.prom']
+        metrics.write_prometheus()
+        with open(path, encoding='utf-8') as f:
+            samples = parse_prometheus(f.read().splitlines())
+        assert samples['crawler_pages_fetched_total'] == [8 * 50]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_prometheus_text()
+    test_prometheus_file_from_crawl()
+    test_concurrent_flush()
@@ -0,0 +1,99 @@
+# test_parsers.py - Kiểm tra các backend parse cho ra kết quả giống hệt html.parser
+import logging
+import os
+
+from enrichment import parse_detail_page
+from fixtures import FIXTURES_DIR, SOURCE_URL, load_fixtures
+from pagination import get_page_url, total_pages_from_html
+from parsers import PARSER_BACKENDS, available_parsers, get_page_parser
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def without_crawl_time(page_data):
+    return [{key: value for key, value in item.items() if key != 'crawl_time'} for item in page_data]
+
+
+def test_parser_parity():
+    """Mọi backend đã cài phải cho ra đúng các trường như html.parser"""
+    reference = get_page_parser('html.parser')
+    fixtures = load_fixtures()
+    assert fixtures, "Không có fixture nào"
+
+    for name in available_parsers():
+        parse = get_page_parser(name)
+        for fixture_name, content in fixtures.items():
+            expected = without_crawl_time(reference(content, SOURCE_URL))
+            actual = without_crawl_time(parse(content, SOURCE_URL))
+            assert len(actual) == len(expected), f"{name}/{fixture_name}: {len(actual)} != {len(expected)} items"
+            for i, (got, want) in enumerate(zip(actual, expected)):
+                assert got == want, f"{name}/{fixture_name} item {i}: {got} != {want}"
+        logger.info(f"✅ {name}: giống html.parser trên {len(fixtures)} fixtures")
+
+    missing = [name for name in PARSER_BACKENDS if name not in available_parsers()]
+    if missing:
+        logger.warning(f"⚠️ Bỏ qua backend chưa cài: {', '.join(missing)}")
+
+
+def test_fixture_fields():
+    """Các item trong fixture phải có đủ các trường export"""
+    content = load_fixtures()['listing_page_1.html']
+    page_data = get_page_parser('html.parser')(content, SOURCE_URL)
+    assert len(page_data) == 20
+    for item in page_data:
+        assert item['title'] and item['detail_url'].startswith('https://alonhadat.com.vn/')
+        assert item['price'] and item['area']
+
+
+def test_normalized_fields():
+    """Giá, diện tích, kích thước được chuẩn hoá thành số ngay khi parse"""
+    content = load_fixtures()['listing_page_edge.html']
+    per_m2, apartment, negotiable = get_page_parser('html.parser')(content, SOURCE_URL)
+
+    assert per_m2['area_m2'] == 1250.0
+    assert per_m2['price_per_m2'] == 45_000_000 and per_m2['price_vnd'] == 45_000_000 * 1250
+
+    assert apartment['price_vnd'] == 3_850_000_000 and apartment['area_m2'] == 78.5
+    assert (apartment['width_m'], apartment['length_m']) == (5.2, 15.0)
+    assert apartment['floors_count'] == 12 and apartment['road_width_m'] == 6.5
+
+    assert negotiable['price_vnd'] is None and negotiable['area_m2'] is None
+
+
+def test_pagination():
+    """Đọc số trang từ trang 1 và sinh URL trang N cho cả đuôi .htm lẫn .html"""
+    fixtures = load_fixtures()
+    assert total_pages_from_html(fixtures['listing_page_1.html']) == 3
+    assert total_pages_from_html(fixtures['listing_page_edge.html']) == 1
+    # Markup khác đường nhanh (khối lồng thẻ, class trong nháy đơn) vẫn đọc đúng số trang
+    for name, expected in (('pagination_nested.html', 47), ('pagination_single_quote.html', 12)):
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            assert total_pages_from_html(f.read()) == expected, name
+
+    base = 'https://alonhadat.com.vn/nha-dat/can-ban/nha-dat/1/ha-noi'
+    assert get_page_url(f'{base}.html', 1) == f'{base}.html'
+    assert get_page_url(f'{base}.html', 2) == f'{base}/trang--2.html'
+    assert get_page_url(f'{base}.htm', 3) == f'{base}/trang--3.htm'
+    assert get_page_url(f'{base}/trang--7.html', 4) == f'{base}/trang--4.html'
+
+
+def test_detail_page():
+    """Trang chi tiết: SĐT, pháp lý, mô tả đầy đủ (bỏ link), toạ độ"""
+    with open(os.path.join(FIXTURES_DIR, 'detail_page.html'), 'rb') as f:
+        detail = parse_detail_page(f.read())
+
+    assert detail['phone'] == '0912345678'
+    assert detail['legal_status'] == 'Sổ hồng/ Sổ đỏ'
+    assert detail['full_description'].startswith('Nhà xây mới 5 tầng')
+    assert 'Xem thêm' not in detail['full_description']
+    assert (detail['latitude'], detail['longitude']) == (20.99312, 105.80845)
+
+
+if __name__ == "__main__":
+    test_parser_parity()
+    test_fixture_fields()
+    test_normalized_fields()
+    test_pagination()
+    test_detail_page()
@@ -0,0 +1,127 @@
+# test_rate_limiter.py - Kiểm tra token bucket theo host và điều tốc AIMD: giảm một nửa khi 429, Retry-After, cooldown, tăng dần
+import logging
+import time
+
+from fixtures import SOURCE_URL as URL, FakeClock
+from rate_limiter import AdaptiveRateLimiter, HostRateLimiter, TokenBucket, parse_retry_after
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_token_bucket_burst():
+    """Hết token của burst thì mỗi request chờ khoảng 1/rate giây; để lâu không dùng thì đầy lại, không quá capacity"""
+    clock = FakeClock()
+    bucket = TokenBucket(5.0, clock=clock, sleep=clock.sleep)
+    start = clock.now
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    waits = [bucket.acquire() for _ in range(3)]
+    assert all(abs(wait - 0.2) < 1e-6 for wait in waits)
+    assert abs(clock.now - start - 0.6) < 1e-6
+
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert abs(bucket.acquire() - 0.2) < 1e-6
+
+    bucket = TokenBucket(0.5, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0.0 and bucket.acquire() == 0.0
+    assert abs(bucket.acquire() - 2.0) < 1e-6
+
+
+def test_hosts_have_separate_buckets():
+    """Mỗi host một bucket: dùng hết token của host này không làm host khác phải chờ"""
+    clock = FakeClock()
+    limiter = HostRateLimiter(2.0, clock=clock, sleep=clock.sleep)
+    other = 'https://batdongsan.com.vn/nha-dat-ban-ha-noi'
+    assert limiter.acquire(URL) == 0.0 and limiter.acquire(URL) == 0.0
+    assert limiter.acquire(other) == 0.0 and limiter.acquire(other) == 0.0
+    assert abs(limiter.acquire(URL) - 0.5) < 1e-6
+    assert limiter.get_bucket(URL) is limiter.get_bucket(URL.replace('ha-noi', 'ho-chi-minh'))
+    assert limiter.get_bucket(URL) is not limiter.get_bucket(other)
+    assert sorted(limiter.buckets) == ['alonhadat.com.vn', 'batdongsan.com.vn']
+
+
+def make_limiter(clock, **kwargs):
+    limiter = AdaptiveRateLimiter(4.0, max_rate=6.0, max_concurrency=4, cooldown=5.0, clock=clock, **kwargs)
+    # Slot đồng thời được trả bởi release(), test gọi release trực tiếp nên tăng in_flight trước
+    limiter.get_host(URL).in_flight = 100
+    return limiter
+
+
+def test_throttle_halves_rate_once_per_cooldown():
+    """429 giảm một nửa tốc độ và số request đồng thời, các 429 khác trong cooldown không giảm thêm"""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.release(URL, 429)
+    assert limiter.snapshot()['alonhadat.com.vn'] == {'rate': 2.0, 'concurrency': 1}
+
+    clock.now += 1
+    limiter.release(URL, 429)
+    limiter.release(URL, 503)
+    assert limiter.decreases == 1 and limiter.snapshot()['alonhadat.com.vn']['rate'] == 2.0
+
+    clock.now += 5
+    limiter.release(URL, 503)
+    assert limiter.decreases == 2 and limiter.snapshot()['alonhadat.com.vn']['rate'] == 1.0
+
+
+def test_retry_after_pauses_host():
+    """Retry-After chặn mọi request tới host cho đến hết thời gian yêu cầu"""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.release(URL, 429, retry_after=30)
+    assert limiter.get_host(URL).paused_until == clock.now + 30
+    assert parse_retry_after('120') == 120.0 and parse_retry_after('soon') is None
+
+    limiter = AdaptiveRateLimiter(100.0, cooldown=0)
+    limiter.acquire(URL)
+    limiter.release(URL, 429, retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire(URL)
+    assert time.monotonic() - start >= 0.19
+
+
+def test_additive_increase():
+    """Sau đủ số request thành công (bằng số request đồng thời) và hết cooldown thì tăng thêm một bước"""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.release(URL, 200, latency=0.1)
+    # Lần tăng đầu tiên khi vừa giảm: phải chờ hết cooldown
+    limiter.release(URL, 429)
+    for _ in range(3):
+        limiter.release(URL, 200, latency=0.1)
+    assert limiter.snapshot()['alonhadat.com.vn'] == {'rate': 2.0, 'concurrency': 1}
+
+    clock.now += 5
+    limiter.release(URL, 200, latency=0.1)
+    assert limiter.snapshot()['alonhadat.com.vn'] == {'rate': 2.5, 'concurrency': 2}
+    limiter.release(URL, 200, latency=0.1)
+    assert limiter.snapshot()['alonhadat.com.vn']['rate'] == 2.5
+    limiter.release(URL, 200, latency=0.1)
+    assert limiter.snapshot()['alonhadat.com.vn'] == {'rate': 3.0, 'concurrency': 3}
+    for _ in range(50):
+        limiter.release(URL, 200, latency=0.1)
+    assert limiter.snapshot()['alonhadat.com.vn'] == {'rate': 6.0, 'concurrency': 4}
+
+
+def test_network_error_keeps_rate():
+    """Lỗi mạng (status None) không đổi tốc độ kể cả khi độ trễ trung bình đang cao"""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.release(URL, 200, latency=1.0)
+    clock.now += 5
+    limiter.release(URL, 200, latency=20.0)
+    assert limiter.decreases == 1
+    clock.now += 5
+    limiter.release(URL, None)
+    assert limiter.decreases == 1 and limiter.snapshot()['alonhadat.com.vn']['rate'] == 2.0
+
+
+if __name__ == "__main__":
+    test_token_bucket_burst()
+    test_hosts_have_separate_buckets()
+    test_throttle_halves_rate_once_per_cooldown()
+    test_retry_after_pauses_host()
+    test_additive_increase()
+    test_network_error_keeps_rate()
@@ -0,0 +1,94 @@
+# test_records.py - Kiểm tra ListingBatch: lưu theo cột, mã hoá từ điển, DataFrame, gộp batch, ghi theo dòng
+import logging
+import math
+
+import pandas as pd
+
+from records import ListingBatch
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HANOI = 'https://alonhadat.com.vn/nha-dat/can-ban/nha-dat/1/ha-noi.html'
+HCM = 'https://alonhadat.com.vn/nha-dat/can-ban/nha-dat/2/ho-chi-minh.html'
+
+
+def listing(index, source_url=HANOI, **fields):
+    item = {
+        'title': f'Tin {index}', 'price': '3,2 tỷ', 'price_vnd': 3_200_000_000 + index, 'area_m2': 50.5,
+        'floors_count': 4, 'vip_level': 'vip-1', 'detail_url': f'https://alonhadat.com.vn/tin-{index}.html',
+        'source_url': source_url, 'source_name': source_url.rsplit('/', 1)[-1][:-5],
+    }
+    item.update(fields)
+    return item
+
+
+def test_append_round_trip():
+    """append rồi đọc lại (dòng và DataFrame) đúng giá trị; số thiếu thành None/NaN/<NA>, cột chưa có thì bỏ"""
+    items = [listing(0), listing(1, price_vnd=None, area_m2=None, floors_count=None, vip_level=None)]
+    batch = ListingBatch(items)
+    assert len(batch) == 2
+    assert batch[0] == items[0]
+    assert batch[-1]['price_vnd'] is None and batch[1]['area_m2'] is None and batch[1]['vip_level'] is None
+    assert batch.column('price_vnd') == [3_200_000_000, None]
+    assert isinstance(batch.get(0, 'price_vnd'), int) and isinstance(batch.get(0, 'area_m2'), float)
+
+    frame = batch.to_frame()
+    assert 'phone' not in frame.columns and 'crawl_time' not in frame.columns
+    assert frame['title'].tolist() == ['Tin 0', 'Tin 1']
+    assert frame['price_vnd'][0] == 3_200_000_000 and frame['price_vnd'][1] is pd.NA
+    assert frame['area_m2'][0] == 50.5 and math.isnan(frame['area_m2'][1])
+    assert pd.isna(frame['vip_level'][1])
+
+
+def test_frame_dtypes():
+    """Cột lặp lại thành Categorical; cột số nguyên giữ kiểu Int64 cho phép thiếu giá trị"""
+    frame = ListingBatch([listing(0), listing(1, price_vnd=None), listing(2, source_url=HCM)]).to_frame()
+    assert isinstance(frame['source_url'].dtype, pd.CategoricalDtype)
+    assert isinstance(frame['vip_level'].dtype, pd.CategoricalDtype)
+    assert list(frame['source_url'].cat.categories) == [HANOI, HCM]
+    assert str(frame['price_vnd'].dtype) == 'Int64' and str(frame['floors_count'].dtype) == 'Int64'
+    assert str(frame['area_m2'].dtype) == 'float64'
+    assert frame['price_vnd'].isna().tolist() == [False, True, False]
+
+
+def test_concat_keeps_order_and_codes():
+    """Gộp batch của từng nguồn: đúng thứ tự, mã từ điển ánh xạ sang một bảng chung"""
+    hanoi = ListingBatch([listing(0), listing(1, vip_level='vip-2')])
+    hcm = ListingBatch([listing(2, source_url=HCM, vip_level='vip-2'), listing(3, source_url=HCM, vip_level=None)])
+    # Mỗi batch tự đánh mã từ 0
+    assert hanoi.columns['source_url'].tolist() == [0, 0] and hcm.columns['source_url'].tolist() == [0, 0]
+
+    merged = ListingBatch.concat([hanoi, hcm])
+    assert [row['detail_url'] for row in merged] == [f'https://alonhadat.com.vn/tin-{i}.html' for i in range(4)]
+    assert merged.dictionaries['source_url'].values == [HANOI, HCM]
+    assert merged.columns['source_url'].tolist() == [0, 0, 1, 1]
+    assert merged.dictionaries['vip_level'].values == ['vip-1', 'vip-2']
+    assert merged.columns['vip_level'].tolist() == [0, 1, 1, -1]
+    assert merged.column('vip_level') == ['vip-1', 'vip-2', 'vip-2', None]
+    assert list(merged) == list(hanoi) + list(hcm)
+
+
+def test_set_updates_one_row():
+    """set (enrichment ghi thông tin trang chi tiết) chỉ đổi đúng dòng, cột mới xuất hiện trong DataFrame"""
+    batch = ListingBatch([listing(0), listing(1), listing(2)])
+    batch.set(1, 'phone', '0912345678')
+    batch.set(1, 'latitude', 21.02)
+    batch.set(2, 'price_vnd', None)
+    batch.set(0, 'vip_level', 'vip-3')
+
+    assert batch.column('phone') == [None, '0912345678', None]
+    assert batch.column('latitude') == [None, 21.02, None]
+    assert batch.column('price_vnd') == [3_200_000_000, 3_200_000_001, None]
+    assert batch.column('vip_level') == ['vip-3', 'vip-1', 'vip-1']
+    frame = batch.to_frame()
+    assert frame['phone'][1] == '0912345678' and frame['phone'].isna().tolist() == [True, False, True]
+    assert frame['latitude'][1] == 21.02 and frame['latitude'].isna().sum() == 2
+
+
+if __name__ == "__main__":
+    test_append_round_trip()
+    test_frame_dtypes()
+    test_concat_keeps_order_and_codes()
+    test_set_updates_one_row()
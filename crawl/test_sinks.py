@@ -0,0 +1,98 @@
+# test_sinks.py - Kiểm tra ghi trực tiếp (--stream): CSV/JSONL ghi nối, crawl không giữ dữ liệu trong bộ nhớ
+import codecs
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from benchmark import StandInServer
+from fixtures import SOURCE_URL, load_fixtures
+from parsers import COLUMN_ORDER, get_page_parser
+from sinks import CsvSink, JsonlSink, open_sink
+from test_crawl import run_crawl
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def fixture_items():
+    return get_page_parser('html.parser')(load_fixtures()['listing_page_1.html'], SOURCE_URL)
+
+
+def test_csv_header_once():
+    """File mới có BOM và header; mở lại để ghi nối thì không ghi thêm header/BOM"""
+    items = fixture_items()
+    directory = tempfile.mkdtemp(prefix='test_sinks_')
+    path = os.path.join(directory, 'listings.csv')
+    try:
+        for page in (items[:5], items[5:]):
+            sink = open_sink(path)
+            assert isinstance(sink, CsvSink)
+            sink.write_page(page)
+            sink.close()
+            assert sink.items_written == len(page)
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        assert raw.startswith(codecs.BOM_UTF8) and raw.count(codecs.BOM_UTF8) == 1
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            lines = f.read().splitlines()
+        assert lines.count(','.join(COLUMN_ORDER)) == 1 and lines[0] == ','.join(COLUMN_ORDER)
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['detail_url'] for row in rows] == [item['detail_url'] for item in items]
+        assert rows[0]['title'] == items[0]['title']
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_jsonl_round_trip():
+    """Mỗi item một dòng JSON, đọc lại đúng từng trường (cả tiếng Việt và giá trị rỗng)"""
+    items = fixture_items()
+    directory = tempfile.mkdtemp(prefix='test_sinks_')
+    path = os.path.join(directory, 'listings.jsonl')
+    try:
+        sink = open_sink(path)
+        assert isinstance(sink, JsonlSink)
+        sink.write_page(items[:7])
+        sink.write_page(items[7:])
+        sink.close()
+        with open(path, encoding='utf-8') as f:
+            assert [json.loads(line) for line in f] == items
+        try:
+            open_sink(os.path.join(directory, 'listings.xlsx'))
+            assert False, "đuôi file không hỗ trợ phải báo lỗi"
+        except ValueError:
+            pass
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_stream_crawl():
+    """--stream: all_data để trống, mọi item nằm trong file, RunningStats vẫn đếm đủ theo URL"""
+    directory = tempfile.mkdtemp(prefix='test_sinks_')
+    path = os.path.join(directory, 'stream.jsonl')
+    sink = open_sink(path)
+    try:
+        with StandInServer(pages=2, latency=0, jitter=0) as server:
+            urls = server.source_urls(2)
+            crawler = run_crawl(urls, workers=2, sink=sink, dedup=False)
+        sink.close()
+        assert len(crawler.all_data) == 0
+        assert [crawler.stats.count(url) for url in urls] == [40, 40]
+        with open(path, encoding='utf-8') as f:
+            streamed = [json.loads(line) for line in f]
+        assert len(streamed) == sink.items_written == 80
+        assert sorted({item['source_url'] for item in streamed}) == sorted(urls)
+    finally:
+        sink.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_csv_header_once()
+    test_jsonl_round_trip()
+    test_stream_crawl()
@@ -0,0 +1,71 @@
+# test_sites.py - Kiểm tra adapter theo site: dò selector, map trường, phân trang, lưu profile đã dò
+import logging
+import os
+
+from fixtures import FIXTURES_DIR, SOURCE_URL
+from sites import SiteAdapter, SiteProfiles, find_site
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def without_crawl_time(page_data):
+    return [{key: value for key, value in item.items() if key != 'crawl_time'} for item in page_data]
+
+
+def test_site_adapters(tmp_path='.'):
+    """Adapter batdongsan: dò selector thẻ tin, map trường, phân trang; profile dò được lưu qua các lần chạy"""
+    with open(os.path.join(FIXTURES_DIR, 'batdongsan_page.html'), 'rb') as f:
+        content = f.read()
+    source_url = 'https://batdongsan.com.vn/nha-dat-ban-tp-hcm'
+    site = find_site(source_url)
+    assert site.name == 'batdongsan' and find_site(SOURCE_URL).name == 'alonhadat'
+    assert find_site('https://example.com/nha-dat') is None
+
+    class Incomplete(SiteAdapter):
+        name = 'incomplete'
+
+        def get_page_url(self, crawl_url, page):
+            return crawl_url
+    try:
+        Incomplete()
+        assert False, "adapter thiếu total_pages phải báo lỗi khi tạo"
+    except TypeError as e:
+        assert 'total_pages' in str(e)
+
+    selector, items = site.detect(content.replace(b'js__card js__card-full-web ', b''), source_url)
+    assert selector == 'div.re__card-full' and len(items) == 3
+    # crawl_time của hai lần parse có thể lệch nhau một giây
+    parsed = site.parse_page(content, source_url, 'div.js__card.js__card-full-web')
+    assert without_crawl_time(parsed) == without_crawl_time(items)
+    first = items[0]
+    assert first['price_vnd'] == 8_500_000_000 and first['area_m2'] == 72.0
+    assert first['vip_level'] == 'vip-diamond' and first['address'] == 'Quận 7, Hồ Chí Minh'
+    assert first['detail_url'].startswith('https://batdongsan.com.vn/ban-nha-rieng')
+    assert first['image_url'].endswith('abc.jpg') and first['post_date'] == '14/08/2025'
+    assert items[2]['price_vnd'] is None and items[2]['vip_level'] == ''
+
+    assert site.total_pages(content, source_url) == 58
+    assert site.get_page_url(source_url + '/p3?gia=1', 5) == source_url + '/p5?gia=1'
+
+    path = os.path.join(str(tmp_path), 'test_profiles.db')
+    try:
+        profiles = SiteProfiles(path)
+        assert profiles.get(site) is None and profiles.get(find_site(SOURCE_URL)) == ('requests', 'div.content-item')
+        profiles.save(site, 'mobile', selector)
+        profiles.close()
+        profiles = SiteProfiles(path)
+        assert profiles.get(site) == ('mobile', selector)
+        profiles.forget(site, ('requests', selector))
+        assert profiles.get(site) == ('mobile', selector)
+        profiles.forget(site, ('mobile', selector))
+        assert profiles.get(site) is None
+        profiles.close()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    test_site_adapters()
@@ -0,0 +1,33 @@
+# test_summary.py - Kiểm tra thống kê vector hoá: khớp bộ đếm lúc crawl, phân vị, tỉ lệ điền trường
+import logging
+
+from fixtures import SOURCE_URL, load_fixtures
+from parsers import get_page_parser
+from records import ListingBatch
+from stats import RunningStats
+from summary import statistics_rows, summarize
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def test_summary():
+    """Thống kê vector hoá khớp với bộ đếm cộng dồn lúc crawl"""
+    items = get_page_parser('html.parser')(load_fixtures()['listing_page_1.html'], SOURCE_URL)
+    stats = RunningStats()
+    stats.add_page(SOURCE_URL, items)
+    summary = summarize(ListingBatch(items).to_frame(), stats.duplicates())
+
+    expected = stats.rows()[0]
+    row = statistics_rows(summary)[0]
+    for column in ('Total_Items', 'Has_Price', 'Has_Area', 'VIP_Items'):
+        assert row[column] == expected[column]
+    prices = sorted(item['price_vnd'] for item in items if item.get('price_vnd') is not None)
+    assert summary['total']['percentiles']['price_vnd']['p10'] >= prices[0]
+    assert summary['total']['fill_rate']['title'] == 1.0
+    assert sum(summary['total']['vip'].values()) == len(items)
+
+
+if __name__ == "__main__":
+    test_summary()
@@ -0,0 +1,108 @@
+# test_transport.py - Kiểm tra chọn transport (HTTP/1.1 hay HTTP/2), các cách tải và dò cách tải dự phòng
+import logging
+import os
+from datetime import timedelta
+
+import requests
+
+from fixtures import FIXTURES_DIR
+from transport import MOBILE_HEADERS, FetchMethods, HttpxTransport, RequestsTransport, create_transport
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATDONGSAN_URL = 'https://batdongsan.com.vn/nha-dat-ban-tp-hcm'
+
+
+class StubTransport:
+    """Transport giả: chặn (403) trình duyệt desktop như batdongsan, chỉ trả trang cho User-Agent điện thoại"""
+
+    def __init__(self, body):
+        self.body = body
+        self.pool_size = 4
+        self.timeout = (1.0, 1.0)
+        self.calls = []
+
+    def get(self, url, headers=None):
+        mobile = (headers or {}).get('User-Agent') == MOBILE_HEADERS['User-Agent']
+        self.calls.append((url, 'mobile' if mobile else 'desktop'))
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200 if mobile else 403
+        response._content = self.body if mobile else b'Forbidden'
+        response.elapsed = timedelta(milliseconds=5)
+        return response
+
+    def stats(self):
+        return {'requests': len(self.calls)}
+
+    def close(self):
+        pass
+
+
+def test_create_transport():
+    """Mặc định requests (HTTP/1.1) với pool và timeout theo cấu hình; --http2 cần httpx, thiếu thì báo cách cài"""
+    transport = create_transport(pool_size=3, connect_timeout=2.0, read_timeout=7.0)
+    try:
+        assert isinstance(transport, RequestsTransport)
+        assert transport.timeout == (2.0, 7.0) and transport.adapter._pool_maxsize == 3
+        assert transport.stats()['requests'] == 0
+    finally:
+        transport.close()
+
+    try:
+        transport = create_transport(http2=True)
+    except ImportError as e:
+        assert 'httpx' in str(e)
+        logger.warning("⚠️ Chưa cài httpx: chỉ kiểm tra thông báo lỗi của --http2")
+    else:
+        assert isinstance(transport, HttpxTransport)
+        transport.close()
+
+
+def test_fetch_methods():
+    """requests/mobile dùng chung transport chính (mobile đổi User-Agent); tên lạ báo lỗi; cloudscraper tạo khi cần"""
+    stub = StubTransport(b'<html></html>')
+    fetchers = FetchMethods(stub)
+    assert fetchers.get('requests', BATDONGSAN_URL).status_code == 403
+    assert fetchers.get('mobile', BATDONGSAN_URL, headers={'Referer': 'x'}).status_code == 200
+    assert stub.calls == [(BATDONGSAN_URL, 'desktop'), (BATDONGSAN_URL, 'mobile')]
+    try:
+        fetchers.get('curl', BATDONGSAN_URL)
+        assert False, "phải báo lỗi cách tải không hỗ trợ"
+    except ValueError:
+        pass
+    try:
+        import cloudscraper  # noqa: F401
+    except ImportError:
+        try:
+            fetchers.get('cloudscraper', BATDONGSAN_URL)
+            assert False, "phải báo cần cài cloudscraper"
+        except ImportError as e:
+            assert 'pip install cloudscraper' in str(e)
+    assert fetchers.cloudscraper is None
+
+
+def test_probe_falls_back_to_next_method():
+    """Site bị chặn với cách tải đầu tiên: dò sang cách tiếp theo, lưu lại và lần sau dùng thẳng cách đó"""
+    from a import AlonhadatMultiCrawler
+
+    with open(os.path.join(FIXTURES_DIR, 'batdongsan_page.html'), 'rb') as f:
+        stub = StubTransport(f.read())
+    crawler = AlonhadatMultiCrawler([BATDONGSAN_URL], rate_limit=1000, transport=stub)
+    total_pages, first_page = crawler.plan_source(BATDONGSAN_URL, max_pages=2)
+    assert total_pages == 2 and len(first_page) == 3
+    assert stub.calls == [(BATDONGSAN_URL, 'desktop'), (BATDONGSAN_URL, 'mobile')]
+    assert crawler.site_profile(crawler.site_for(BATDONGSAN_URL))[0] == 'mobile'
+    assert not crawler.failed_urls and BATDONGSAN_URL in crawler.truncated
+
+    del stub.calls[:]
+    page_data = crawler.crawl_page(crawler.get_page_url(BATDONGSAN_URL, 2), BATDONGSAN_URL)
+    assert len(page_data) == 3 and stub.calls == [(BATDONGSAN_URL + '/p2', 'mobile')]
+
+
+if __name__ == "__main__":
+    test_create_transport()
+    test_fetch_methods()
+    test_probe_falls_back_to_next_method()
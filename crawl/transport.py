@@ -0,0 +1,195 @@
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Header giả lập trình duyệt dùng cho mọi request
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Referer': 'https://alonhadat.com.vn/'
+}
+
+# Cách tải "mobile": cùng transport nhưng giả lập trình duyệt điện thoại
+MOBILE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1.2 Mobile/15E148 Safari/604.1',
+}
+FETCH_METHODS = ('requests', 'mobile', 'cloudscraper')
+
+# Số host giữ pool riêng (alonhadat + ảnh/trang chi tiết), và số kết nối tối thiểu mỗi host
+DEFAULT_POOL_HOSTS = 10
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 15.0
+
+
+class RequestsTransport:
+    """Tải trang qua requests.Session với pool kết nối keep-alive có kích thước cố định"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, pool_hosts=DEFAULT_POOL_HOSTS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.pool_size = max(1, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # pool_block: luồng thừa chờ kết nối rảnh thay vì mở socket mới rồi bỏ đi sau request
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update(BROWSER_HEADERS)
+
+    def get(self, url, headers=None):
+        return self.session.get(url, timeout=self.timeout, headers=headers)
+
+    def stats(self):
+        """Số request và số kết nối đã mở, lấy từ bộ đếm của các pool urllib3"""
+        pools = self.adapter.poolmanager.pools
+        requests_sent = opened = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                opened += pool.num_connections
+        return connection_stats(requests_sent, opened, {'HTTP/1.1': requests_sent} if requests_sent else {})
+
+    def close(self):
+        self.session.close()
+
+
+class CloudscraperTransport(RequestsTransport):
+    """Tải qua session của cloudscraper (vượt trang chờ Cloudflare), cùng giao diện với RequestsTransport"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        try:
+            import cloudscraper
+        except ImportError:
+            raise ImportError("Cách tải cloudscraper cần cài: pip install cloudscraper")
+        self.pool_size = max(1, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = cloudscraper.create_scraper()
+        # Giữ adapter TLS riêng của cloudscraper, chỉ đọc bộ đếm pool của nó
+        self.adapter = self.session.get_adapter('https://')
+        self.session.headers.update({key: value for key, value in BROWSER_HEADERS.items() if key != 'User-Agent'})
+
+
+class FetchMethods:
+    """Các cách tải trang theo tên (FETCH_METHODS): requests/mobile dùng transport chính,
+    transport cloudscraper chỉ được tạo khi có site cần đến"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.lock = threading.Lock()
+        self.cloudscraper = None
+
+    def get(self, method, url, headers=None):
+        if method == 'mobile':
+            return self.transport.get(url, headers={**(headers or {}), **MOBILE_HEADERS})
+        if method == 'cloudscraper':
+            return self.cloudscraper_transport().get(url, headers=headers)
+        if method != 'requests':
+            raise ValueError(f"Cách tải không hỗ trợ: {method} (chọn {', '.join(FETCH_METHODS)})")
+        return self.transport.get(url, headers=headers)
+
+    def cloudscraper_transport(self):
+        with self.lock:
+            if self.cloudscraper is None:
+                connect_timeout, read_timeout = self.transport.timeout
+                self.cloudscraper = CloudscraperTransport(self.transport.pool_size, connect_timeout, read_timeout)
+            return self.cloudscraper
+
+    def close(self):
+        """Đóng transport tự tạo; transport chính do nơi tạo ra đóng"""
+        with self.lock:
+            if self.cloudscraper is not None:
+                self.cloudscraper.close()
+                self.cloudscraper = None
+
+
+class HttpxTransport:
+    """Tải trang qua httpx.Client bật HTTP/2: nhiều request dùng chung một kết nối (multiplex)"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("HTTP/2 cần httpx[http2]: pip install 'httpx[http2]'")
+        self.httpx = httpx
+        self.pool_size = max(1, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.client = httpx.Client(
+            http2=True,
+            headers=BROWSER_HEADERS,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.lock = threading.Lock()
+        # Kết nối đã thấy (theo network stream của httpcore) để biết request nào dùng lại socket cũ
+        self.streams = weakref.WeakSet()
+        self.requests_sent = 0
+        self.opened = 0
+        self.versions = {}
+
+    def get(self, url, headers=None):
+        try:
+            response = self.client.get(url, headers=headers)
+        except self.httpx.HTTPError as e:
+            # Cùng loại lỗi với RequestsTransport để get_page_content retry như nhau
+            raise requests.ConnectionError(str(e)) from e
+        self.track(response)
+        return to_requests_response(response)
+
+    def track(self, response):
+        stream = response.extensions.get('network_stream')
+        with self.lock:
+            self.requests_sent += 1
+            self.versions[response.http_version] = self.versions.get(response.http_version, 0) + 1
+            if stream is None:
+                return
+            if stream not in self.streams:
+                self.streams.add(stream)
+                self.opened += 1
+
+    def stats(self):
+        with self.lock:
+            return connection_stats(self.requests_sent, self.opened, dict(self.versions))
+
+    def close(self):
+        self.client.close()
+
+
+def to_requests_response(response):
+    """Chuyển httpx.Response sang requests.Response để phần còn lại của crawler không phải đổi"""
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.url = str(response.url)
+    converted.reason = response.reason_phrase
+    converted.headers.update(response.headers)
+    converted._content = response.content
+    converted.elapsed = response.elapsed
+    converted.encoding = response.encoding
+    return converted
+
+
+def connection_stats(requests_sent, opened, versions):
+    reused = max(0, requests_sent - opened)
+    return {
+        'requests': requests_sent,
+        'connections_opened': opened,
+        'connections_reused': reused,
+        'reuse_ratio': round(reused / requests_sent, 4) if requests_sent else None,
+        'http_versions': versions,
+    }
+
+
+def create_transport(pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                     read_timeout=DEFAULT_READ_TIMEOUT, http2=False):
+    """Transport theo cấu hình: requests (HTTP/1.1) hoặc httpx (HTTP/2)"""
+    if http2:
+        return HttpxTransport(pool_size, connect_timeout, read_timeout)
+    return RequestsTransport(pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)